@@ -1,26 +1,34 @@
+import os
+
+# BLAS threading is read when numpy is first imported, so configure it up front
+NUM_THREADS = int(os.environ.get("OMP_NUM_THREADS", os.cpu_count() or 4))
+os.environ.setdefault("MKL_NUM_THREADS", str(NUM_THREADS))
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 from PIL import Image
 import json
-import os
 from datetime import datetime
 import plotly.express as px
 import plotly.graph_objects as go
 import io
 import base64
+import hashlib
+import importlib.util
+import re
+from concurrent.futures import ThreadPoolExecutor
 
-# Try to import ML libraries (they may not be available on Vercel)
-ML_AVAILABLE = False
-try:
-    from transformers import pipeline, BlipProcessor, BlipForConditionalGeneration
-    import torch
-    from sentence_transformers import SentenceTransformer
-    from sklearn.metrics.pairwise import cosine_similarity
-    ML_AVAILABLE = True
-except ImportError:
-    # ML libraries not available - running in lite mode
-    pass
+# Check for ML libraries (they may not be available on Vercel). They are only
+# located here; the modules themselves are imported on first use so lite mode
+# and script reruns never pay the transformers/torch import cost.
+ML_AVAILABLE = all(
+    importlib.util.find_spec(name) is not None
+    for name in ('transformers', 'torch', 'sentence_transformers')
+)
+
+# FAISS is optional - recipe search falls back to a NumPy matmul without it
+FAISS_AVAILABLE = importlib.util.find_spec('faiss') is not None
 
 # Try to import voice libraries
 VOICE_AVAILABLE = False
@@ -40,6 +48,40 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Tabs rerun as fragments so a widget change only re-executes its own tab. st.fragment
+# needs Streamlit >= 1.37; older releases fall back to whole-script reruns.
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda func: func)
+
+# Sentence embedding model and the on-disk cache for its recipe corpus embeddings
+SENTENCE_MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+
+# Tokens used by the recipe text search index
+SEARCH_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Nutrient fields flattened into scalar DataFrame columns at load time
+NUTRIENT_COLUMNS = ('calories', 'protein', 'carbs', 'fat', 'fiber', 'sodium')
+
+# Health assessment bit flags, in display order
+LOW_CALORIE, HIGH_CALORIE, MODERATE_CALORIE, HIGH_PROTEIN, LOW_PROTEIN, LOW_SODIUM, HIGH_SODIUM, HIGH_FIBER = (
+    1 << i for i in range(8)
+)
+HEALTH_FLAG_MESSAGES = (
+    (LOW_CALORIE, "✅ Low calorie"),
+    (HIGH_CALORIE, "⚠️ High calorie"),
+    (MODERATE_CALORIE, "✅ Moderate calorie"),
+    (HIGH_PROTEIN, "✅ High protein"),
+    (LOW_PROTEIN, "⚠️ Low protein"),
+    (LOW_SODIUM, "✅ Low sodium"),
+    (HIGH_SODIUM, "⚠️ High sodium"),
+    (HIGH_FIBER, "✅ High fiber")
+)
+
+# BLIP input geometry and normalization, matching the processor's preprocessing config
+BLIP_IMAGE_SIZE = 384
+BLIP_IMAGE_MEAN = np.array([0.48145466, 0.4578275, 0.40821073], dtype=np.float32)
+BLIP_IMAGE_STD = np.array([0.26862954, 0.26130258, 0.27577711], dtype=np.float32)
+
 # Load custom CSS
 def load_css():
     st.markdown("""
@@ -86,7 +128,7 @@ def init_session_state():
             'spice_level': 'medium',
             'cuisine_preferences': [],
             'cooking_time_pref': 'medium',
-            'favorite_recipes': [],
+            'favorite_recipes': set(),
             'health_conditions': []
         }
     if 'chat_history' not in st.session_state:
@@ -94,6 +136,11 @@ def init_session_state():
     if 'cooking_mode' not in st.session_state:
         st.session_state.cooking_mode = False
 
+def quantize_for_cpu(model):
+    """Apply dynamic INT8 quantization to a model's Linear layers"""
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
 # Load models and data
 @st.cache_resource
 def load_models():
@@ -102,23 +149,73 @@ def load_models():
         return None
     
     try:
-        # Image captioning model for ingredient recognition
-        image_processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
-        image_model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base")
+        import torch
+        from transformers import BlipProcessor, BlipForConditionalGeneration
+        from sentence_transformers import SentenceTransformer
         
-        # Sentence transformer for recipe similarity
-        sentence_model = SentenceTransformer('all-MiniLM-L6-v2')
+        # Use every core for intra-op work; PyTorch often defaults to 1-2 threads on cloud CPUs
+        torch.set_num_threads(NUM_THREADS)
+        try:
+            torch.set_num_interop_threads(max(1, NUM_THREADS // 2))
+        except RuntimeError:
+            # Can only be set once per process, e.g. not again after a cache clear
+            pass
+        
+        # Half-precision weights on GPU; CPU keeps fp32 activations with INT8 Linear weights
+        if torch.cuda.is_available():
+            device = 'cuda'
+            dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+        else:
+            device = 'cpu'
+            dtype = torch.float32
+        
+        # Downloads are I/O bound, so fetch all three models concurrently
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            # Image captioning model for ingredient recognition
+            processor_future = pool.submit(BlipProcessor.from_pretrained, "Salesforce/blip-image-captioning-base")
+            image_model_future = pool.submit(
+                BlipForConditionalGeneration.from_pretrained,
+                "Salesforce/blip-image-captioning-base",
+                torch_dtype=dtype
+            )
+            
+            # Sentence transformer for recipe similarity
+            sentence_model_future = pool.submit(SentenceTransformer, SENTENCE_MODEL_NAME, device=device)
+        
+        image_processor = processor_future.result()
+        image_model = image_model_future.result().to(device)
+        sentence_model = sentence_model_future.result()
+        
+        if device == 'cpu':
+            # CPU inference is bandwidth bound; INT8 Linear weights cut that traffic
+            image_model = quantize_for_cpu(image_model)
+            sentence_model = quantize_for_cpu(sentence_model)
+        else:
+            sentence_model[0].auto_model.to(dtype)
+        
+        # Warm up kernels and allocators now rather than on the user's first click
+        try:
+            warmup_pixels = torch.zeros(1, 3, BLIP_IMAGE_SIZE, BLIP_IMAGE_SIZE, device=device, dtype=dtype)
+            with torch.inference_mode():
+                image_model.generate(pixel_values=warmup_pixels, max_length=5)
+            smart_encode(sentence_model, ["warmup"])
+        except Exception:
+            pass
         
         return {
             'image_processor': image_processor,
             'image_model': image_model,
-            'sentence_model': sentence_model
+            'sentence_model': sentence_model,
+            'device': device,
+            'dtype': dtype,
+            # Precision the sentence model actually runs at; cached embeddings are keyed on it
+            'model_variant': f"{device}-{str(dtype).replace('torch.', '')}" + ('-int8' if device == 'cpu' else '')
         }
     except Exception as e:
         st.error(f"Error loading models: {e}")
         return None
 
-@st.cache_data
+@st.cache_resource
 def load_recipe_data():
     """Load custom recipe dataset"""
     # Custom recipe data with nutritional information
@@ -279,7 +376,106 @@ def load_recipe_data():
         }
     }
     
-    return pd.DataFrame(recipes_data['recipes']), recipes_data['ingredient_substitutions']
+    recipes_df = pd.DataFrame(recipes_data['recipes'])
+    
+    # Flatten nutrition into scalar columns so filters compare whole arrays at once
+    for nutrient in NUTRIENT_COLUMNS:
+        recipes_df[nutrient] = recipes_df['nutrition'].map(lambda n: n[nutrient]).astype('int32')
+    recipes_df['_health_flags'] = assess_health_flags(
+        recipes_df['calories'].values, recipes_df['protein'].values,
+        recipes_df['sodium'].values, recipes_df['fiber'].values
+    )
+    
+    # Lowercased search text, computed once instead of on every keystroke
+    recipes_df['_name_lc'] = recipes_df['name'].str.lower()
+    recipes_df['_cuisine_lc'] = recipes_df['cuisine'].str.lower()
+    recipes_df['_ingredients_joined_lc'] = recipes_df['ingredients'].map(lambda xs: ' '.join(xs).lower())
+    
+    # Bitmask of dietary tags, so tag filters are one integer AND per recipe
+    tag_bits = {
+        tag: 1 << i for i, tag in enumerate(sorted({tag for tags in recipes_df['dietary_tags'] for tag in tags}))
+    }
+    recipes_df['_tag_mask'] = recipes_df['dietary_tags'].map(
+        lambda xs: sum(tag_bits[tag] for tag in xs)
+    ).astype(np.uint32)
+    recipes_df.attrs['tag_bits'] = tag_bits
+    
+    search_index = build_search_index(recipes_df)
+    
+    recipes_df['cuisine'] = recipes_df['cuisine'].astype('category')
+    recipes_df['difficulty'] = recipes_df['difficulty'].astype('category')
+    
+    return recipes_df, recipes_data['ingredient_substitutions'], search_index
+
+def smart_encode(model, texts, batch_size=32, normalize=True):
+    """Encode texts in length-sorted mini-batches to minimise padding"""
+    import torch
+    
+    # Similar-length texts share a batch, so little compute is spent on padding tokens
+    lengths = [len(text.split()) for text in texts]
+    order = np.argsort(lengths, kind='stable')
+    embeddings = model.encode(
+        [texts[i] for i in order],
+        batch_size=batch_size,
+        convert_to_tensor=True,
+        show_progress_bar=False
+    )
+    
+    # Upcast half-precision outputs before normalizing to avoid accumulation drift
+    embeddings = embeddings.float()
+    if normalize:
+        embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+    embeddings = embeddings.cpu().numpy()
+    
+    # Undo the length sort so rows line up with the input order again
+    inverse = np.empty_like(order)
+    inverse[order] = np.arange(len(order))
+    return embeddings[inverse]
+
+def load_corpus_embeddings(descriptions, model, model_variant):
+    """Load corpus embeddings from the on-disk cache, computing and saving them on a miss"""
+    from safetensors import safe_open
+    from safetensors.numpy import save_file
+    
+    # The file name carries a hash of the model, its precision and the corpus, so
+    # INT8 CPU and half-precision GPU embeddings never share a file
+    digest = hashlib.sha256(
+        '\n'.join((SENTENCE_MODEL_NAME, model_variant, *descriptions)).encode('utf-8')
+    ).hexdigest()
+    path = os.path.join(EMBEDDING_CACHE_DIR, f"recipe_emb_{digest[:16]}.safetensors")
+    
+    if os.path.exists(path):
+        try:
+            with safe_open(path, framework="np") as f:
+                return f.get_tensor('emb')
+        except Exception:
+            pass  # Unreadable cache file - recompute below
+    
+    # Embeddings are L2-normalized so inner product equals cosine similarity
+    embeddings = np.ascontiguousarray(smart_encode(model, descriptions, batch_size=64), dtype=np.float32)
+    
+    try:
+        os.makedirs(EMBEDDING_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        save_file({'emb': embeddings}, tmp_path)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # Read-only deployments just recompute on the next cold start
+    
+    return embeddings
+
+@st.cache_resource
+def build_recipe_index(descriptions: tuple, _model, model_variant: str):
+    """Embed the recipe description corpus and index it once per process"""
+    embeddings = load_corpus_embeddings(list(descriptions), _model, model_variant)
+    
+    index = None
+    if FAISS_AVAILABLE:
+        import faiss
+        index = faiss.IndexFlatIP(embeddings.shape[1])
+        index.add(embeddings)
+    
+    return index, embeddings
 
 def main():
     load_css()
@@ -305,8 +501,13 @@ def main():
         """)
     
     # Load data and models
-    recipes_df, substitutions = load_recipe_data()
+    recipes_df, substitutions, search_index = load_recipe_data()
     models = load_models()
+    recipe_index = None
+    if models:
+        recipe_index = build_recipe_index(
+            tuple(recipes_df['image_description']), models['sentence_model'], models['model_variant']
+        )
     
     # Header
     st.markdown('<h1 class="main-header">🍳 AI-Powered Cooking Assistant</h1>', unsafe_allow_html=True)
@@ -360,10 +561,10 @@ def main():
     ])
     
     with tab1:
-        recipe_finder_tab(recipes_df, models)
+        recipe_finder_tab(recipes_df, models, search_index)
     
     with tab2:
-        image_to_recipe_tab(recipes_df, models)
+        image_to_recipe_tab(recipes_df, models, recipe_index)
     
     with tab3:
         substitution_tab(substitutions)
@@ -377,7 +578,8 @@ def main():
     with tab6:
         cooking_mode_tab(recipes_df)
 
-def recipe_finder_tab(recipes_df, models):
+@fragment
+def recipe_finder_tab(recipes_df, models, search_index):
     st.header("🔍 Recipe Finder")
     
     col1, col2 = st.columns([2, 1])
@@ -401,51 +603,74 @@ def recipe_finder_tab(recipes_df, models):
     
     # Filter recipes based on user preferences and filters
     filtered_recipes = filter_recipes(recipes_df, search_query, cuisine_filter, 
-                                    difficulty_filter, show_vegetarian, show_quick, show_healthy)
+                                    difficulty_filter, show_vegetarian, show_quick, show_healthy,
+                                    search_index)
     
     # Display filtered recipes
     if len(filtered_recipes) > 0:
         st.subheader(f"Found {len(filtered_recipes)} recipes:")
         
-        for _, recipe in filtered_recipes.iterrows():
+        for recipe in filtered_recipes.to_dict('records'):
             display_recipe_card(recipe)
     else:
         st.warning("No recipes found matching your criteria. Try adjusting your filters!")
 
-def filter_recipes(recipes_df, query, cuisine, difficulty, vegetarian, quick, healthy):
+def tokenize_search_text(text):
+    """Split text into lowercase alphanumeric search tokens"""
+    return SEARCH_TOKEN_PATTERN.findall(text.lower())
+
+def build_search_index(recipes_df):
+    """Map each name/cuisine/ingredient token to the ids of recipes containing it"""
+    search_index = {}
+    for recipe_id, name, cuisine, ingredients in zip(
+        recipes_df['id'], recipes_df['name'], recipes_df['cuisine'], recipes_df['ingredients']
+    ):
+        for token in tokenize_search_text(' '.join([name, cuisine, *ingredients])):
+            search_index.setdefault(token, set()).add(recipe_id)
+    return search_index
+
+def filter_recipes(recipes_df, query, cuisine, difficulty, vegetarian, quick, healthy, search_index=None):
     """Filter recipes based on various criteria"""
-    filtered = recipes_df.copy()
+    # Every criterion is AND-ed into a single boolean mask over precomputed columns
+    mask = np.ones(len(recipes_df), dtype=bool)
     
     # Text search
     if query:
         query_lower = query.lower()
-        filtered = filtered[
-            filtered['name'].str.lower().str.contains(query_lower, na=False) |
-            filtered['ingredients'].astype(str).str.lower().str.contains(query_lower, na=False) |
-            filtered['cuisine'].str.lower().str.contains(query_lower, na=False)
-        ]
+        if search_index and SEARCH_TOKEN_PATTERN.fullmatch(query_lower):
+            # A purely alphanumeric query can only match inside a single token, so checking
+            # it against the index vocabulary finds exactly the recipes a substring scan would
+            matching_ids = set().union(*(ids for token, ids in search_index.items() if query_lower in token))
+            mask &= recipes_df['id'].isin(matching_ids).values
+        else:
+            mask &= (
+                recipes_df['_name_lc'].str.contains(query_lower, regex=False).values |
+                recipes_df['_ingredients_joined_lc'].str.contains(query_lower, regex=False).values |
+                recipes_df['_cuisine_lc'].str.contains(query_lower, regex=False).values
+            )
     
     # Cuisine filter
     if cuisine != 'All':
-        filtered = filtered[filtered['cuisine'] == cuisine]
+        mask &= (recipes_df['cuisine'] == cuisine).values
     
     # Difficulty filter
     if difficulty != 'All':
-        filtered = filtered[filtered['difficulty'] == difficulty]
+        mask &= (recipes_df['difficulty'] == difficulty).values
     
     # Vegetarian filter
     if vegetarian:
-        filtered = filtered[filtered['dietary_tags'].astype(str).str.contains('vegetarian')]
+        vegetarian_bit = recipes_df.attrs['tag_bits'].get('vegetarian', 0)
+        mask &= (recipes_df['_tag_mask'].values & vegetarian_bit) != 0
     
     # Quick recipes filter
     if quick:
-        filtered = filtered[filtered['cooking_time'] < 30]
+        mask &= recipes_df['cooking_time'].values < 30
     
     # Healthy filter
     if healthy:
-        filtered = filtered[filtered['nutrition'].apply(lambda x: x['calories'] < 400)]
+        mask &= recipes_df['calories'].values < 400
     
-    return filtered
+    return recipes_df[mask]
 
 def display_recipe_card(recipe):
     """Display a recipe card with all details"""
@@ -488,13 +713,78 @@ def display_recipe_card(recipe):
         # Add to favorites
         if st.button(f"❤️ Add to Favorites", key=f"fav_{recipe['id']}"):
             if recipe['id'] not in st.session_state.user_preferences['favorite_recipes']:
-                st.session_state.user_preferences['favorite_recipes'].append(recipe['id'])
+                st.session_state.user_preferences['favorite_recipes'].add(recipe['id'])
                 st.success("Added to favorites!")
         
         st.markdown('</div>', unsafe_allow_html=True)
         st.divider()
 
-def image_to_recipe_tab(recipes_df, models):
+def image_to_pixel_values(image, device, dtype):
+    """Resize and normalize an image straight into a BLIP pixel_values tensor"""
+    import torch
+    
+    image = image.convert('RGB').resize((BLIP_IMAGE_SIZE, BLIP_IMAGE_SIZE), Image.Resampling.BICUBIC)
+    pixels = (np.asarray(image, dtype=np.float32) / 255.0 - BLIP_IMAGE_MEAN) / BLIP_IMAGE_STD
+    pixel_values = torch.from_numpy(np.ascontiguousarray(pixels.transpose(2, 0, 1))).unsqueeze(0)
+    
+    if device == 'cuda':
+        # Page-locked memory lets the host-to-device copy run asynchronously
+        pixel_values = pixel_values.pin_memory()
+    return pixel_values.to(device, dtype, non_blocking=True)
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def encode_image_features(image_key: str, _img_bytes: bytes, _models):
+    """Run the BLIP vision encoder once per image, keyed on a digest of its bytes"""
+    import torch
+    
+    image = Image.open(io.BytesIO(_img_bytes))
+    pixel_values = image_to_pixel_values(image, _models['device'], _models['dtype'])
+    with torch.inference_mode():
+        image_embeds = _models['image_model'].vision_model(pixel_values=pixel_values)[0]
+    
+    # Keep cached features on the CPU so the cache never pins GPU memory
+    return image_embeds.cpu()
+
+def generate_caption_ids(image_model, image_embeds, **generate_kwargs):
+    """Run BLIP's text decoder against precomputed vision encoder states"""
+    import torch
+    
+    # Mirrors BlipForConditionalGeneration.generate minus the vision forward pass
+    text_config = image_model.config.text_config
+    batch_size = image_embeds.shape[0]
+    input_ids = torch.full((batch_size, 1), text_config.bos_token_id, dtype=torch.long, device=image_embeds.device)
+    image_attention_mask = torch.ones(image_embeds.shape[:-1], dtype=torch.long, device=image_embeds.device)
+    
+    with torch.inference_mode():
+        return image_model.text_decoder.generate(
+            input_ids=input_ids,
+            eos_token_id=text_config.sep_token_id,
+            pad_token_id=text_config.pad_token_id,
+            encoder_hidden_states=image_embeds,
+            encoder_attention_mask=image_attention_mask,
+            **generate_kwargs
+        )
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def caption_image(img_bytes: bytes, _models, max_length: int = 50, num_beams: int = 1) -> str:
+    """Caption an uploaded image with BLIP, memoized on the raw image bytes"""
+    # Decoder settings can change without re-running the vision encoder
+    image_embeds = encode_image_features(hashlib.sha1(img_bytes).hexdigest(), img_bytes, _models)
+    out = generate_caption_ids(
+        _models['image_model'],
+        image_embeds.to(_models['device']),
+        max_length=max_length,
+        num_beams=num_beams
+    )
+    return _models['image_processor'].decode(out[0], skip_special_tokens=True)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def encode_query(text: str, _models) -> np.ndarray:
+    """Embed a search query, memoized on the query string"""
+    return smart_encode(_models['sentence_model'], [text])
+
+@fragment
+def image_to_recipe_tab(recipes_df, models, recipe_index):
     st.header("📸 Image to Recipe")
     st.write("Upload an image of ingredients and get recipe suggestions!")
     
@@ -513,60 +803,58 @@ def image_to_recipe_tab(recipes_df, models):
                 with st.spinner("Analyzing image..."):
                     # Use BLIP model to generate image description
                     try:
-                        inputs = models['image_processor'](image, return_tensors="pt")
-                        out = models['image_model'].generate(**inputs, max_length=50)
-                        description = models['image_processor'].decode(out[0], skip_special_tokens=True)
+                        description = caption_image(uploaded_file.getvalue(), models)
                         
                         st.write(f"**Detected:** {description}")
                         
                         # Find matching recipes based on description
-                        matching_recipes = find_recipes_by_description(recipes_df, description, models)
+                        matching_recipes = find_recipes_by_description(recipes_df, description, models, recipe_index)
                         
                         if len(matching_recipes) > 0:
                             st.subheader("Suggested Recipes:")
-                            for _, recipe in matching_recipes.head(3).iterrows():
+                            for recipe in matching_recipes.head(3).to_dict('records'):
                                 display_recipe_card(recipe)
                         else:
                             st.info("No specific recipes found, but here are some popular options:")
-                            for _, recipe in recipes_df.head(2).iterrows():
+                            for recipe in recipes_df.head(2).to_dict('records'):
                                 display_recipe_card(recipe)
                                 
                     except Exception as e:
                         st.error(f"Error analyzing image: {e}")
                         st.info("Here are some popular recipes instead:")
-                        for _, recipe in recipes_df.head(2).iterrows():
+                        for recipe in recipes_df.head(2).to_dict('records'):
                             display_recipe_card(recipe)
 
-def find_recipes_by_description(recipes_df, description, models):
+def find_recipes_by_description(recipes_df, description, models, recipe_index, k=3):
     """Find recipes that match the image description"""
-    if not ML_AVAILABLE or not models or 'sentence_model' not in models:
+    if not ML_AVAILABLE or not models or 'sentence_model' not in models or recipe_index is None:
         # ML not available - return random popular recipes
-        return recipes_df.head(3)
+        return recipes_df.head(k)
     
     try:
-        # Only use ML features if available
-        from sklearn.metrics.pairwise import cosine_similarity
-        
-        # Create embeddings for the description
-        desc_embedding = models['sentence_model'].encode([description])
+        # Only the query needs encoding; the recipe corpus is embedded once at load time
+        desc_embedding = encode_query(description, models)
+        index, corpus_embeddings = recipe_index
+        k = min(k, len(recipes_df))
         
-        # Create embeddings for recipe descriptions
-        recipe_descriptions = recipes_df['image_description'].tolist()
-        recipe_embeddings = models['sentence_model'].encode(recipe_descriptions)
+        if index is not None:
+            _, ids = index.search(desc_embedding.astype(np.float32), k)
+            return recipes_df.iloc[ids[0]]
         
-        # Calculate similarities
-        similarities = cosine_similarity(desc_embedding, recipe_embeddings)[0]
+        # Both sides are L2-normalized, so the dot product is the cosine similarity
+        similarities = corpus_embeddings @ desc_embedding.ravel()
         
-        # Add similarity scores and sort
-        recipes_with_scores = recipes_df.copy()
-        recipes_with_scores['similarity'] = similarities
+        # Partial sort for the top k in O(N), then order just those k
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
         
-        return recipes_with_scores.sort_values('similarity', ascending=False)
+        return recipes_df.iloc[top]
     
     except Exception as e:
         # If any error occurs, fall back to simple recipe list
-        return recipes_df.head(3)
+        return recipes_df.head(k)
 
+@fragment
 def substitution_tab(substitutions):
     st.header("🔄 Ingredient Substitution Engine")
     st.write("Missing an ingredient? Find suitable alternatives!")
@@ -618,6 +906,7 @@ def get_general_substitutions(ingredient, reason):
     
     return ["Consult a nutrition expert for specific substitutions"]
 
+@fragment
 def nutrition_analysis_tab(recipes_df):
     st.header("📊 Nutrition Analysis")
     
@@ -653,22 +942,14 @@ def nutrition_analysis_tab(recipes_df):
         
         with col2:
             # Macronutrient pie chart
-            macros = {
-                'Protein': nutrition['protein'] * 4,  # 4 calories per gram
-                'Carbs': nutrition['carbs'] * 4,
-                'Fat': nutrition['fat'] * 9  # 9 calories per gram
-            }
-            
-            fig = px.pie(
-                values=list(macros.values()),
-                names=list(macros.keys()),
-                title="Macronutrient Distribution (by calories)"
+            fig = macro_pie_chart(
+                int(recipe['id']), int(nutrition['protein']), int(nutrition['carbs']), int(nutrition['fat'])
             )
             st.plotly_chart(fig, use_container_width=True)
         
         # Health assessment
         st.subheader("Health Assessment")
-        assess_recipe_health(nutrition, recipe['health_conditions'])
+        assess_recipe_health(recipe['_health_flags'], recipe['health_conditions'])
         
         # Scaling calculator
         st.subheader("Portion Scaling")
@@ -682,38 +963,39 @@ def nutrition_analysis_tab(recipes_df):
         if new_servings != recipe['servings']:
             scale_factor = new_servings / recipe['servings']
             st.write("**Scaled Nutrition (per total recipe):**")
-            for nutrient, value in nutrition.items():
-                if isinstance(value, (int, float)):
-                    scaled_value = value * scale_factor
-                    st.write(f"{nutrient.capitalize()}: {scaled_value:.1f}")
+            scaled_values = recipe[list(NUTRIENT_COLUMNS)].to_numpy(dtype=np.float64) * scale_factor
+            for nutrient, scaled_value in zip(NUTRIENT_COLUMNS, scaled_values):
+                st.write(f"{nutrient.capitalize()}: {scaled_value:.1f}")
 
-def assess_recipe_health(nutrition, health_conditions):
-    """Assess recipe health based on nutritional content"""
-    assessment = []
-    
-    # Calorie assessment
-    if nutrition['calories'] < 300:
-        assessment.append("✅ Low calorie")
-    elif nutrition['calories'] > 500:
-        assessment.append("⚠️ High calorie")
-    else:
-        assessment.append("✅ Moderate calorie")
+@st.cache_data(max_entries=128)
+def macro_pie_chart(recipe_id: int, protein: int, carbs: int, fat: int) -> go.Figure:
+    """Build the macronutrient pie for a recipe, cached on its id and macros"""
+    macros = {
+        'Protein': protein * 4,  # 4 calories per gram
+        'Carbs': carbs * 4,
+        'Fat': fat * 9  # 9 calories per gram
+    }
     
-    # Protein assessment
-    if nutrition['protein'] > 20:
-        assessment.append("✅ High protein")
-    elif nutrition['protein'] < 10:
-        assessment.append("⚠️ Low protein")
+    return px.pie(
+        values=list(macros.values()),
+        names=list(macros.keys()),
+        title="Macronutrient Distribution (by calories)"
+    )
+
+def assess_health_flags(calories, protein, sodium, fiber):
+    """Compute health assessment bit flags for one recipe or whole nutrient columns"""
+    calories, protein, sodium, fiber = (np.asarray(v) for v in (calories, protein, sodium, fiber))
     
-    # Sodium assessment
-    if nutrition['sodium'] < 300:
-        assessment.append("✅ Low sodium")
-    elif nutrition['sodium'] > 600:
-        assessment.append("⚠️ High sodium")
+    flags = np.where(calories < 300, LOW_CALORIE, np.where(calories > 500, HIGH_CALORIE, MODERATE_CALORIE))
+    flags |= np.where(protein > 20, HIGH_PROTEIN, np.where(protein < 10, LOW_PROTEIN, 0))
+    flags |= np.where(sodium < 300, LOW_SODIUM, np.where(sodium > 600, HIGH_SODIUM, 0))
+    flags |= np.where(fiber > 8, HIGH_FIBER, 0)
     
-    # Fiber assessment
-    if nutrition['fiber'] > 8:
-        assessment.append("✅ High fiber")
+    return flags.astype(np.uint8)
+
+def assess_recipe_health(health_flags, health_conditions):
+    """Assess recipe health based on nutritional content"""
+    assessment = [message for flag, message in HEALTH_FLAG_MESSAGES if health_flags & flag]
     
     # Health condition compatibility
     if 'diabetes-friendly' in health_conditions:
@@ -726,6 +1008,7 @@ def assess_recipe_health(nutrition, health_conditions):
     for item in assessment:
         st.write(item)
 
+@fragment
 def voice_assistant_tab():
     st.header("🗣️ Voice Assistant")
     st.write("Hands-free cooking guidance with voice commands!")
@@ -759,6 +1042,7 @@ def voice_assistant_tab():
             st.audio("data:audio/wav;base64,UklGRnoGAABXQVZFZm10IBAAAAABA==")  # Placeholder
             st.success("Speaking...")
 
+@fragment
 def cooking_mode_tab(recipes_df):
     st.header("👨‍🍳 Interactive Cooking Mode")
     
@@ -775,56 +1059,62 @@ def cooking_mode_tab(recipes_df):
             st.rerun()
     
     else:
-        recipe = st.session_state.current_recipe
-        current_step = st.session_state.current_step
+        cooking_step_panel(st.session_state.current_recipe)
+
+def advance_cooking_step(delta):
+    """Move the cooking step pointer, never before the first step"""
+    st.session_state.current_step = max(st.session_state.current_step + delta, 0)
+
+@fragment
+def cooking_step_panel(recipe):
+    # Step buttons update session state in on_click callbacks, which run before
+    # the fragment re-executes, so stepping needs no full-app st.rerun()
+    current_step = st.session_state.current_step
+    
+    st.subheader(f"Cooking: {recipe['name']}")
+    
+    # Progress bar
+    progress = (current_step + 1) / len(recipe['instructions'])
+    st.progress(min(progress, 1.0))
+    st.write(f"Step {current_step + 1} of {len(recipe['instructions'])}")
+    
+    # Current step
+    if current_step < len(recipe['instructions']):
+        st.markdown(f"### Current Step:")
+        st.markdown(f"**{recipe['instructions'][current_step]}**")
         
-        st.subheader(f"Cooking: {recipe['name']}")
+        # Timer functionality
+        col1, col2, col3 = st.columns([1, 1, 1])
         
-        # Progress bar
-        progress = (current_step + 1) / len(recipe['instructions'])
-        st.progress(progress)
-        st.write(f"Step {current_step + 1} of {len(recipe['instructions'])}")
+        with col1:
+            st.button("⏮️ Previous Step", on_click=advance_cooking_step, args=(-1,))
         
-        # Current step
-        if current_step < len(recipe['instructions']):
-            st.markdown(f"### Current Step:")
-            st.markdown(f"**{recipe['instructions'][current_step]}**")
-            
-            # Timer functionality
-            col1, col2, col3 = st.columns([1, 1, 1])
-            
-            with col1:
-                if st.button("⏮️ Previous Step") and current_step > 0:
-                    st.session_state.current_step -= 1
-                    st.rerun()
-            
-            with col2:
-                if st.button("🔊 Repeat Step"):
-                    st.info(f"Repeating: {recipe['instructions'][current_step]}")
-            
-            with col3:
-                if st.button("⏭️ Next Step"):
-                    st.session_state.current_step += 1
-                    st.rerun()
-            
-            # Timer
-            st.subheader("Timer")
-            timer_minutes = st.number_input("Set timer (minutes):", min_value=1, max_value=60, value=5)
-            if st.button("⏰ Start Timer"):
-                st.success(f"Timer set for {timer_minutes} minutes!")
+        with col2:
+            if st.button("🔊 Repeat Step"):
+                st.info(f"Repeating: {recipe['instructions'][current_step]}")
         
-        else:
-            st.success("🎉 Cooking Complete!")
-            st.balloons()
-            
-            if st.button("Rate This Recipe"):
-                rating = st.slider("Rating (1-5 stars):", 1, 5, 5)
-                st.success(f"Thank you for rating! You gave {rating} stars.")
-            
-            if st.button("Exit Cooking Mode"):
-                st.session_state.cooking_mode = False
-                st.session_state.current_step = 0
-                st.rerun()
+        with col3:
+            st.button("⏭️ Next Step", on_click=advance_cooking_step, args=(1,))
+        
+        # Timer
+        st.subheader("Timer")
+        timer_minutes = st.number_input("Set timer (minutes):", min_value=1, max_value=60, value=5)
+        if st.button("⏰ Start Timer"):
+            st.success(f"Timer set for {timer_minutes} minutes!")
+    
+    else:
+        st.success("🎉 Cooking Complete!")
+        st.balloons()
+        
+        if st.button("Rate This Recipe"):
+            rating = st.slider("Rating (1-5 stars):", 1, 5, 5)
+            st.success(f"Thank you for rating! You gave {rating} stars.")
+        
+        # Leaving cooking mode changes the whole tab, so this one still reruns the app
+        if st.button("Exit Cooking Mode"):
+            st.session_state.cooking_mode = False
+            st.session_state.current_step = 0
+            st.rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,60 +1,132 @@
+import os
 import json
-from datetime import datetime, timedelta
+import gzip
+import functools
+from datetime import date, datetime, timedelta
+from pathlib import Path
 import random
+import numpy as np
+from types import MappingProxyType
+from typing import NamedTuple, Optional
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Memoize with Streamlit's caches when running inside the app, plain lru_cache otherwise
+try:
+    import streamlit as st
+    _cache_data = st.cache_data(ttl=3600, show_spinner=False)
+    _cache_resource = st.cache_resource(show_spinner=False)
+except ImportError:
+    _cache_data = _cache_resource = functools.lru_cache(maxsize=None)
+
+# Written at build time by running this module directly
+DEMO_DATA_PATH = Path(__file__).with_name("demo_data.json.gz")
+
+# Static lookup tables, built once at import
+SEASONAL_INGREDIENTS = MappingProxyType({
+    "winter": ("root vegetables", "citrus fruits", "hearty greens", "squash"),
+    "spring": ("asparagus", "peas", "fresh herbs", "strawberries"),
+    "summer": ("tomatoes", "zucchini", "berries", "stone fruits"),
+    "fall": ("apples", "pumpkin", "brussels sprouts", "cranberries")
+})
+
+# Meteorological seasons: Dec-Feb winter, Mar-May spring, and so on
+_SEASONS = ("winter", "spring", "summer", "fall")
+
+_TRENDING = (
+    MappingProxyType({"recipe_id": 1, "name": "Mediterranean Quinoa Bowl", "trend_score": 95}),
+    MappingProxyType({"recipe_id": 3, "name": "Vegetable Stir Fry", "trend_score": 88}),
+    MappingProxyType({"recipe_id": 6, "name": "Avocado Toast with Egg", "trend_score": 82}),
+    MappingProxyType({"recipe_id": 10, "name": "Black Bean Tacos", "trend_score": 79}),
+    MappingProxyType({"recipe_id": 5, "name": "Baked Salmon with Dill", "trend_score": 75})
+)
+
+REGIONAL_DATA = MappingProxyType({
+    "North America": (
+        MappingProxyType({"recipe_id": 2, "name": "Grilled Chicken with Herbs"}),
+        MappingProxyType({"recipe_id": 6, "name": "Avocado Toast with Egg"}),
+        MappingProxyType({"recipe_id": 10, "name": "Black Bean Tacos"})
+    ),
+    "Mediterranean": (
+        MappingProxyType({"recipe_id": 1, "name": "Mediterranean Quinoa Bowl"}),
+        MappingProxyType({"recipe_id": 8, "name": "Greek Salad"})
+    ),
+    "Asian": (
+        MappingProxyType({"recipe_id": 3, "name": "Vegetable Stir Fry"}),
+        MappingProxyType({"recipe_id": 7, "name": "Thai Green Curry"})
+    ),
+    "European": (
+        MappingProxyType({"recipe_id": 9, "name": "Mushroom Risotto"}),
+        MappingProxyType({"recipe_id": 5, "name": "Baked Salmon with Dill"})
+    )
+})
+
+BUDGET_MEALS = MappingProxyType({
+    "low": (
+        MappingProxyType({"recipe_id": 3, "name": "Vegetable Stir Fry", "estimated_cost": 8}),
+        MappingProxyType({"recipe_id": 4, "name": "Lentil Curry", "estimated_cost": 6}),
+        MappingProxyType({"recipe_id": 10, "name": "Black Bean Tacos", "estimated_cost": 7})
+    ),
+    "medium": (
+        MappingProxyType({"recipe_id": 1, "name": "Mediterranean Quinoa Bowl", "estimated_cost": 12}),
+        MappingProxyType({"recipe_id": 6, "name": "Avocado Toast with Egg", "estimated_cost": 10}),
+        MappingProxyType({"recipe_id": 8, "name": "Greek Salad", "estimated_cost": 11})
+    ),
+    "high": (
+        MappingProxyType({"recipe_id": 5, "name": "Baked Salmon with Dill", "estimated_cost": 18}),
+        MappingProxyType({"recipe_id": 7, "name": "Thai Green Curry", "estimated_cost": 16}),
+        MappingProxyType({"recipe_id": 9, "name": "Mushroom Risotto", "estimated_cost": 15})
+    )
+})
+
+class Interaction(NamedTuple):
+    user_id: str
+    recipe_id: int
+    interaction_type: str
+    timestamp: str
+    rating: Optional[int]
+
+class InventoryItem(NamedTuple):
+    name: str
+    quantity: int
+    unit: str
+    expiry: str
+    expiry_ordinal: int
+
+    @classmethod
+    def create(cls, name, quantity, unit, expiry):
+        """Build an item, parsing its ISO expiry date once"""
+        return cls(name, quantity, unit, expiry, date.fromisoformat(expiry).toordinal())
+
+# Demo user history as (recipe_id, days_ago, rating)
+_INTERACTION_SPEC = ((1, 5, 5), (3, 3, 4))
+
+@_cache_data
 def generate_demo_data():
     """Generate demo data for the cooking assistant"""
     
-    # Sample user interactions for demo
-    demo_interactions = [
-        {
-            "user_id": "demo_user_1",
-            "recipe_id": 1,
-            "interaction_type": "view",
-            "timestamp": (datetime.now() - timedelta(days=5)).isoformat(),
-            "rating": None
-        },
-        {
-            "user_id": "demo_user_1", 
-            "recipe_id": 1,
-            "interaction_type": "cook",
-            "timestamp": (datetime.now() - timedelta(days=5)).isoformat(),
-            "rating": None
-        },
-        {
-            "user_id": "demo_user_1",
-            "recipe_id": 1,
-            "interaction_type": "rate",
-            "timestamp": (datetime.now() - timedelta(days=5)).isoformat(),
-            "rating": 5
-        },
-        {
-            "user_id": "demo_user_1",
-            "recipe_id": 3,
-            "interaction_type": "view",
-            "timestamp": (datetime.now() - timedelta(days=3)).isoformat(),
-            "rating": None
-        },
-        {
-            "user_id": "demo_user_1",
-            "recipe_id": 3,
-            "interaction_type": "cook",
-            "timestamp": (datetime.now() - timedelta(days=3)).isoformat(),
-            "rating": None
-        },
-        {
-            "user_id": "demo_user_1",
-            "recipe_id": 3,
-            "interaction_type": "rate",
-            "timestamp": (datetime.now() - timedelta(days=3)).isoformat(),
-            "rating": 4
-        }
-    ]
+    # Read the clock once so every timestamp in the snapshot agrees
+    now = datetime.now()
+    five_days_ago = (now - timedelta(days=5)).isoformat()
+    
+    # Sample user interactions for demo: view, cook, then rate each recipe
+    demo_interactions = []
+    for recipe_id, days_ago, rating in _INTERACTION_SPEC:
+        timestamp = (now - timedelta(days=days_ago)).isoformat()
+        demo_interactions.extend(
+            Interaction("demo_user_1", recipe_id, interaction_type, timestamp,
+                        rating if interaction_type == "rate" else None)
+            for interaction_type in ("view", "cook", "rate")
+        )
     
     # Sample meal plans
     demo_meal_plans = [
         {
-            "date": datetime.now().strftime("%Y-%m-%d"),
+            "date": now.strftime("%Y-%m-%d"),
             "meals": {
                 "breakfast": {
                     "recipe_id": 6,
@@ -85,7 +157,7 @@ def generate_demo_data():
             "description": "Congratulations on cooking your first recipe",
             "icon": "🍳",
             "unlocked": True,
-            "unlock_date": (datetime.now() - timedelta(days=5)).isoformat()
+            "unlock_date": five_days_ago
         },
         {
             "achievement_id": "vegetarian_week",
@@ -110,102 +182,122 @@ def generate_demo_data():
     # Sample ingredient inventory
     demo_inventory = {
         "vegetables": [
-            {"name": "tomatoes", "quantity": 4, "unit": "pieces", "expiry": "2024-01-15"},
-            {"name": "onion", "quantity": 2, "unit": "pieces", "expiry": "2024-01-20"},
-            {"name": "bell peppers", "quantity": 3, "unit": "pieces", "expiry": "2024-01-12"},
-            {"name": "spinach", "quantity": 1, "unit": "bag", "expiry": "2024-01-10"}
+            InventoryItem.create("tomatoes", 4, "pieces", "2024-01-15"),
+            InventoryItem.create("onion", 2, "pieces", "2024-01-20"),
+            InventoryItem.create("bell peppers", 3, "pieces", "2024-01-12"),
+            InventoryItem.create("spinach", 1, "bag", "2024-01-10")
         ],
         "proteins": [
-            {"name": "chicken breast", "quantity": 2, "unit": "lbs", "expiry": "2024-01-08"},
-            {"name": "salmon fillet", "quantity": 4, "unit": "pieces", "expiry": "2024-01-09"},
-            {"name": "eggs", "quantity": 12, "unit": "pieces", "expiry": "2024-01-18"}
+            InventoryItem.create("chicken breast", 2, "lbs", "2024-01-08"),
+            InventoryItem.create("salmon fillet", 4, "pieces", "2024-01-09"),
+            InventoryItem.create("eggs", 12, "pieces", "2024-01-18")
         ],
         "pantry": [
-            {"name": "quinoa", "quantity": 2, "unit": "cups", "expiry": "2024-06-01"},
-            {"name": "olive oil", "quantity": 1, "unit": "bottle", "expiry": "2024-12-01"},
-            {"name": "garlic", "quantity": 1, "unit": "bulb", "expiry": "2024-02-01"}
+            InventoryItem.create("quinoa", 2, "cups", "2024-06-01"),
+            InventoryItem.create("olive oil", 1, "bottle", "2024-12-01"),
+            InventoryItem.create("garlic", 1, "bulb", "2024-02-01")
         ]
     }
     
     # Sample seasonal ingredients
-    current_month = datetime.now().month
-    seasonal_ingredients = {
-        "winter": ["root vegetables", "citrus fruits", "hearty greens", "squash"],
-        "spring": ["asparagus", "peas", "fresh herbs", "strawberries"],
-        "summer": ["tomatoes", "zucchini", "berries", "stone fruits"],
-        "fall": ["apples", "pumpkin", "brussels sprouts", "cranberries"]
-    }
-    
-    season = ["winter", "winter", "spring", "spring", "spring", "summer", "summer", 
-              "summer", "fall", "fall", "fall", "winter"][current_month - 1]
+    current_month = now.month
+    season = _SEASONS[(current_month % 12) // 3]
     
     demo_data = {
         "user_interactions": demo_interactions,
         "meal_plans": demo_meal_plans, 
         "achievements": demo_achievements,
         "inventory": demo_inventory,
-        "seasonal_ingredients": seasonal_ingredients[season],
+        "seasonal_ingredients": list(SEASONAL_INGREDIENTS[season]),
         "current_season": season,
-        "generated_at": datetime.now().isoformat()
+        "generated_at": now.isoformat()
     }
     
     return demo_data
 
+@_cache_resource
+def load_demo_data():
+    """Load the prebuilt demo data artifact, generating it if the build step didn't run"""
+    if DEMO_DATA_PATH.exists():
+        return loads_demo_data(gzip.decompress(DEMO_DATA_PATH.read_bytes()))
+    return generate_demo_data()
+
+def _record_as_dict(obj):
+    if hasattr(obj, "_asdict"):
+        return obj._asdict()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def dumps_demo_data(demo_data):
+    """Serialize demo data to compact JSON bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(demo_data, default=_record_as_dict)
+    # Stdlib json would write the NamedTuple records as bare lists
+    demo_data = dict(
+        demo_data,
+        user_interactions=[record._asdict() for record in demo_data["user_interactions"]],
+        inventory={category: [item._asdict() for item in items]
+                   for category, items in demo_data["inventory"].items()}
+    )
+    return json.dumps(demo_data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def write_demo_data(demo_data, path=DEMO_DATA_PATH):
+    """Write the gzipped demo data artifact with a single unbuffered write"""
+    payload = gzip.compress(dumps_demo_data(demo_data))
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(payload)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+def loads_demo_data(payload):
+    """Parse demo data from JSON bytes, rebuilding the typed records"""
+    demo_data = orjson.loads(payload) if ORJSON_AVAILABLE else json.loads(payload)
+    demo_data["user_interactions"] = [Interaction(**record) for record in demo_data["user_interactions"]]
+    demo_data["inventory"] = {category: [InventoryItem(**item) for item in items]
+                              for category, items in demo_data["inventory"].items()}
+    return demo_data
+
+def inventory_columns(inventory):
+    """Flatten the per-category inventory into parallel numpy columns"""
+    categories, items = [], []
+    for category, category_items in inventory.items():
+        categories.extend([category] * len(category_items))
+        items.extend(category_items)
+    return {
+        "name": np.array([item.name for item in items], dtype=object),
+        "quantity": np.array([item.quantity for item in items], dtype=np.int32),
+        "unit": np.array([item.unit for item in items], dtype=object),
+        "expiry_ordinal": np.array([item.expiry_ordinal for item in items], dtype=np.int32),
+        "category": np.array(categories, dtype=object)
+    }
+
+@_cache_resource
+def load_inventory_columns():
+    """Columnar view of the demo inventory, kept out of the JSON artifact"""
+    return inventory_columns(load_demo_data()["inventory"])
+
+def items_expiring_within(days, inventory=None):
+    """Get the inventory rows that expire within the given number of days"""
+    columns = load_inventory_columns() if inventory is None else inventory_columns(inventory)
+    today = date.today().toordinal()
+    expiring = np.flatnonzero(columns["expiry_ordinal"] - today <= days)
+    return {key: column[expiring] for key, column in columns.items()}
+
 def get_trending_recipes():
     """Get sample trending recipes data"""
-    return [
-        {"recipe_id": 1, "name": "Mediterranean Quinoa Bowl", "trend_score": 95},
-        {"recipe_id": 3, "name": "Vegetable Stir Fry", "trend_score": 88},
-        {"recipe_id": 6, "name": "Avocado Toast with Egg", "trend_score": 82},
-        {"recipe_id": 10, "name": "Black Bean Tacos", "trend_score": 79},
-        {"recipe_id": 5, "name": "Baked Salmon with Dill", "trend_score": 75}
-    ]
+    return _TRENDING
 
+@functools.lru_cache(maxsize=32)
 def get_regional_recipes(region="North America"):
     """Get sample regional recipes"""
-    regional_data = {
-        "North America": [
-            {"recipe_id": 2, "name": "Grilled Chicken with Herbs"},
-            {"recipe_id": 6, "name": "Avocado Toast with Egg"},
-            {"recipe_id": 10, "name": "Black Bean Tacos"}
-        ],
-        "Mediterranean": [
-            {"recipe_id": 1, "name": "Mediterranean Quinoa Bowl"},
-            {"recipe_id": 8, "name": "Greek Salad"}
-        ],
-        "Asian": [
-            {"recipe_id": 3, "name": "Vegetable Stir Fry"},
-            {"recipe_id": 7, "name": "Thai Green Curry"}
-        ],
-        "European": [
-            {"recipe_id": 9, "name": "Mushroom Risotto"},
-            {"recipe_id": 5, "name": "Baked Salmon with Dill"}
-        ]
-    }
-    
-    return regional_data.get(region, regional_data["North America"])
+    return REGIONAL_DATA.get(region, REGIONAL_DATA["North America"])
 
+@functools.lru_cache(maxsize=32)
 def get_budget_meal_suggestions(budget_level="medium"):
     """Get budget-appropriate meal suggestions"""
-    budget_meals = {
-        "low": [
-            {"recipe_id": 3, "name": "Vegetable Stir Fry", "estimated_cost": 8},
-            {"recipe_id": 4, "name": "Lentil Curry", "estimated_cost": 6},
-            {"recipe_id": 10, "name": "Black Bean Tacos", "estimated_cost": 7}
-        ],
-        "medium": [
-            {"recipe_id": 1, "name": "Mediterranean Quinoa Bowl", "estimated_cost": 12},
-            {"recipe_id": 6, "name": "Avocado Toast with Egg", "estimated_cost": 10},
-            {"recipe_id": 8, "name": "Greek Salad", "estimated_cost": 11}
-        ],
-        "high": [
-            {"recipe_id": 5, "name": "Baked Salmon with Dill", "estimated_cost": 18},
-            {"recipe_id": 7, "name": "Thai Green Curry", "estimated_cost": 16},
-            {"recipe_id": 9, "name": "Mushroom Risotto", "estimated_cost": 15}
-        ]
-    }
-    
-    return budget_meals.get(budget_level, budget_meals["medium"])
+    return BUDGET_MEALS.get(budget_level, BUDGET_MEALS["medium"])
 
 # Sample cooking tips database
 cooking_tips = {
@@ -244,11 +336,10 @@ food_safety_tips = [
 ]
 
 if __name__ == "__main__":
-    # Generate and save demo data
+    # Build step: generate once and save the artifact next to this module
     demo_data = generate_demo_data()
     
-    with open("demo_data.json", "w") as f:
-        json.dump(demo_data, f, indent=2)
+    write_demo_data(demo_data)
     
     print("Demo data generated successfully!")
     print(f"Generated data for {len(demo_data['user_interactions'])} interactions")
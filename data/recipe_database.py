@@ -1,328 +1,85 @@
 import json
+import functools
+import sys
+import time
+import numpy as np
 import pandas as pd
+from collections import defaultdict
 from datetime import datetime
+from pathlib import Path
+
+# Recipe catalogue, kept as data so importing this module doesn't build it
+RECIPES_PATH = Path(__file__).with_name('recipes.json')
 
 class RecipeDatabase:
     """Extended recipe database with more recipes and functionality"""
     
+    # Criteria matched by equality, and list criteria matched if any value overlaps
+    _scalar_fields = ('cuisine', 'difficulty', 'season')
+    _list_fields = ('dietary_tags', 'health_conditions')
+    _nutrients = ('calories', 'protein', 'carbs', 'fat', 'fiber', 'sodium')
+    
     def __init__(self):
         self.recipes = self.load_extended_recipes()
         self.substitutions = self.load_substitutions()
         self.user_interactions = []
+        self._interactions_by_user = defaultdict(list)
+        self._by_id = {recipe['id']: recipe for recipe in self.recipes}
+        self._build_indexes()
+        # Per-instance cache of criteria key -> matching positions; the recipes
+        # are static, but call self._filter_cached.cache_clear() if that changes
+        self._filter_cached = functools.lru_cache(maxsize=256)(self._filter_positions)
+        self.get_substitutes = functools.lru_cache(maxsize=256)(self._lookup_substitutes)
+    
+    def _build_indexes(self):
+        """Build the columnar recipe frame and the tag/condition indexes"""
+        # Scalar criteria are vectorized comparisons on this frame
+        self.df = pd.DataFrame(self.recipes)
+        
+        # List-valued fields would need a per-row Python test on the frame, so
+        # index them as value -> recipe positions and turn hits into a mask
+        self._index = {field: defaultdict(set) for field in self._list_fields}
+        for i, recipe in enumerate(self.recipes):
+            for field in self._list_fields:
+                for value in recipe.get(field, ()):
+                    self._index[field][value].add(i)
+        
+        # Small-int cuisine ids and a uint64 tag bitmask per recipe for
+        # vectorized recommendation scoring
+        self._cuisine_vocab = {c: i for i, c in enumerate(dict.fromkeys(r['cuisine'] for r in self.recipes))}
+        self._cuisine_id = np.array([self._cuisine_vocab[r['cuisine']] for r in self.recipes], dtype=np.int16)
+        self._tag_vocab = {t: i for i, t in enumerate(sorted({t for r in self.recipes for t in r['dietary_tags']}))}
+        if len(self._tag_vocab) > 64:
+            raise ValueError("Recipe tag bitmask supports at most 64 distinct dietary tags")
+        self._tag_bits = np.array(
+            [sum(1 << self._tag_vocab[t] for t in r['dietary_tags']) for r in self.recipes], dtype=np.uint64
+        )
+        
+        # One contiguous array per nutrient for vectorized range queries
+        self._nut = {
+            nutrient: np.array([recipe['nutrition'][nutrient] for recipe in self.recipes], dtype=np.float32)
+            for nutrient in self._nutrients
+        }
     
     def load_extended_recipes(self):
         """Load comprehensive recipe database"""
-        return [
-            {
-                'id': 1,
-                'name': 'Mediterranean Quinoa Bowl',
-                'cuisine': 'Mediterranean',
-                'ingredients': ['quinoa', 'chickpeas', 'cucumber', 'tomatoes', 'olives', 'feta cheese', 'olive oil', 'lemon'],
-                'instructions': [
-                    'Cook quinoa according to package directions',
-                    'Drain and rinse chickpeas',
-                    'Chop cucumber and tomatoes',
-                    'Combine all ingredients in a bowl',
-                    'Drizzle with olive oil and lemon juice',
-                    'Season with salt and pepper'
-                ],
-                'cooking_time': 25,
-                'difficulty': 'Easy',
-                'servings': 2,
-                'nutrition': {
-                    'calories': 420,
-                    'protein': 18,
-                    'carbs': 58,
-                    'fat': 14,
-                    'fiber': 12,
-                    'sodium': 380
-                },
-                'dietary_tags': ['vegetarian', 'gluten-free', 'high-protein'],
-                'health_conditions': ['diabetes-friendly', 'heart-healthy', 'weight-loss'],
-                'image_description': 'colorful quinoa bowl with vegetables',
-                'season': 'all',
-                'budget_level': 'medium'
-            },
-            {
-                'id': 2,
-                'name': 'Grilled Chicken with Herbs',
-                'cuisine': 'American',
-                'ingredients': ['chicken breast', 'rosemary', 'thyme', 'garlic', 'olive oil', 'lemon', 'salt', 'pepper'],
-                'instructions': [
-                    'Marinate chicken with herbs and olive oil for 30 minutes',
-                    'Preheat grill to medium-high heat',
-                    'Grill chicken for 6-7 minutes per side',
-                    'Check internal temperature reaches 165°F',
-                    'Let rest for 5 minutes before serving',
-                    'Garnish with fresh herbs'
-                ],
-                'cooking_time': 45,
-                'difficulty': 'Medium',
-                'servings': 4,
-                'nutrition': {
-                    'calories': 285,
-                    'protein': 35,
-                    'carbs': 2,
-                    'fat': 14,
-                    'fiber': 0,
-                    'sodium': 220
-                },
-                'dietary_tags': ['high-protein', 'low-carb', 'keto-friendly'],
-                'health_conditions': ['diabetes-friendly', 'weight-loss', 'low-sodium'],
-                'image_description': 'grilled chicken breast with herbs',
-                'season': 'summer',
-                'budget_level': 'medium'
-            },
-            {
-                'id': 3,
-                'name': 'Vegetable Stir Fry',
-                'cuisine': 'Asian',
-                'ingredients': ['broccoli', 'bell peppers', 'carrots', 'snap peas', 'ginger', 'garlic', 'soy sauce', 'sesame oil'],
-                'instructions': [
-                    'Heat oil in a large wok or pan',
-                    'Add ginger and garlic, stir for 30 seconds',
-                    'Add harder vegetables first (carrots, broccoli)',
-                    'Stir-fry for 3-4 minutes',
-                    'Add softer vegetables (peppers, snap peas)',
-                    'Add soy sauce and sesame oil',
-                    'Stir-fry for 2-3 more minutes until tender-crisp'
-                ],
-                'cooking_time': 15,
-                'difficulty': 'Easy',
-                'servings': 3,
-                'nutrition': {
-                    'calories': 120,
-                    'protein': 5,
-                    'carbs': 18,
-                    'fat': 4,
-                    'fiber': 6,
-                    'sodium': 580
-                },
-                'dietary_tags': ['vegetarian', 'vegan', 'low-calorie'],
-                'health_conditions': ['diabetes-friendly', 'heart-healthy', 'weight-loss'],
-                'image_description': 'colorful vegetable stir fry in wok',
-                'season': 'all',
-                'budget_level': 'low'
-            },
-            {
-                'id': 4,
-                'name': 'Spicy Lentil Curry',
-                'cuisine': 'Indian',
-                'ingredients': ['red lentils', 'onion', 'tomatoes', 'ginger', 'garlic', 'turmeric', 'cumin', 'coriander', 'coconut milk', 'chili'],
-                'instructions': [
-                    'Rinse lentils and set aside',
-                    'Heat oil and sauté onions until golden',
-                    'Add ginger, garlic, and spices',
-                    'Add tomatoes and cook until soft',
-                    'Add lentils and water, bring to boil',
-                    'Simmer for 20-25 minutes until lentils are soft',
-                    'Stir in coconut milk and chili, simmer 5 more minutes'
-                ],
-                'cooking_time': 40,
-                'difficulty': 'Medium',
-                'servings': 4,
-                'nutrition': {
-                    'calories': 245,
-                    'protein': 12,
-                    'carbs': 35,
-                    'fat': 8,
-                    'fiber': 14,
-                    'sodium': 240
-                },
-                'dietary_tags': ['vegetarian', 'vegan', 'high-fiber', 'high-protein', 'spicy'],
-                'health_conditions': ['diabetes-friendly', 'heart-healthy'],
-                'image_description': 'creamy red lentil curry with spices',
-                'season': 'winter',
-                'budget_level': 'low'
-            },
-            {
-                'id': 5,
-                'name': 'Baked Salmon with Dill',
-                'cuisine': 'Scandinavian',
-                'ingredients': ['salmon fillet', 'dill', 'lemon', 'olive oil', 'garlic', 'salt', 'pepper'],
-                'instructions': [
-                    'Preheat oven to 400°F',
-                    'Place salmon on parchment-lined baking sheet',
-                    'Drizzle with olive oil and lemon juice',
-                    'Season with salt, pepper, and minced garlic',
-                    'Top with fresh dill',
-                    'Bake for 12-15 minutes until fish flakes easily'
-                ],
-                'cooking_time': 20,
-                'difficulty': 'Easy',
-                'servings': 2,
-                'nutrition': {
-                    'calories': 367,
-                    'protein': 39,
-                    'carbs': 1,
-                    'fat': 22,
-                    'fiber': 0,
-                    'sodium': 180
-                },
-                'dietary_tags': ['high-protein', 'low-carb', 'omega-3-rich', 'keto-friendly'],
-                'health_conditions': ['heart-healthy', 'low-sodium'],
-                'image_description': 'baked salmon fillet with dill and lemon',
-                'season': 'all',
-                'budget_level': 'high'
-            },
-            {
-                'id': 6,
-                'name': 'Avocado Toast with Egg',
-                'cuisine': 'American',
-                'ingredients': ['whole grain bread', 'avocado', 'egg', 'lime', 'salt', 'pepper', 'red pepper flakes'],
-                'instructions': [
-                    'Toast bread until golden brown',
-                    'Mash avocado with lime juice, salt, and pepper',
-                    'Fry or poach egg to desired doneness',
-                    'Spread avocado mixture on toast',
-                    'Top with egg',
-                    'Sprinkle with red pepper flakes'
-                ],
-                'cooking_time': 10,
-                'difficulty': 'Easy',
-                'servings': 1,
-                'nutrition': {
-                    'calories': 340,
-                    'protein': 14,
-                    'carbs': 28,
-                    'fat': 22,
-                    'fiber': 12,
-                    'sodium': 320
-                },
-                'dietary_tags': ['vegetarian', 'high-fiber', 'healthy-fats'],
-                'health_conditions': ['heart-healthy', 'weight-loss'],
-                'image_description': 'avocado toast topped with fried egg',
-                'season': 'all',
-                'budget_level': 'medium'
-            },
-            {
-                'id': 7,
-                'name': 'Thai Green Curry',
-                'cuisine': 'Thai',
-                'ingredients': ['chicken breast', 'green curry paste', 'coconut milk', 'thai basil', 'eggplant', 'bamboo shoots', 'fish sauce', 'palm sugar'],
-                'instructions': [
-                    'Heat coconut milk in a wok until oil separates',
-                    'Add green curry paste and fry until fragrant',
-                    'Add chicken and cook until almost done',
-                    'Add vegetables and remaining coconut milk',
-                    'Season with fish sauce and palm sugar',
-                    'Simmer until vegetables are tender',
-                    'Garnish with thai basil'
-                ],
-                'cooking_time': 30,
-                'difficulty': 'Medium',
-                'servings': 4,
-                'nutrition': {
-                    'calories': 380,
-                    'protein': 28,
-                    'carbs': 12,
-                    'fat': 26,
-                    'fiber': 4,
-                    'sodium': 720
-                },
-                'dietary_tags': ['spicy', 'high-protein', 'gluten-free'],
-                'health_conditions': ['diabetes-friendly'],
-                'image_description': 'green curry with chicken and vegetables',
-                'season': 'all',
-                'budget_level': 'medium'
-            },
-            {
-                'id': 8,
-                'name': 'Greek Salad',
-                'cuisine': 'Greek',
-                'ingredients': ['tomatoes', 'cucumber', 'red onion', 'olives', 'feta cheese', 'olive oil', 'oregano', 'lemon juice'],
-                'instructions': [
-                    'Chop tomatoes, cucumber, and red onion',
-                    'Combine vegetables in a large bowl',
-                    'Add olives and crumbled feta cheese',
-                    'Drizzle with olive oil and lemon juice',
-                    'Season with oregano, salt, and pepper',
-                    'Toss gently and let marinate for 10 minutes'
-                ],
-                'cooking_time': 15,
-                'difficulty': 'Easy',
-                'servings': 4,
-                'nutrition': {
-                    'calories': 180,
-                    'protein': 6,
-                    'carbs': 12,
-                    'fat': 14,
-                    'fiber': 4,
-                    'sodium': 420
-                },
-                'dietary_tags': ['vegetarian', 'gluten-free', 'low-calorie', 'mediterranean'],
-                'health_conditions': ['heart-healthy', 'weight-loss'],
-                'image_description': 'fresh greek salad with feta and olives',
-                'season': 'summer',
-                'budget_level': 'medium'
-            },
-            {
-                'id': 9,
-                'name': 'Mushroom Risotto',
-                'cuisine': 'Italian',
-                'ingredients': ['arborio rice', 'mushrooms', 'onion', 'garlic', 'white wine', 'vegetable broth', 'parmesan', 'butter'],
-                'instructions': [
-                    'Sauté mushrooms and set aside',
-                    'Heat broth in a separate pan',
-                    'Sauté onion and garlic until soft',
-                    'Add rice and stir for 2 minutes',
-                    'Add wine and stir until absorbed',
-                    'Add warm broth one ladle at a time, stirring constantly',
-                    'Fold in mushrooms, butter, and parmesan'
-                ],
-                'cooking_time': 45,
-                'difficulty': 'Hard',
-                'servings': 4,
-                'nutrition': {
-                    'calories': 420,
-                    'protein': 12,
-                    'carbs': 65,
-                    'fat': 14,
-                    'fiber': 3,
-                    'sodium': 480
-                },
-                'dietary_tags': ['vegetarian', 'comfort-food'],
-                'health_conditions': [],
-                'image_description': 'creamy mushroom risotto with parmesan',
-                'season': 'fall',
-                'budget_level': 'high'
-            },
-            {
-                'id': 10,
-                'name': 'Black Bean Tacos',
-                'cuisine': 'Mexican',
-                'ingredients': ['black beans', 'corn tortillas', 'avocado', 'lime', 'cilantro', 'red onion', 'cumin', 'chili powder'],
-                'instructions': [
-                    'Heat black beans with cumin and chili powder',
-                    'Warm tortillas in a dry pan',
-                    'Mash avocado with lime juice',
-                    'Dice red onion and chop cilantro',
-                    'Fill tortillas with beans',
-                    'Top with avocado, onion, and cilantro',
-                    'Serve with lime wedges'
-                ],
-                'cooking_time': 20,
-                'difficulty': 'Easy',
-                'servings': 3,
-                'nutrition': {
-                    'calories': 320,
-                    'protein': 14,
-                    'carbs': 52,
-                    'fat': 8,
-                    'fiber': 16,
-                    'sodium': 380
-                },
-                'dietary_tags': ['vegetarian', 'vegan', 'high-fiber', 'gluten-free'],
-                'health_conditions': ['diabetes-friendly', 'heart-healthy', 'weight-loss'],
-                'image_description': 'black bean tacos with avocado and cilantro',
-                'season': 'all',
-                'budget_level': 'low'
-            }
-        ]
+        with open(RECIPES_PATH, encoding='utf-8') as f:
+            recipes = json.load(f)
+        
+        # Hashed sets make tag/condition overlap checks O(1) per value, and
+        # interning lets recipes share one object per repeated token
+        for recipe in recipes:
+            recipe['dietary_tags'] = frozenset(map(sys.intern, recipe['dietary_tags']))
+            recipe['health_conditions'] = frozenset(map(sys.intern, recipe['health_conditions']))
+            recipe['ingredients'] = tuple(map(sys.intern, recipe['ingredients']))
+            recipe['instructions'] = tuple(recipe['instructions'])
+            for field in ('cuisine', 'difficulty', 'season', 'budget_level'):
+                recipe[field] = sys.intern(recipe[field])
+        return recipes
     
     def load_substitutions(self):
         """Load ingredient substitution database"""
-        return {
+        raw = {
             'quinoa': ['brown rice', 'bulgur wheat', 'cauliflower rice', 'farro'],
             'chicken breast': ['turkey breast', 'tofu', 'tempeh', 'seitan'],
             'feta cheese': ['goat cheese', 'cottage cheese', 'nutritional yeast', 'ricotta'],
@@ -339,22 +96,67 @@ class RecipeDatabase:
             'breadcrumbs': ['crushed nuts', 'oat flour', 'panko', 'cornmeal'],
             'cream': ['coconut cream', 'cashew cream', 'greek yogurt', 'silken tofu']
         }
+        # Canonical keys so lookups need no per-query normalization of the table
+        return {key.lower().strip(): tuple(options) for key, options in raw.items()}
+    
+    def _lookup_substitutes(self, ingredient):
+        """Substitutes for an ingredient, falling back to the longest overlapping key"""
+        key = ingredient.lower().strip()
+        if not key:
+            return ()
+        if key in self.substitutions:
+            return self.substitutions[key]
+        # e.g. 'salmon fillet' -> 'salmon'
+        matches = [k for k in self.substitutions if k in key or key in k]
+        if matches:
+            return self.substitutions[max(matches, key=len)]
+        return ()
     
     def get_recipes_by_criteria(self, **criteria):
         """Filter recipes based on multiple criteria"""
-        filtered_recipes = self.recipes.copy()
+        # Canonical key: drop unset criteria and order list values, so equivalent
+        # queries share a cache entry
+        key = tuple(sorted(
+            (k, tuple(sorted(v)) if isinstance(v, (list, tuple, set, frozenset)) else v)
+            for k, v in criteria.items()
+            if v and (k in self._scalar_fields or k in self._list_fields or k == 'max_time')
+        ))
+        return [self.recipes[i] for i in self._filter_cached(key)]
+    
+    def _filter_positions(self, key):
+        """Positions of the recipes matching a canonical criteria key"""
+        criteria = dict(key)
+        df = self.df
+        mask = np.ones(len(df), dtype=bool)
         
-        for key, value in criteria.items():
-            if value and key in ['cuisine', 'difficulty', 'season']:
-                filtered_recipes = [r for r in filtered_recipes if r.get(key) == value]
-            elif value and key == 'max_time':
-                filtered_recipes = [r for r in filtered_recipes if r.get('cooking_time', 0) <= value]
-            elif value and key == 'dietary_tags':
-                filtered_recipes = [r for r in filtered_recipes if any(tag in r.get('dietary_tags', []) for tag in value)]
-            elif value and key == 'health_conditions':
-                filtered_recipes = [r for r in filtered_recipes if any(condition in r.get('health_conditions', []) for condition in value)]
+        for field in self._scalar_fields:
+            if field in criteria:
+                mask &= (df[field] == criteria[field]).to_numpy()
+        if 'max_time' in criteria:
+            mask &= (df['cooking_time'].fillna(0) <= criteria['max_time']).to_numpy()
         
-        return filtered_recipes
+        # List criteria match any of their values
+        for field in self._list_fields:
+            if field in criteria:
+                hits = set().union(*(self._index[field].get(value, ()) for value in criteria[field]))
+                field_mask = np.zeros(len(df), dtype=bool)
+                field_mask[list(hits)] = True
+                mask &= field_mask
+        
+        return tuple(np.flatnonzero(mask).tolist())
+    
+    def get_recipes_by_nutrition(self, **bounds):
+        """Filter recipes by nutrient bounds, e.g. min_protein=20, max_calories=300"""
+        mask = np.ones(len(self.recipes), dtype=bool)
+        for key, limit in bounds.items():
+            if limit is None:
+                continue
+            side, _, nutrient = key.partition('_')
+            if side not in ('min', 'max') or nutrient not in self._nut:
+                raise ValueError(f"Unknown nutrition bound: {key}")
+            values = self._nut[nutrient]
+            mask &= values >= limit if side == 'min' else values <= limit
+        return [self.recipes[i] for i in np.flatnonzero(mask)]
     
     def log_user_interaction(self, user_id, recipe_id, interaction_type, rating=None):
         """Log user interactions for adaptive learning"""
@@ -363,46 +165,66 @@ class RecipeDatabase:
             'recipe_id': recipe_id,
             'interaction_type': interaction_type,  # 'view', 'cook', 'favorite', 'rate'
             'rating': rating,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': time.time()  # epoch seconds; see to_iso() for display/export
         }
         self.user_interactions.append(interaction)
+        self._interactions_by_user[user_id].append(interaction)
+    
+    @staticmethod
+    def to_iso(timestamp):
+        """Format an epoch-seconds interaction timestamp as local ISO 8601"""
+        return datetime.fromtimestamp(timestamp).isoformat()
+    
+    def export_interactions(self):
+        """Get the logged interactions with ISO timestamps, ready for JSON"""
+        return [dict(interaction, timestamp=self.to_iso(interaction['timestamp']))
+                for interaction in self.user_interactions]
     
     def get_personalized_recommendations(self, user_id, limit=5):
         """Get personalized recipe recommendations based on user history"""
-        user_interactions = [i for i in self.user_interactions if i['user_id'] == user_id]
+        user_interactions = self._interactions_by_user.get(user_id, ())
         
         if not user_interactions:
             # Return popular recipes for new users
             return self.recipes[:limit]
         
         # Simple recommendation based on past preferences
-        preferred_cuisines = []
-        preferred_dietary_tags = []
+        preferred_cuisines = set()
+        preferred_dietary_tags = set()
         
         for interaction in user_interactions:
             if interaction['rating'] and interaction['rating'] >= 4:
-                recipe = next((r for r in self.recipes if r['id'] == interaction['recipe_id']), None)
+                recipe = self._by_id.get(interaction['recipe_id'])
                 if recipe:
-                    preferred_cuisines.append(recipe['cuisine'])
-                    preferred_dietary_tags.extend(recipe['dietary_tags'])
+                    preferred_cuisines.add(recipe['cuisine'])
+                    preferred_dietary_tags.update(recipe['dietary_tags'])
         
-        # Find similar recipes
-        recommendations = []
-        for recipe in self.recipes:
-            score = 0
-            if recipe['cuisine'] in preferred_cuisines:
-                score += 2
-            if any(tag in preferred_dietary_tags for tag in recipe['dietary_tags']):
-                score += 1
-            recipe['recommendation_score'] = score
+        # Vectorized scoring: +2 for a preferred cuisine, +1 for any shared tag
+        preferred_ids = [self._cuisine_vocab[c] for c in preferred_cuisines]
+        preferred_mask = np.uint64(0)
+        for tag in preferred_dietary_tags:
+            preferred_mask |= np.uint64(1) << np.uint64(self._tag_vocab[tag])
+        scores = (2 * np.isin(self._cuisine_id, preferred_ids)
+                  + ((self._tag_bits & preferred_mask) != 0)).astype(np.int64)
         
-        # Sort by score and return top recommendations
-        sorted_recipes = sorted(self.recipes, key=lambda x: x.get('recommendation_score', 0), reverse=True)
-        return sorted_recipes[:limit]
+        # Top-k in O(N); folding position into the key keeps ties in catalogue order
+        n = len(self.recipes)
+        limit = min(limit, n)
+        if limit <= 0:
+            return []
+        keys = scores * n + np.arange(n - 1, -1, -1)
+        top = np.argpartition(-keys, limit - 1)[:limit]
+        top = top[np.argsort(-keys[top])]
+        return [self.recipes[i] for i in top]
+
+@functools.lru_cache(maxsize=1)
+def get_db() -> RecipeDatabase:
+    """Shared RecipeDatabase, loaded once per process"""
+    return RecipeDatabase()
 
 # Usage example
 if __name__ == "__main__":
-    db = RecipeDatabase()
+    db = get_db()
     
     # Example queries
     vegetarian_recipes = db.get_recipes_by_criteria(dietary_tags=['vegetarian'])
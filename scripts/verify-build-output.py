@@ -5,13 +5,34 @@ Checks that all required files and dependencies are present before deployment
 """
 
 import os
+import re
 import sys
+import ast
+import functools
 import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# Subtrees never checked by the verifier, skipped while walking the project
+PRUNED_DIRS = {".git", "node_modules", "__pycache__", ".venv", "venv"}
+
+@functools.lru_cache(maxsize=1)
+def project_paths():
+    """Walk the project once, returning the sets of relative file and directory paths"""
+    files, dirs = set(), set()
+    for root, dirnames, filenames in os.walk("."):
+        dirnames[:] = [d for d in dirnames if d not in PRUNED_DIRS]
+        dirs.update(os.path.normpath(os.path.join(root, d)) for d in dirnames)
+        files.update(os.path.normpath(os.path.join(root, f)) for f in filenames)
+    return files, dirs
+
+def file_present(filepath):
+    """Check whether the project walk saw a file, without another stat call"""
+    return os.path.normpath(filepath) in project_paths()[0]
+
 def check_file_exists(filepath, description):
     """Check if a file exists and report the result"""
-    if os.path.exists(filepath):
+    if file_present(filepath):
         print(f"✅ Found {description}: {filepath}")
         return True
     else:
@@ -20,26 +41,38 @@ def check_file_exists(filepath, description):
 
 def check_directory_exists(dirpath, description):
     """Check if a directory exists and report the result"""
-    if os.path.isdir(dirpath):
+    if os.path.normpath(dirpath) in project_paths()[1]:
         print(f"✅ Found {description}: {dirpath}")
         return True
     else:
         print(f"❌ Missing {description}: {dirpath}")
         return False
 
-def check_python_syntax(filepath):
-    """Check if a Python file has valid syntax"""
+def syntax_status(filepath):
+    """Check a Python file's syntax, returning (passed, report line) without printing"""
     try:
         with open(filepath, 'r') as f:
-            compile(f.read(), filepath, 'exec')
-        print(f"✅ Valid Python syntax: {filepath}")
-        return True
+            ast.parse(f.read(), filename=filepath)
+        return True, f"✅ Valid Python syntax: {filepath}"
     except SyntaxError as e:
-        print(f"❌ Syntax error in {filepath}: {e}")
-        return False
+        return False, f"❌ Syntax error in {filepath}: {e}"
     except Exception as e:
-        print(f"⚠️  Could not verify {filepath}: {e}")
-        return True  # Don't fail on other errors
+        return True, f"⚠️  Could not verify {filepath}: {e}"  # Don't fail on other errors
+
+def check_python_syntax(filepath):
+    """Check if a Python file has valid syntax"""
+    passed, line = syntax_status(filepath)
+    print(line)
+    return passed
+
+def parse_requirement_names(lines):
+    """Collect the lowercased distribution names from requirements file lines"""
+    names = set()
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith(("#", "-")):
+            names.add(re.split(r"[=<>!~;\[\s]", line, maxsplit=1)[0].lower())
+    return names
 
 def main():
     print("=" * 60)
@@ -65,6 +98,7 @@ def main():
     all_checks_passed &= check_directory_exists("src", "Source code directory")
     all_checks_passed &= check_directory_exists("data", "Data directory")
     all_checks_passed &= check_directory_exists("static", "Static assets directory")
+    all_checks_passed &= check_file_exists("data/recipes.json", "Recipe catalogue")
     print()
     
     # Check Python source files
@@ -81,24 +115,33 @@ def main():
         "data/recipe_database.py"
     ]
     
+    # Buffer this section's report and write it in one go
+    report = []
+    existing = []
     for py_file in python_files:
-        if os.path.exists(py_file):
-            all_checks_passed &= check_python_syntax(py_file)
+        if file_present(py_file):
+            existing.append(py_file)
         else:
-            print(f"⚠️  Skipping {py_file} (not found)")
-    print()
+            report.append(f"⚠️  Skipping {py_file} (not found)")
+    
+    # Read and parse the files concurrently; report in list order
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for passed, line in executor.map(syntax_status, existing):
+            report.append(line)
+            all_checks_passed &= passed
+    sys.stdout.write("".join(f"{line}\n" for line in report) + "\n")
     
     # Check critical dependencies in requirements.txt
     print("📦 Checking requirements.txt...")
     required_packages = ["streamlit", "transformers", "torch", "pillow", "pandas"]
     try:
         with open("requirements.txt", 'r') as f:
-            requirements = f.read()
-            for package in required_packages:
-                if package.lower() in requirements.lower():
-                    print(f"✅ Found required package: {package}")
-                else:
-                    print(f"⚠️  Package {package} not found in requirements.txt")
+            requirements = parse_requirement_names(f)
+        for package in required_packages:
+            if package.lower() in requirements:
+                print(f"✅ Found required package: {package}")
+            else:
+                print(f"⚠️  Package {package} not found in requirements.txt")
     except Exception as e:
         print(f"❌ Error reading requirements.txt: {e}")
         all_checks_passed = False
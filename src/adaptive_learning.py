@@ -1,10 +1,255 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, NamedTuple, Tuple, Union
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 import json
+import heapq
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from collections.abc import Mapping
+from operator import itemgetter
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Contribution of each learned-preference category to a recipe's score
+SCORE_WEIGHTS = {
+    'cuisines': 0.3,
+    'dietary_tags': 0.2,
+    'cooking_times': 0.15,
+    'ingredients': 0.1,
+    'health_goals': 0.2,
+    'spice_levels': 0.05
+}
+
+TIME_CATEGORIES = ('quick', 'medium', 'long')
+# Inclusive upper bounds (minutes) of the 'quick' and 'medium' categories
+_TIME_BUCKETS = (20, 45)
+NS_PER_DAY = 86_400 * 1_000_000_000
+# Learned weights are sums of small interaction weights, so float32 holds them exactly
+WEIGHT_DTYPE = np.float32
+SPICE_LEVELS = ('mild', 'spicy')
+RECIPE_CACHE_SIZE = 8
+FEATURE_CACHE_SIZE = 4096
+
+class RecipeSoA(NamedTuple):
+    """Structure-of-arrays encoding of a recipe list for batch scoring
+
+    Single-valued features are one id per recipe; multi-valued features are
+    CSR-style ``offsets[N+1]``/``ids`` pairs. Ids index the vocab tuples.
+    """
+    cuisine_ids: np.ndarray
+    time_ids: np.ndarray
+    spice_ids: np.ndarray
+    tag_offsets: np.ndarray
+    tag_ids: np.ndarray
+    ingredient_offsets: np.ndarray
+    ingredient_ids: np.ndarray
+    health_offsets: np.ndarray
+    health_ids: np.ndarray
+    cuisines: tuple
+    tags: tuple
+    ingredients: tuple
+    health_conditions: tuple
+
+class PreferenceTable(Mapping):
+    """Learned weights for one preference category
+
+    Keys are interned to dense int ids on first sight and their weights live
+    in a numpy vector grown geometrically. Reads go through the read-only
+    Mapping interface.
+    """
+    
+    def __init__(self, capacity: int = 8):
+        self._ids = {}
+        self._weights = np.zeros(capacity, dtype=WEIGHT_DTYPE)
+    
+    def __getitem__(self, key) -> float:
+        return float(self._weights[self._ids[key]])
+    
+    def __contains__(self, key) -> bool:
+        return key in self._ids
+    
+    def __iter__(self):
+        return iter(self._ids)
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def intern(self, key) -> int:
+        """Get the id of key, assigning the next free one if it is new"""
+        key_id = self._ids.get(key)
+        if key_id is None:
+            key_id = self._ids[key] = len(self._ids)
+            if key_id == len(self._weights):
+                self._weights = np.concatenate([self._weights, np.zeros_like(self._weights)])
+        return key_id
+    
+    def add(self, keys: Iterable, weights: Iterable[float]):
+        """Add each weight to its key, interning new keys"""
+        ids = [self.intern(key) for key in keys]
+        np.add.at(self._weights, ids, np.fromiter(weights, dtype=WEIGHT_DTYPE, count=len(ids)))
+    
+    @property
+    def index(self) -> Dict:
+        """Key to id mapping; ids index into ``weights``"""
+        return self._ids
+    
+    @property
+    def weights(self) -> np.ndarray:
+        return self._weights[:len(self._ids)]
+
+class InteractionLog:
+    """Column-oriented interaction history with amortized O(1) appends
+
+    Columns are over-allocated and doubled when full; the public attributes
+    are views of the filled prefix. Indexing or iterating yields the
+    familiar per-interaction dicts.
+    """
+    
+    def __init__(self, capacity: int = 16):
+        self._size = 0
+        self._recipe_ids = np.empty(capacity, dtype=object)
+        self._types = np.empty(capacity, dtype=object)
+        self._weights = np.empty(capacity, dtype=np.float32)
+        self._ratings = np.empty(capacity, dtype=np.float32)
+        self._timestamps = np.empty(capacity, dtype=np.int64)
+        self._features = []
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __getitem__(self, i: int) -> Dict:
+        if not -self._size <= i < self._size:
+            raise IndexError('interaction index out of range')
+        i %= self._size
+        rating = self._ratings[i]
+        return {
+            'recipe_id': self._recipe_ids[i],
+            'interaction_type': self._types[i],
+            'weight': float(self._weights[i]),
+            'rating': None if np.isnan(rating) else float(rating),
+            'timestamp': pd.Timestamp.fromtimestamp(self._timestamps[i] / 1e9),
+            'recipe_features': self._features[i]
+        }
+    
+    def __iter__(self):
+        return (self[i] for i in range(self._size))
+    
+    def append(self, recipe_id, interaction_type: str, weight: float, rating,
+               timestamp_ns: int, recipe_features: Dict):
+        """Append one interaction, growing the columns geometrically"""
+        if self._size == len(self._types):
+            self._grow()
+        i = self._size
+        self._recipe_ids[i] = recipe_id
+        self._types[i] = interaction_type
+        self._weights[i] = weight
+        self._ratings[i] = np.nan if rating is None else rating
+        self._timestamps[i] = timestamp_ns
+        self._features.append(recipe_features)
+        self._size += 1
+    
+    def _grow(self):
+        for name in ('_recipe_ids', '_types', '_weights', '_ratings', '_timestamps'):
+            column = getattr(self, name)
+            grown = np.empty(max(16, 2 * len(column)), dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+    
+    @property
+    def types(self) -> np.ndarray:
+        return self._types[:self._size]
+    
+    @property
+    def weights(self) -> np.ndarray:
+        return self._weights[:self._size]
+    
+    @property
+    def ratings(self) -> np.ndarray:
+        return self._ratings[:self._size]
+    
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Epoch timestamps in integer nanoseconds (``time.time_ns``)"""
+        return self._timestamps[:self._size]
+
+def _encode_csr(values_per_recipe):
+    """Encode a list of per-recipe key lists as (offsets, ids, vocab)"""
+    vocab = {}
+    offsets = [0]
+    ids = []
+    for values in values_per_recipe:
+        ids.extend(vocab.setdefault(value, len(vocab)) for value in values)
+        offsets.append(len(ids))
+    return np.array(offsets, dtype=np.int32), np.array(ids, dtype=np.int32), tuple(vocab)
+
+def _add_csr_weights(scores, offsets, ids, weights):
+    """Add each recipe's multi-valued feature weights to its score, one position at a time
+
+    Going position by position keeps every recipe's additions in list order,
+    so the float sums come out exactly as a per-recipe loop would produce them.
+    """
+    counts = np.diff(offsets)
+    for position in range(int(counts.max()) if len(counts) else 0):
+        rows = np.flatnonzero(counts > position)
+        scores[rows] += weights[ids[offsets[rows] + position]]
+
+def _score_all_numpy(cuisine_ids, time_ids, spice_ids, tag_offsets, tag_ids,
+                     ingredient_offsets, ingredient_ids, health_offsets, health_ids,
+                     cuisine_w, time_w, spice_w, tag_w, ingredient_w, health_w):
+    """Score every recipe from pre-scaled weight vectors (numpy fallback)"""
+    # Same feature order as the scoring kernel: cuisine, tags, time, ingredients, health, spice
+    scores = cuisine_w[cuisine_ids].astype(np.float64)
+    _add_csr_weights(scores, tag_offsets, tag_ids, tag_w)
+    scores += time_w[time_ids]
+    _add_csr_weights(scores, ingredient_offsets, ingredient_ids, ingredient_w)
+    _add_csr_weights(scores, health_offsets, health_ids, health_w)
+    scores += spice_w[spice_ids]
+    return np.maximum(scores, 0)
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True)
+    def _score_all_kernel(cuisine_ids, time_ids, spice_ids, tag_offsets, tag_ids,
+                          ingredient_offsets, ingredient_ids, health_offsets, health_ids,
+                          cuisine_w, time_w, spice_w, tag_w, ingredient_w, health_w):
+        n = cuisine_ids.shape[0]
+        scores = np.empty(n)
+        # Each iteration writes only scores[i], so recipes are scored in parallel
+        for i in prange(n):
+            # One float64 addition per feature, in a fixed order (cuisine, tags, time,
+            # ingredients, health, spice), so equal inputs give bit-identical scores
+            s = 0.0
+            s += cuisine_w[cuisine_ids[i]]
+            for j in range(tag_offsets[i], tag_offsets[i + 1]):
+                s += tag_w[tag_ids[j]]
+            s += time_w[time_ids[i]]
+            for j in range(ingredient_offsets[i], ingredient_offsets[i + 1]):
+                s += ingredient_w[ingredient_ids[j]]
+            for j in range(health_offsets[i], health_offsets[i + 1]):
+                s += health_w[health_ids[j]]
+            s += spice_w[spice_ids[i]]
+            scores[i] = s if s > 0 else 0.0
+        return scores
+    
+    score_all = _score_all_kernel
+else:
+    score_all = _score_all_numpy
+
+def _warm_up_score_kernel():
+    """Compile the Numba scoring kernel once, off the first request's path"""
+    one = np.zeros(1, dtype=np.int32)
+    offsets = np.zeros(2, dtype=np.int32)
+    empty_ids = np.zeros(0, dtype=np.int32)
+    w = np.zeros(1)
+    score_all(one, one, one, offsets, empty_ids, offsets, empty_ids, offsets, empty_ids,
+              w, w, w, w, w, w)
 
 class AdaptiveLearningEngine:
     """Adaptive learning system that learns user preferences over time"""
@@ -23,22 +268,39 @@ class AdaptiveLearningEngine:
             'cuisine_type', 'spice_level', 'cooking_time', 'difficulty',
             'dietary_restrictions', 'health_focus', 'ingredients'
         ]
+        # Per-user (index map, weight vector) pairs, rebuilt after new interactions
+        self._pref_arrays = {}
+        # Per-user (category, key, weight) updates not yet folded into learned_preferences
+        self._pending = defaultdict(list)
+        # id(recipe list) -> (recipe list, fingerprint, RecipeSoA) for recently scored catalogues
+        self._recipe_cache = {}
+        # recipe_id -> (source fingerprint, features extracted for interaction_history)
+        self._feature_cache = {}
+        # user_id -> (insights, expiry in time_ns); dropped on every new interaction
+        self._insights_cache = {}
+        # user_id -> (preference snapshot, RecipeSoA, catalogue-aligned weight vectors)
+        self._user_weights = {}
+        # user_id -> (RecipeSoA, limit, preference snapshot, top indices, top scores); dropped on every new interaction
+        self._rec_cache = {}
+        
+        if NUMBA_AVAILABLE:
+            _warm_up_score_kernel()
     
     def initialize_user_profile(self, user_id: str, initial_preferences: Dict = None):
         """Initialize a new user profile"""
         self.user_profiles[user_id] = {
             'preferences': initial_preferences or {},
-            'interaction_history': [],
+            'interaction_history': InteractionLog(),
             'learned_preferences': {
-                'cuisines': {},
-                'ingredients': {},
-                'dietary_tags': {},
-                'cooking_times': {},
-                'spice_levels': {},
-                'health_goals': {}
+                'cuisines': PreferenceTable(),
+                'ingredients': PreferenceTable(),
+                'dietary_tags': PreferenceTable(),
+                'cooking_times': PreferenceTable(),
+                'spice_levels': PreferenceTable(),
+                'health_goals': PreferenceTable()
             },
             'recommendation_accuracy': [],
-            'last_updated': pd.Timestamp.now()
+            'last_updated': time.time_ns()
         }
     
     def log_interaction(self, user_id: str, recipe_id: int, interaction_type: str, 
@@ -54,165 +316,275 @@ class AdaptiveLearningEngine:
             weight = self.interaction_weights.get(interaction_type, 1.0)
         
         # Log interaction
-        interaction = {
-            'recipe_id': recipe_id,
-            'interaction_type': interaction_type,
-            'weight': weight,
-            'rating': rating,
-            'timestamp': pd.Timestamp.now(),
-            'recipe_features': self._extract_recipe_features(recipe_data)
-        }
-        
-        self.user_profiles[user_id]['interaction_history'].append(interaction)
+        features = self._get_recipe_features(recipe_id, recipe_data)
+        self.user_profiles[user_id]['interaction_history'].append(
+            recipe_id, interaction_type, weight, rating, time.time_ns(), features
+        )
         
         # Update learned preferences
-        self._update_learned_preferences(user_id, recipe_data, weight)
+        self._update_learned_preferences(user_id, recipe_data, weight, features['spice_level'])
+        self._pref_arrays.pop(user_id, None)
+        self._insights_cache.pop(user_id, None)
+        self._rec_cache.pop(user_id, None)
+    
+    def _get_recipe_features(self, recipe_id: int, recipe_data: Dict) -> Dict:
+        """Get the extracted features of a recipe, reusing them across its interactions
+        
+        Entries are keyed on the id plus the values extraction reads, so edited
+        recipe data is re-extracted instead of served from the cache.
+        """
+        fingerprint = self._feature_fingerprint(recipe_data)
+        cached = self._feature_cache.get(recipe_id)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        
+        if cached is None and len(self._feature_cache) >= FEATURE_CACHE_SIZE:
+            self._feature_cache.pop(next(iter(self._feature_cache)))
+        features = self._extract_recipe_features(recipe_data)
+        self._feature_cache[recipe_id] = (fingerprint, features)
+        return features
+    
+    def _feature_fingerprint(self, recipe_data: Dict) -> tuple:
+        """Hashable snapshot of every recipe field _extract_recipe_features reads"""
+        nutrition = recipe_data.get('nutrition', {})
+        return (
+            recipe_data.get('cuisine', ''),
+            recipe_data.get('cooking_time', 0),
+            recipe_data.get('difficulty', ''),
+            tuple(recipe_data.get('dietary_tags', [])),
+            tuple(recipe_data.get('health_conditions', [])),
+            nutrition.get('calories', 0),
+            nutrition.get('protein', 0),
+            tuple(recipe_data.get('ingredients', [])[:3])
+        )
     
     def _extract_recipe_features(self, recipe_data: Dict) -> Dict:
         """Extract key features from recipe data"""
+        dietary_tags = recipe_data.get('dietary_tags', [])
         return {
             'cuisine': recipe_data.get('cuisine', ''),
             'cooking_time': recipe_data.get('cooking_time', 0),
             'difficulty': recipe_data.get('difficulty', ''),
-            'dietary_tags': recipe_data.get('dietary_tags', []),
+            'dietary_tags': dietary_tags,
             'health_conditions': recipe_data.get('health_conditions', []),
-            'spice_level': 'spicy' in recipe_data.get('dietary_tags', []),
+            'spice_level': 'spicy' in dietary_tags,
             'calories': recipe_data.get('nutrition', {}).get('calories', 0),
             'protein': recipe_data.get('nutrition', {}).get('protein', 0),
             'main_ingredients': recipe_data.get('ingredients', [])[:3]  # First 3 ingredients
         }
     
-    def _update_learned_preferences(self, user_id: str, recipe_data: Dict, weight: float):
-        """Update learned preferences based on interaction"""
+    def _update_learned_preferences(self, user_id: str, recipe_data: Dict, weight: float,
+                                    is_spicy: bool = None):
+        """Queue learned-preference updates for an interaction; see _flush_preferences"""
         profile = self.user_profiles[user_id]
-        learned = profile['learned_preferences']
+        pending = self._pending[user_id]
         
-        # Update cuisine preferences
+        # Cuisine preferences
         cuisine = recipe_data.get('cuisine', '')
         if cuisine:
-            learned['cuisines'][cuisine] = learned['cuisines'].get(cuisine, 0) + weight
+            pending.append(('cuisines', cuisine, weight))
         
-        # Update dietary tag preferences
+        # Dietary tag preferences
         for tag in recipe_data.get('dietary_tags', []):
-            learned['dietary_tags'][tag] = learned['dietary_tags'].get(tag, 0) + weight
+            pending.append(('dietary_tags', tag, weight))
         
-        # Update cooking time preferences
+        # Cooking time preferences
         cooking_time = recipe_data.get('cooking_time', 0)
-        time_category = self._categorize_cooking_time(cooking_time)
-        learned['cooking_times'][time_category] = learned['cooking_times'].get(time_category, 0) + weight
+        pending.append(('cooking_times', self._categorize_cooking_time(cooking_time), weight))
         
-        # Update ingredient preferences
+        # Ingredient preferences
         for ingredient in recipe_data.get('ingredients', [])[:5]:  # Top 5 ingredients
-            learned['ingredients'][ingredient] = learned['ingredients'].get(ingredient, 0) + weight
+            pending.append(('ingredients', ingredient, weight))
         
-        # Update health goal preferences
+        # Health goal preferences
         for condition in recipe_data.get('health_conditions', []):
-            learned['health_goals'][condition] = learned['health_goals'].get(condition, 0) + weight
+            pending.append(('health_goals', condition, weight))
         
-        # Update spice level preferences
-        if 'spicy' in recipe_data.get('dietary_tags', []):
-            learned['spice_levels']['spicy'] = learned['spice_levels'].get('spicy', 0) + weight
-        else:
-            learned['spice_levels']['mild'] = learned['spice_levels'].get('mild', 0) + weight
+        # Spice level preferences
+        if is_spicy is None:
+            is_spicy = 'spicy' in recipe_data.get('dietary_tags', [])
+        spice = 'spicy' if is_spicy else 'mild'
+        pending.append(('spice_levels', spice, weight))
         
-        profile['last_updated'] = pd.Timestamp.now()
+        profile['last_updated'] = time.time_ns()
+    
+    def _flush_preferences(self, user_id: str) -> Dict:
+        """Fold queued updates into the user's learned preferences and return them"""
+        learned = self.user_profiles[user_id]['learned_preferences']
+        pending = self._pending.pop(user_id, None)
+        if pending:
+            batches = defaultdict(lambda: ([], []))
+            for category, key, weight in pending:
+                keys, weights = batches[category]
+                keys.append(key)
+                weights.append(weight)
+            for category, (keys, weights) in batches.items():
+                learned[category].add(keys, weights)
+        return learned
     
     def _categorize_cooking_time(self, cooking_time: int) -> str:
         """Categorize cooking time into buckets"""
-        if cooking_time <= 20:
-            return 'quick'
-        elif cooking_time <= 45:
-            return 'medium'
-        else:
-            return 'long'
+        return TIME_CATEGORIES[bisect_left(_TIME_BUCKETS, cooking_time)]
     
     def get_user_preferences_summary(self, user_id: str) -> Dict:
         """Get a summary of user's learned preferences"""
         if user_id not in self.user_profiles:
             return {}
         
-        learned = self.user_profiles[user_id]['learned_preferences']
+        learned = self._flush_preferences(user_id)
         summary = {}
         
         # Get top preferences in each category
         for category, preferences in learned.items():
             if preferences:
-                sorted_prefs = sorted(preferences.items(), key=lambda x: x[1], reverse=True)
+                top_prefs = heapq.nlargest(5, preferences.items(), key=itemgetter(1))
                 summary[category] = {
-                    'top_preference': sorted_prefs[0][0] if sorted_prefs else None,
-                    'top_score': sorted_prefs[0][1] if sorted_prefs else 0,
-                    'all_preferences': dict(sorted_prefs[:5])  # Top 5
+                    'top_preference': top_prefs[0][0],
+                    'top_score': top_prefs[0][1],
+                    'all_preferences': dict(top_prefs)  # Top 5
                 }
         
         return summary
     
     def generate_personalized_recommendations(self, user_id: str, available_recipes: List[Dict], 
-                                            limit: int = 10) -> List[Dict]:
-        """Generate personalized recipe recommendations"""
+                                            limit: int = 10, return_indices: bool = False
+                                            ) -> Union[List[Dict], Tuple[np.ndarray, np.ndarray]]:
+        """Generate personalized recipe recommendations
+        
+        With return_indices, return (indices into available_recipes, scores)
+        instead of scored copies of the recipes.
+        """
         if user_id not in self.user_profiles:
             # Return popular recipes for new users
+            if return_indices:
+                ratings = np.fromiter((r.get('rating', 0) for r in available_recipes),
+                                      dtype=np.float64, count=len(available_recipes))
+                top = np.argsort(-ratings, kind='stable')[:limit]
+                return top, np.zeros(len(top))
             return sorted(available_recipes, key=lambda x: x.get('rating', 0), reverse=True)[:limit]
         
-        learned = self.user_profiles[user_id]['learned_preferences']
-        scored_recipes = []
-        
-        for recipe in available_recipes:
-            score = self._calculate_recipe_score(recipe, learned)
-            recipe_with_score = recipe.copy()
-            recipe_with_score['personalization_score'] = score
-            scored_recipes.append(recipe_with_score)
+        if limit <= 0 or not available_recipes:
+            return (np.empty(0, dtype=np.intp), np.empty(0)) if return_indices else []
         
-        # Sort by personalization score
-        scored_recipes.sort(key=lambda x: x['personalization_score'], reverse=True)
+        soa = self._get_recipe_soa(available_recipes)
+        pref_arrays = self._get_pref_arrays(user_id)
         
-        return scored_recipes[:limit]
+        # Reruns with no new interaction since the last call reuse its ranking
+        cached = self._rec_cache.get(user_id)
+        if cached is not None and cached[0] is soa and cached[1] >= limit and cached[2] is pref_arrays:
+            top, top_scores = cached[3][:limit], cached[4][:limit]
+        else:
+            scores = self._score_recipes(self._specialize_weights(user_id, pref_arrays, soa), soa)
+            
+            # Top-k without sorting everything: keep recipes scoring at least the
+            # k-th best value, then sort just those, breaking ties by catalogue position
+            n = len(scores)
+            if limit < n:
+                kth_best = np.partition(scores, n - limit)[n - limit]
+                candidates = np.flatnonzero(scores >= kth_best)
+            else:
+                candidates = np.arange(n)
+            top = candidates[np.lexsort((candidates, -scores[candidates]))][:limit]
+            top_scores = scores[top]
+            self._rec_cache[user_id] = (soa, limit, pref_arrays, top, top_scores)
+        
+        if return_indices:
+            return top.copy(), top_scores.copy()
+        
+        recommendations = []
+        for i, score in zip(top, top_scores):
+            recipe_with_score = available_recipes[i].copy()
+            recipe_with_score['personalization_score'] = float(score)
+            recommendations.append(recipe_with_score)
+        return recommendations
     
-    def _calculate_recipe_score(self, recipe: Dict, learned_preferences: Dict) -> float:
-        """Calculate personalization score for a recipe"""
-        score = 0.0
-        
-        # Cuisine preference
-        cuisine = recipe.get('cuisine', '')
-        if cuisine in learned_preferences.get('cuisines', {}):
-            score += learned_preferences['cuisines'][cuisine] * 0.3
-        
-        # Dietary tags preference
-        for tag in recipe.get('dietary_tags', []):
-            if tag in learned_preferences.get('dietary_tags', {}):
-                score += learned_preferences['dietary_tags'][tag] * 0.2
-        
-        # Cooking time preference
-        cooking_time = recipe.get('cooking_time', 0)
-        time_category = self._categorize_cooking_time(cooking_time)
-        if time_category in learned_preferences.get('cooking_times', {}):
-            score += learned_preferences['cooking_times'][time_category] * 0.15
-        
-        # Ingredient preference
-        for ingredient in recipe.get('ingredients', []):
-            if ingredient in learned_preferences.get('ingredients', {}):
-                score += learned_preferences['ingredients'][ingredient] * 0.1
-        
-        # Health goals preference
-        for condition in recipe.get('health_conditions', []):
-            if condition in learned_preferences.get('health_goals', {}):
-                score += learned_preferences['health_goals'][condition] * 0.2
-        
-        # Spice level preference
-        is_spicy = 'spicy' in recipe.get('dietary_tags', [])
-        spice_prefs = learned_preferences.get('spice_levels', {})
-        if is_spicy and 'spicy' in spice_prefs:
-            score += spice_prefs['spicy'] * 0.05
-        elif not is_spicy and 'mild' in spice_prefs:
-            score += spice_prefs['mild'] * 0.05
-        
-        return max(0, score)  # Ensure non-negative score
+    def _get_pref_arrays(self, user_id: str) -> Dict:
+        """Get the user's learned preferences as index maps and weight vectors"""
+        if user_id not in self._pref_arrays:
+            self._pref_arrays[user_id] = self._rebuild_pref_arrays(user_id)
+        return self._pref_arrays[user_id]
+    
+    def _rebuild_pref_arrays(self, user_id: str) -> Dict:
+        """Snapshot each learned-preference table as {key: index} plus a weight vector"""
+        arrays = {}
+        for category, prefs in self._flush_preferences(user_id).items():
+            # The trailing zero is the slot every unseen key maps to
+            arrays[category] = (dict(prefs.index), np.append(prefs.weights, WEIGHT_DTYPE(0)))
+        return arrays
+    
+    def _build_recipe_soa(self, recipes: List[Dict]) -> RecipeSoA:
+        """Encode recipes into the structure-of-arrays layout used by score_all"""
+        cuisine_vocab = {}
+        cuisine_ids = np.fromiter((cuisine_vocab.setdefault(r.get('cuisine', ''), len(cuisine_vocab)) for r in recipes),
+                                  dtype=np.int32, count=len(recipes))
+        cooking_times = np.fromiter((r.get('cooking_time', 0) for r in recipes), dtype=np.float64, count=len(recipes))
+        time_ids = np.searchsorted(_TIME_BUCKETS, cooking_times).astype(np.int32)
+        spice_ids = np.fromiter(('spicy' in r.get('dietary_tags', []) for r in recipes),
+                                dtype=np.int32, count=len(recipes))
+        tag_offsets, tag_ids, tags = _encode_csr(r.get('dietary_tags', []) for r in recipes)
+        ingredient_offsets, ingredient_ids, ingredients = _encode_csr(r.get('ingredients', []) for r in recipes)
+        health_offsets, health_ids, health_conditions = _encode_csr(r.get('health_conditions', []) for r in recipes)
+        return RecipeSoA(cuisine_ids, time_ids, spice_ids, tag_offsets, tag_ids,
+                         ingredient_offsets, ingredient_ids, health_offsets, health_ids,
+                         tuple(cuisine_vocab), tags, ingredients, health_conditions)
+    
+    def _get_recipe_soa(self, recipes: List[Dict]) -> RecipeSoA:
+        """Get the SoA encoding of a recipe list, reusing it across reruns"""
+        fingerprint = (len(recipes), recipes[0].get('id'), recipes[-1].get('id'))
+        cached = self._recipe_cache.get(id(recipes))
+        # Holding the list keeps its id from being reused; the fingerprint
+        # catches lists that were modified in place
+        if cached is not None and cached[0] is recipes and cached[1] == fingerprint:
+            return cached[2]
+        
+        soa = self._build_recipe_soa(recipes)
+        if len(self._recipe_cache) >= RECIPE_CACHE_SIZE:
+            self._recipe_cache.pop(next(iter(self._recipe_cache)))
+        self._recipe_cache[id(recipes)] = (recipes, fingerprint, soa)
+        return soa
+    
+    def _specialize_weights(self, user_id: str, pref_arrays: Dict, soa: RecipeSoA) -> tuple:
+        """Get the user's weights aligned to a catalogue's vocabularies and pre-scaled
+        
+        The result only depends on the preference snapshot and the encoding,
+        so it is kept until either changes; repeat scoring is then pure gathers.
+        """
+        cached = self._user_weights.get(user_id)
+        if cached is not None and cached[0] is pref_arrays and cached[1] is soa:
+            return cached[2]
+        
+        def weights_for(category, vocab):
+            index, weights = pref_arrays[category]
+            miss = len(index)
+            ids = np.fromiter((index.get(key, miss) for key in vocab), dtype=np.intp, count=len(vocab))
+            # Scale in float64: the stored weights are exact in float32, their scaled values are not
+            return weights[ids].astype(np.float64) * SCORE_WEIGHTS[category]
+        
+        aligned = (
+            weights_for('cuisines', soa.cuisines),
+            weights_for('cooking_times', TIME_CATEGORIES),
+            weights_for('spice_levels', SPICE_LEVELS),
+            weights_for('dietary_tags', soa.tags),
+            weights_for('ingredients', soa.ingredients),
+            weights_for('health_goals', soa.health_conditions)
+        )
+        self._user_weights[user_id] = (pref_arrays, soa, aligned)
+        return aligned
+    
+    def _score_recipes(self, weights: tuple, soa: RecipeSoA) -> np.ndarray:
+        """Personalization score of every recipe in an encoded recipe list"""
+        return score_all(
+            soa.cuisine_ids, soa.time_ids, soa.spice_ids, soa.tag_offsets, soa.tag_ids,
+            soa.ingredient_offsets, soa.ingredient_ids, soa.health_offsets, soa.health_ids,
+            *weights
+        )
     
     def get_recommendation_explanation(self, user_id: str, recipe: Dict) -> List[str]:
         """Explain why a recipe was recommended to the user"""
         if user_id not in self.user_profiles:
             return ["Recommended as a popular recipe"]
         
-        learned = self.user_profiles[user_id]['learned_preferences']
+        learned = self._flush_preferences(user_id)
         explanations = []
         
         # Check cuisine match
@@ -255,6 +627,58 @@ class AdaptiveLearningEngine:
         
         return explanations if explanations else ["Recommended based on overall preferences"]
     
+    def explain_batch(self, user_id: str, recipes: List[Dict]) -> List[List[str]]:
+        """get_recommendation_explanation for a list of recipes, computing threshold hits as arrays"""
+        if user_id not in self.user_profiles:
+            return [["Recommended as a popular recipe"] for _ in recipes]
+        if not recipes:
+            return []
+        
+        learned = self._flush_preferences(user_id)
+        soa = self._get_recipe_soa(recipes)
+        
+        def liked(category, vocab, threshold):
+            # Per-vocabulary-entry mask of keys the user weights above threshold
+            prefs = learned[category]
+            miss = len(prefs)
+            ids = np.fromiter((prefs.index.get(key, miss) for key in vocab), dtype=np.intp, count=len(vocab))
+            return np.append(prefs.weights, WEIGHT_DTYPE(0))[ids] > threshold
+        
+        def matches(offsets, ids, mask, vocab):
+            # Per-recipe lists of liked keys, built only for recipes with a hit
+            hits = mask[ids]
+            counts = np.diff(np.concatenate(([0], np.cumsum(hits)))[offsets])
+            found = [None] * len(recipes)
+            for i in np.flatnonzero(counts):
+                start, end = offsets[i], offsets[i + 1]
+                found[i] = [vocab[j] for j in ids[start:end][hits[start:end]]]
+            return found
+        
+        cuisine_hits = liked('cuisines', soa.cuisines, 2)[soa.cuisine_ids]
+        time_hits = liked('cooking_times', TIME_CATEGORIES, 1)[soa.time_ids]
+        tags = matches(soa.tag_offsets, soa.tag_ids, liked('dietary_tags', soa.tags, 1), soa.tags)
+        ingredients = matches(soa.ingredient_offsets, soa.ingredient_ids,
+                              liked('ingredients', soa.ingredients, 1), soa.ingredients)
+        goals = matches(soa.health_offsets, soa.health_ids,
+                        liked('health_goals', soa.health_conditions, 1), soa.health_conditions)
+        
+        batch = []
+        for i in range(len(recipes)):
+            explanations = []
+            if cuisine_hits[i]:
+                explanations.append(f"You seem to enjoy {soa.cuisines[soa.cuisine_ids[i]]} cuisine")
+            if tags[i]:
+                explanations.append(f"Matches your preferences: {', '.join(tags[i])}")
+            if time_hits[i]:
+                explanations.append(f"Fits your preferred cooking time ({TIME_CATEGORIES[soa.time_ids[i]]})")
+            if ingredients[i]:
+                explanations.append(f"Contains ingredients you like: {', '.join(ingredients[i][:3])}")
+            if goals[i]:
+                goal_names = [goal.replace('-', ' ').replace('_', ' ') for goal in goals[i]]
+                explanations.append(f"Aligns with your health goals: {', '.join(goal_names)}")
+            batch.append(explanations if explanations else ["Recommended based on overall preferences"])
+        return batch
+    
     def adapt_search_results(self, user_id: str, search_results: List[Dict]) -> List[Dict]:
         """Re-rank search results based on user preferences"""
         if user_id not in self.user_profiles:
@@ -271,28 +695,44 @@ class AdaptiveLearningEngine:
         profile = self.user_profiles[user_id]
         interactions = profile['interaction_history']
         
-        if not interactions:
+        if not len(interactions):
             return {}
         
+        now = time.time_ns()
+        cached = self._insights_cache.get(user_id)
+        if cached is not None and now < cached[1]:
+            return dict(cached[0])
+        
+        types = interactions.types
+        ratings = interactions.ratings
+        # Unrated (NaN) and zero ratings are left out of the average
+        ratings = ratings[np.isfinite(ratings) & (ratings != 0)]
+        first_seen = int(interactions.timestamps.min())
+        days_active = (now - first_seen) // NS_PER_DAY
+        
         insights = {
             'total_interactions': len(interactions),
-            'favorite_recipes': len([i for i in interactions if i['interaction_type'] == 'favorite']),
-            'recipes_cooked': len([i for i in interactions if i['interaction_type'] == 'cook']),
-            'average_rating': np.mean([i['rating'] for i in interactions if i['rating']]) if any(i['rating'] for i in interactions) else None,
+            'favorite_recipes': int(np.count_nonzero(types == 'favorite')),
+            'recipes_cooked': int(np.count_nonzero(types == 'cook')),
+            'average_rating': float(ratings.mean(dtype=np.float64)) if ratings.size else None,
             'most_active_time': self._get_most_active_time(interactions),
-            'cooking_frequency': len(interactions) / max(1, (pd.Timestamp.now() - min(i['timestamp'] for i in interactions)).days),
-            'preference_strength': self._calculate_preference_strength(profile['learned_preferences'])
+            'cooking_frequency': len(interactions) / max(1, days_active),
+            'preference_strength': self._calculate_preference_strength(self._flush_preferences(user_id))
         }
         
-        return insights
+        # Valid until the next interaction or until days_active ticks over
+        self._insights_cache[user_id] = (insights, first_seen + (days_active + 1) * NS_PER_DAY)
+        return dict(insights)
     
-    def _get_most_active_time(self, interactions: List[Dict]) -> str:
+    def _get_most_active_time(self, interactions: InteractionLog) -> str:
         """Determine when user is most active"""
-        if not interactions:
+        if not len(interactions):
             return "Unknown"
         
-        hours = [i['timestamp'].hour for i in interactions]
-        most_common_hour = max(set(hours), key=hours.count)
+        # Local wall-clock hour, using the current UTC offset
+        local_seconds = interactions.timestamps // 1_000_000_000 + time.localtime().tm_gmtoff
+        hours = local_seconds // 3600 % 24
+        most_common_hour = int(np.bincount(hours, minlength=24).argmax())
         
         if 6 <= most_common_hour < 12:
             return "Morning"
@@ -305,19 +745,13 @@ class AdaptiveLearningEngine:
     
     def _calculate_preference_strength(self, learned_preferences: Dict) -> float:
         """Calculate how strong/defined the user's preferences are"""
-        total_interactions = 0
-        strong_preferences = 0
-        
-        for category, prefs in learned_preferences.items():
-            for pref, score in prefs.items():
-                total_interactions += abs(score)
-                if abs(score) > 3:  # Strong preference threshold
-                    strong_preferences += 1
+        magnitudes = np.abs(np.concatenate([prefs.weights for prefs in learned_preferences.values()]))
         
-        if total_interactions == 0:
+        if not magnitudes.any():
             return 0.0
         
-        return strong_preferences / max(1, len([p for category in learned_preferences.values() for p in category]))
+        strong_preferences = int(np.count_nonzero(magnitudes > 3))  # Strong preference threshold
+        return strong_preferences / magnitudes.size
 
 # Streamlit integration functions
 def display_adaptive_learning_insights(learning_engine: AdaptiveLearningEngine, user_id: str):
@@ -5,66 +5,245 @@ import streamlit as st
 from transformers import BlipProcessor, BlipForConditionalGeneration
 import torch
 from typing import List, Dict, Any, Tuple
+from io import BytesIO
+import functools
+from types import MappingProxyType
+import importlib.util
 import re
 
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# ONNX Runtime export of BLIP for CPU serving, imported lazily when used
+OPTIMUM_AVAILABLE = importlib.util.find_spec("optimum") is not None
+
+BLIP_MODEL_NAME = "Salesforce/blip-image-captioning-base"
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Ingredient captions are short, so greedy decoding of a few tokens is enough;
+# the beam-search settings remain available for higher-quality captions
+_FAST_GENERATION = MappingProxyType({'max_new_tokens': 30, 'num_beams': 1, 'do_sample': False})
+_HIGH_QUALITY_GENERATION = MappingProxyType({'max_length': 100, 'num_beams': 5})
+# Deciding whether an image shows food needs only the first few caption tokens
+_VALIDATION_GENERATION = MappingProxyType({'max_new_tokens': 10, 'num_beams': 1, 'do_sample': False})
+
+# Lowercase ingredient keywords by category, in match-reporting order;
+# tuples keep that order while making the shared table immutable
+_INGREDIENT_KEYWORDS = MappingProxyType({
+    'vegetables': (
+        'tomato', 'tomatoes', 'onion', 'onions', 'carrot', 'carrots',
+        'broccoli', 'spinach', 'lettuce', 'bell pepper', 'peppers',
+        'cucumber', 'zucchini', 'eggplant', 'potato', 'potatoes',
+        'garlic', 'ginger', 'mushroom', 'mushrooms', 'avocado',
+        'corn', 'peas', 'beans', 'celery', 'cauliflower'
+    ),
+    'fruits': (
+        'apple', 'apples', 'banana', 'bananas', 'orange', 'oranges',
+        'lemon', 'lemons', 'lime', 'limes', 'strawberry', 'strawberries',
+        'blueberry', 'blueberries', 'grape', 'grapes', 'pineapple',
+        'mango', 'kiwi', 'peach', 'pear', 'cherry', 'cherries'
+    ),
+    'proteins': (
+        'chicken', 'beef', 'pork', 'fish', 'salmon', 'tuna',
+        'shrimp', 'eggs', 'tofu', 'beans', 'lentils', 'chickpeas',
+        'turkey', 'lamb', 'bacon', 'ham', 'cheese', 'nuts'
+    ),
+    'grains': (
+        'rice', 'pasta', 'bread', 'quinoa', 'oats', 'barley',
+        'wheat', 'flour', 'cereal', 'noodles', 'couscous'
+    ),
+    'dairy': (
+        'milk', 'cheese', 'yogurt', 'butter', 'cream', 'ice cream'
+    ),
+    'herbs_spices': (
+        'basil', 'oregano', 'thyme', 'rosemary', 'parsley', 'cilantro',
+        'mint', 'sage', 'cinnamon', 'pepper', 'salt', 'cumin',
+        'paprika', 'turmeric', 'ginger', 'garlic'
+    )
+})
+
+# Cooking method suggestions based on ingredients, keyed by display name
+_METHOD_MAPPINGS = MappingProxyType({
+    method.replace('_', ' ').title(): frozenset(method_ingredients)
+    for method, method_ingredients in {
+        'stir_fry': ['vegetables', 'bell pepper', 'broccoli', 'carrot'],
+        'salad': ['lettuce', 'cucumber', 'tomato', 'avocado'],
+        'soup': ['onion', 'carrot', 'celery', 'broth'],
+        'pasta': ['pasta', 'noodles', 'tomato', 'cheese'],
+        'grilling': ['chicken', 'beef', 'fish', 'vegetables'],
+        'baking': ['chicken', 'fish', 'potato', 'vegetables'],
+        'steaming': ['broccoli', 'cauliflower', 'fish', 'vegetables'],
+        'roasting': ['potato', 'carrot', 'chicken', 'beef']
+    }.items()
+})
+
+# Substring (not whole-word) matches, so e.g. 'vegetables' counts as 'vegetable'
+_QUANTITY_WORDS_RE = re.compile('many|several|bunch|lots|multiple')
+_FOOD_WORDS_RE = re.compile('food|ingredient|vegetable|fruit|meat|cooking|kitchen')
+
+def _trie_regex(words) -> str:
+    """Regex alternation of words, factored through a character trie
+
+    Shared prefixes are matched once, so the pattern never tries every
+    alternative in turn; optional suffixes are greedy, so longer words are
+    tried first.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return '(?:' + body + ')?' if '' in node else body
+    
+    return build(trie)
+
+def _popcount_rows(words: np.ndarray) -> np.ndarray:
+    """Number of set bits in each row of a 2-D uint64 array"""
+    as_bytes = np.ascontiguousarray(words).view(np.uint8).reshape(words.shape[0], words.shape[1] * 8)
+    return np.unpackbits(as_bytes, axis=1).sum(axis=1)
+
+def _match_percentages_numpy(bits: np.ndarray, query: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    """Percentage of each recipe's ingredients present in the query bit row"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _popcount_rows(bits & query) / sizes * 100
+
+if NUMBA_AVAILABLE:
+    @njit
+    def _popcount64(x):
+        x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+        x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+        x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+        return (x * np.uint64(0x0101010101010101)) >> np.uint64(56)
+    
+    @njit(parallel=True)
+    def _match_percentages_kernel(bits, query, sizes):
+        n, width = bits.shape
+        percentages = np.zeros(n)
+        for r in prange(n):
+            overlap = 0
+            for w in range(width):
+                overlap += _popcount64(bits[r, w] & query[w])
+            if sizes[r] > 0:
+                percentages[r] = overlap / sizes[r] * 100
+        return percentages
+    
+    match_percentages = _match_percentages_kernel
+else:
+    match_percentages = _match_percentages_numpy
+
+def _is_word_char(char: str) -> bool:
+    """Whether char counts as a word character for a regex \\b boundary"""
+    return char.isalnum() or char == '_'
+
+def _load_onnx_captioner():
+    """BLIP exported to ONNX Runtime on the CPU provider, or None if unavailable"""
+    if not OPTIMUM_AVAILABLE:
+        return None
+    try:
+        from optimum.onnxruntime import ORTModelForVision2Seq
+        return ORTModelForVision2Seq.from_pretrained(BLIP_MODEL_NAME, export=True,
+                                                     provider="CPUExecutionProvider")
+    except Exception:
+        # Optimum releases that cannot export BLIP fall back to PyTorch
+        return None
+
+@st.cache_resource
+def _load_blip_models():
+    """Load the BLIP captioning models once per process"""
+    try:
+        # BLIP model for image captioning
+        processor = BlipProcessor.from_pretrained(BLIP_MODEL_NAME)
+        
+        # Half precision on GPU; CPUs lack fast fp16 kernels, so stay in fp32 there
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        dtype = torch.float16 if device == "cuda" else torch.float32
+        
+        # On CPU prefer ONNX Runtime's fused graph; it exposes the same generate API
+        model = _load_onnx_captioner() if device == "cpu" else None
+        if model is None:
+            model = BlipForConditionalGeneration.from_pretrained(BLIP_MODEL_NAME)
+            model = model.to(device=device, dtype=dtype)
+            model.eval()
+            
+            if device == "cpu":
+                # Linear layers dominate the decoder; int8 weights use the CPU's VNNI/AMX GEMMs
+                model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            else:
+                # Inputs are always 384px, so cuDNN's autotuned kernels stay valid
+                torch.backends.cudnn.benchmark = True
+                # generate() calls forward once per token with a growing sequence,
+                # so compile that method with dynamic shapes
+                if hasattr(torch, "compile"):
+                    model.forward = torch.compile(model.forward, dynamic=True)
+        
+        return {
+            'blip_processor': processor,
+            'blip_model': model,
+            'device': device,
+            'dtype': dtype
+        }
+    except Exception as e:
+        st.error(f"Error loading models: {e}")
+        return None
+
 class ImageRecognitionEngine:
     """Advanced image recognition for ingredient and food identification"""
     
     def __init__(self):
-        self.load_models()
+        self.models = _load_blip_models()
         self.ingredient_keywords = self.load_ingredient_keywords()
         self.food_categories = self.load_food_categories()
-    
-    @st.cache_resource
-    def load_models(_self):
-        """Load image recognition models"""
-        try:
-            # BLIP model for image captioning
-            processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
-            model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base")
-            
-            return {
-                'blip_processor': processor,
-                'blip_model': model
-            }
-        except Exception as e:
-            st.error(f"Error loading models: {e}")
-            return None
+        self._build_matchers()
+        # (database list, fingerprint, encoding) from the last find_matching_recipes call
+        self._recipe_bitsets = None
     
     def load_ingredient_keywords(self):
         """Load comprehensive ingredient keyword mapping"""
-        return {
-            'vegetables': [
-                'tomato', 'tomatoes', 'onion', 'onions', 'carrot', 'carrots',
-                'broccoli', 'spinach', 'lettuce', 'bell pepper', 'peppers',
-                'cucumber', 'zucchini', 'eggplant', 'potato', 'potatoes',
-                'garlic', 'ginger', 'mushroom', 'mushrooms', 'avocado',
-                'corn', 'peas', 'beans', 'celery', 'cauliflower'
-            ],
-            'fruits': [
-                'apple', 'apples', 'banana', 'bananas', 'orange', 'oranges',
-                'lemon', 'lemons', 'lime', 'limes', 'strawberry', 'strawberries',
-                'blueberry', 'blueberries', 'grape', 'grapes', 'pineapple',
-                'mango', 'kiwi', 'peach', 'pear', 'cherry', 'cherries'
-            ],
-            'proteins': [
-                'chicken', 'beef', 'pork', 'fish', 'salmon', 'tuna',
-                'shrimp', 'eggs', 'tofu', 'beans', 'lentils', 'chickpeas',
-                'turkey', 'lamb', 'bacon', 'ham', 'cheese', 'nuts'
-            ],
-            'grains': [
-                'rice', 'pasta', 'bread', 'quinoa', 'oats', 'barley',
-                'wheat', 'flour', 'cereal', 'noodles', 'couscous'
-            ],
-            'dairy': [
-                'milk', 'cheese', 'yogurt', 'butter', 'cream', 'ice cream'
-            ],
-            'herbs_spices': [
-                'basil', 'oregano', 'thyme', 'rosemary', 'parsley', 'cilantro',
-                'mint', 'sage', 'cinnamon', 'pepper', 'salt', 'cumin',
-                'paprika', 'turmeric', 'ginger', 'garlic'
-            ]
-        }
+        return _INGREDIENT_KEYWORDS
+    
+    def _build_matchers(self):
+        """Precompute the keyword matcher used by extract_ingredients_from_description"""
+        keywords = [kw for category_keywords in self.ingredient_keywords.values() for kw in category_keywords]
+        # Keywords listed under several categories belong to the first one
+        self._ingredient_to_category = {}
+        for category, category_keywords in self.ingredient_keywords.items():
+            for kw in category_keywords:
+                self._ingredient_to_category.setdefault(kw.lower(), category)
+        # Results are reported in keyword-list order, as the per-keyword scan did
+        self._keyword_rank = {kw: rank for rank, kw in enumerate(dict.fromkeys(keywords))}
+        by_text = {}
+        for kw in self._keyword_rank:
+            by_text.setdefault(kw.lower(), []).append(kw)
+        
+        if AHOCORASICK_AVAILABLE:
+            self._keyword_automaton = ahocorasick.Automaton()
+            for text, originals in by_text.items():
+                self._keyword_automaton.add_word(text, (len(text), tuple(originals)))
+            self._keyword_automaton.make_automaton()
+        else:
+            self._keyword_automaton = None
+            # Zero-width lookahead so one finditer also reports overlapping keywords;
+            # at most one keyword is reported per start position (the longest)
+            self._keyword_pattern = re.compile(r'(?=\b(' + _trie_regex(by_text) + r')\b)')
+            self._keywords_by_text = by_text
+        
+        # Identical captions recur across uploads; results are tuples so they can be shared
+        self._match_keywords = functools.lru_cache(maxsize=2048)(self._match_keywords_uncached)
     
     def load_food_categories(self):
         """Load food category mappings for better classification"""
@@ -81,20 +260,31 @@ class ImageRecognitionEngine:
         if image.mode != 'RGB':
             image = image.convert('RGB')
         
-        # Resize if too large
-        max_size = 1024
+        # Resize if too large; BLIP's processor works at 384px, so anything
+        # larger is only resampled again there
+        max_size = 384
         if max(image.size) > max_size:
             ratio = max_size / max(image.size)
             new_size = tuple(int(dim * ratio) for dim in image.size)
-            image = image.resize(new_size, Image.Resampling.LANCZOS)
+            if ratio < 0.5:
+                # Large downscales: OpenCV's area averaging antialiases properly and is SIMD-fast
+                image = Image.fromarray(cv2.resize(np.asarray(image), new_size, interpolation=cv2.INTER_AREA))
+            else:
+                image = image.resize(new_size, Image.Resampling.BILINEAR)
         
         return image
     
-    def analyze_image(self, image: Image.Image) -> Dict[str, Any]:
+    def analyze_image(self, image: Image.Image, high_quality: bool = False) -> Dict[str, Any]:
         """Comprehensive image analysis"""
-        image = self.preprocess_image(image)
+        return self.batch_analyze([image], high_quality)[0]
+    
+    def batch_analyze(self, images: List[Image.Image], high_quality: bool = False) -> List[Dict[str, Any]]:
+        """analyze_image for several images, captioning them in one BLIP batch"""
+        if not images:
+            return []
+        images = [self.preprocess_image(image) for image in images]
         
-        analysis_result = {
+        analysis_results = [{
             'raw_description': '',
             'identified_ingredients': [],
             'ingredient_categories': {},
@@ -102,92 +292,102 @@ class ImageRecognitionEngine:
             'recipe_suggestions': [],
             'cooking_methods': [],
             'estimated_servings': 1
-        }
+        } for _ in images]
         
-        # Get image description using BLIP
+        # Get image descriptions using BLIP
         try:
-            models = self.load_models()
-            if models:
-                # Generate description
-                inputs = models['blip_processor'](image, return_tensors="pt")
-                out = models['blip_model'].generate(**inputs, max_length=100, num_beams=5)
-                description = models['blip_processor'].decode(out[0], skip_special_tokens=True)
-                
-                analysis_result['raw_description'] = description
-                
-                # Extract ingredients from description
-                ingredients = self.extract_ingredients_from_description(description)
-                analysis_result['identified_ingredients'] = ingredients
-                
-                # Categorize ingredients
-                analysis_result['ingredient_categories'] = self.categorize_ingredients(ingredients)
-                
-                # Suggest cooking methods
-                analysis_result['cooking_methods'] = self.suggest_cooking_methods(ingredients)
-                
-                # Estimate servings
-                analysis_result['estimated_servings'] = self.estimate_servings(ingredients, description)
+            if self.models:
+                for analysis_result, description in zip(analysis_results, self.caption_images(images, high_quality)):
+                    self._fill_analysis(analysis_result, description)
                 
         except Exception as e:
             st.error(f"Error in image analysis: {e}")
-            analysis_result['raw_description'] = "Unable to analyze image"
+            for analysis_result in analysis_results:
+                analysis_result['raw_description'] = "Unable to analyze image"
         
-        return analysis_result
+        return analysis_results
     
-    def extract_ingredients_from_description(self, description: str) -> List[str]:
-        """Extract ingredients from image description"""
+    def caption_images(self, images: List[Image.Image], high_quality: bool = False) -> List[str]:
+        """Caption preprocessed images with a single batched generate call
+        
+        Decoding is greedy unless high_quality asks for beam search.
+        """
+        return self._generate_captions(images, _HIGH_QUALITY_GENERATION if high_quality else _FAST_GENERATION)
+    
+    def _generate_captions(self, images: List[Image.Image], generation) -> List[str]:
+        """Run one batched BLIP generate call with the given generation settings"""
+        models = self.models
+        inputs = models['blip_processor'](images=images, return_tensors="pt").to(models['device'])
+        inputs['pixel_values'] = inputs['pixel_values'].to(models['dtype'])
+        with torch.inference_mode():
+            out = models['blip_model'].generate(**inputs, **generation)
+        return models['blip_processor'].batch_decode(out, skip_special_tokens=True)
+    
+    def _fill_analysis(self, analysis_result: Dict[str, Any], description: str):
+        """Derive the text-based analysis fields from an image description"""
+        analysis_result['raw_description'] = description
         description_lower = description.lower()
-        identified_ingredients = []
         
-        # Check for each ingredient category
-        for category, ingredients in self.ingredient_keywords.items():
-            for ingredient in ingredients:
+        # Extract ingredients from description
+        ingredients = self.extract_ingredients_from_description(description, description_lower)
+        analysis_result['identified_ingredients'] = ingredients
+        
+        # Categorize ingredients
+        analysis_result['ingredient_categories'] = self.categorize_ingredients(ingredients)
+        
+        # Suggest cooking methods
+        analysis_result['cooking_methods'] = self.suggest_cooking_methods(ingredients)
+        
+        # Estimate servings
+        analysis_result['estimated_servings'] = self.estimate_servings(ingredients, description, description_lower)
+    
+    def extract_ingredients_from_description(self, description: str, description_lower: str = None) -> List[str]:
+        """Extract ingredients from image description"""
+        if description_lower is None:
+            description_lower = description.lower()
+        return list(self._match_keywords(description_lower))
+    
+    def _match_keywords_uncached(self, description_lower: str) -> Tuple[str, ...]:
+        """Keywords found in a lowercased description, in keyword-list order"""
+        found = set()
+        
+        if self._keyword_automaton is not None:
+            # One pass over the text reports every (possibly overlapping) keyword hit
+            last = len(description_lower) - 1
+            for end, (length, originals) in self._keyword_automaton.iter(description_lower):
+                start = end - length + 1
                 # Use word boundaries to avoid partial matches
-                pattern = r'\b' + re.escape(ingredient.lower()) + r'\b'
-                if re.search(pattern, description_lower):
-                    identified_ingredients.append(ingredient)
+                if start > 0 and _is_word_char(description_lower[start - 1]):
+                    continue
+                if end < last and _is_word_char(description_lower[end + 1]):
+                    continue
+                found.update(originals)
+        else:
+            for match in self._keyword_pattern.finditer(description_lower):
+                found.update(self._keywords_by_text[match.group(1)])
         
-        # Remove duplicates while preserving order
-        return list(dict.fromkeys(identified_ingredients))
+        return tuple(sorted(found, key=self._keyword_rank.__getitem__))
     
     def categorize_ingredients(self, ingredients: List[str]) -> Dict[str, List[str]]:
         """Categorize identified ingredients"""
         categorized = {category: [] for category in self.ingredient_keywords.keys()}
         
         for ingredient in ingredients:
-            for category, category_ingredients in self.ingredient_keywords.items():
-                if ingredient.lower() in [ing.lower() for ing in category_ingredients]:
-                    categorized[category].append(ingredient)
-                    break
+            category = self._ingredient_to_category.get(ingredient.lower())
+            if category is not None:
+                categorized[category].append(ingredient)
         
         # Remove empty categories
         return {k: v for k, v in categorized.items() if v}
     
     def suggest_cooking_methods(self, ingredients: List[str]) -> List[str]:
         """Suggest cooking methods based on identified ingredients"""
-        cooking_methods = []
-        
-        # Method suggestions based on ingredients
-        method_mappings = {
-            'stir_fry': ['vegetables', 'bell pepper', 'broccoli', 'carrot'],
-            'salad': ['lettuce', 'cucumber', 'tomato', 'avocado'],
-            'soup': ['onion', 'carrot', 'celery', 'broth'],
-            'pasta': ['pasta', 'noodles', 'tomato', 'cheese'],
-            'grilling': ['chicken', 'beef', 'fish', 'vegetables'],
-            'baking': ['chicken', 'fish', 'potato', 'vegetables'],
-            'steaming': ['broccoli', 'cauliflower', 'fish', 'vegetables'],
-            'roasting': ['potato', 'carrot', 'chicken', 'beef']
-        }
-        
         ingredient_set = set(ing.lower() for ing in ingredients)
         
-        for method, method_ingredients in method_mappings.items():
-            if any(ing in ingredient_set for ing in method_ingredients):
-                cooking_methods.append(method.replace('_', ' ').title())
-        
-        return cooking_methods
+        return [method_name for method_name, method_ingredients in _METHOD_MAPPINGS.items()
+                if not method_ingredients.isdisjoint(ingredient_set)]
     
-    def estimate_servings(self, ingredients: List[str], description: str) -> int:
+    def estimate_servings(self, ingredients: List[str], description: str, description_lower: str = None) -> int:
         """Estimate number of servings based on ingredients and description"""
         # Simple heuristic based on number of ingredients and description
         base_servings = 1
@@ -201,33 +401,69 @@ class ImageRecognitionEngine:
             base_servings = 4
         
         # Look for quantity indicators in description
-        quantity_words = ['many', 'several', 'bunch', 'lots', 'multiple']
-        if any(word in description.lower() for word in quantity_words):
+        if description_lower is None:
+            description_lower = description.lower()
+        if _QUANTITY_WORDS_RE.search(description_lower):
             base_servings += 1
         
         return min(6, max(1, base_servings))  # Cap between 1-6 servings
     
+    def _get_recipe_bitsets(self, recipe_database: List[Dict]) -> Tuple[Dict, tuple, np.ndarray, np.ndarray]:
+        """Encode each recipe's lowercased ingredient set as a row of uint64 bit words
+        
+        Returns (vocab, per-recipe sets, bits[R, W], set sizes). The encoding
+        is kept for the most recent database list.
+        """
+        fingerprint = (len(recipe_database),
+                       recipe_database[0].get('id') if recipe_database else None,
+                       recipe_database[-1].get('id') if recipe_database else None)
+        cached = self._recipe_bitsets
+        if cached is not None and cached[0] is recipe_database and cached[1] == fingerprint:
+            return cached[2]
+        
+        recipe_sets = tuple(frozenset(ing.lower() for ing in recipe.get('ingredients', []))
+                            for recipe in recipe_database)
+        vocab = {}
+        for recipe_set in recipe_sets:
+            for ingredient in recipe_set:
+                vocab.setdefault(ingredient, len(vocab))
+        
+        bits = np.zeros((len(recipe_sets), max(1, (len(vocab) + 63) // 64)), dtype=np.uint64)
+        for row, recipe_set in enumerate(recipe_sets):
+            for ingredient in recipe_set:
+                word, bit = divmod(vocab[ingredient], 64)
+                bits[row, word] |= np.uint64(1) << np.uint64(bit)
+        sizes = np.fromiter((len(recipe_set) for recipe_set in recipe_sets), dtype=np.int64, count=len(recipe_sets))
+        
+        encoding = (vocab, recipe_sets, bits, sizes)
+        self._recipe_bitsets = (recipe_database, fingerprint, encoding)
+        return encoding
+    
     def find_matching_recipes(self, analysis_result: Dict, recipe_database: List[Dict]) -> List[Dict]:
         """Find recipes that match identified ingredients"""
         identified_ingredients = set(ing.lower() for ing in analysis_result['identified_ingredients'])
-        matching_recipes = []
+        vocab, recipe_sets, bits, sizes = self._get_recipe_bitsets(recipe_database)
         
-        for recipe in recipe_database:
-            recipe_ingredients = set(ing.lower() for ing in recipe.get('ingredients', []))
-            
-            # Calculate ingredient match percentage
-            if recipe_ingredients:
-                overlap = identified_ingredients.intersection(recipe_ingredients)
-                match_percentage = len(overlap) / len(recipe_ingredients) * 100
-                
-                if match_percentage > 20:  # At least 20% ingredient match
-                    recipe_with_score = recipe.copy()
-                    recipe_with_score['ingredient_match_score'] = match_percentage
-                    recipe_with_score['matching_ingredients'] = list(overlap)
-                    matching_recipes.append(recipe_with_score)
+        query = np.zeros(bits.shape[1], dtype=np.uint64)
+        for ingredient in identified_ingredients:
+            if ingredient in vocab:
+                word, bit = divmod(vocab[ingredient], 64)
+                query[word] |= np.uint64(1) << np.uint64(bit)
+        
+        # Calculate ingredient match percentage for every recipe at once
+        percentages = match_percentages(bits, query, sizes)
+        # At least 20% ingredient match; recipes without ingredients never match
+        matched = np.flatnonzero((sizes > 0) & (percentages > 20))
         
         # Sort by match score
-        matching_recipes.sort(key=lambda x: x['ingredient_match_score'], reverse=True)
+        matched = matched[np.argsort(-percentages[matched], kind='stable')]
+        
+        matching_recipes = []
+        for i in matched:
+            recipe_with_score = recipe_database[i].copy()
+            recipe_with_score['ingredient_match_score'] = float(percentages[i])
+            recipe_with_score['matching_ingredients'] = list(identified_ingredients.intersection(recipe_sets[i]))
+            matching_recipes.append(recipe_with_score)
         
         return matching_recipes
     
@@ -275,9 +511,33 @@ class ImageRecognitionEngine:
         
         return suggestions[:5]  # Return top 5 suggestions
     
-    def validate_ingredient_image(self, image: Image.Image) -> Dict[str, Any]:
-        """Validate if image contains food/ingredients"""
-        analysis = self.analyze_image(image)
+    def validate_images(self, images: List[Image.Image]) -> List[Dict[str, Any]]:
+        """Validate images from a short greedy caption, skipping the full analysis"""
+        if not images:
+            return []
+        images = [self.preprocess_image(image) for image in images]
+        
+        try:
+            descriptions = self._generate_captions(images, _VALIDATION_GENERATION) if self.models else [''] * len(images)
+        except Exception as e:
+            st.error(f"Error in image analysis: {e}")
+            descriptions = ["Unable to analyze image"] * len(images)
+        
+        validations = []
+        for image, description in zip(images, descriptions):
+            description_lower = description.lower()
+            analysis = {
+                'raw_description': description,
+                'identified_ingredients': self.extract_ingredients_from_description(description, description_lower)
+            }
+            validations.append(self.validate_ingredient_image(image, analysis, description_lower))
+        return validations
+    
+    def validate_ingredient_image(self, image: Image.Image, analysis: Dict = None,
+                                  description_lower: str = None) -> Dict[str, Any]:
+        """Validate if image contains food/ingredients, reusing analysis when given"""
+        if analysis is None:
+            return self.validate_images([image])[0]
         
         validation_result = {
             'is_food_image': False,
@@ -292,10 +552,10 @@ class ImageRecognitionEngine:
             validation_result['confidence'] = min(0.9, len(analysis['identified_ingredients']) * 0.15)
         
         # Additional validation based on description
-        food_keywords = ['food', 'ingredient', 'vegetable', 'fruit', 'meat', 'cooking', 'kitchen']
-        description_lower = analysis['raw_description'].lower()
+        if description_lower is None:
+            description_lower = analysis['raw_description'].lower()
         
-        if any(keyword in description_lower for keyword in food_keywords):
+        if _FOOD_WORDS_RE.search(description_lower):
             validation_result['is_food_image'] = True
             validation_result['confidence'] = max(validation_result['confidence'], 0.6)
         
@@ -311,6 +571,23 @@ class ImageRecognitionEngine:
         return validation_result
 
 # Streamlit integration functions
+@st.cache_resource
+def get_engine() -> ImageRecognitionEngine:
+    """Shared ImageRecognitionEngine, built once per process instead of per rerun"""
+    return ImageRecognitionEngine()
+
+@st.cache_data(show_spinner=False)
+def _validate_images_bytes(images_bytes: Tuple[bytes, ...]) -> List[Dict[str, Any]]:
+    """Validate a set of uploaded images once per distinct upload"""
+    images = [Image.open(BytesIO(image_bytes)) for image_bytes in images_bytes]
+    return get_engine().validate_images(images)
+
+@st.cache_data(show_spinner=False)
+def _analyze_images_bytes(images_bytes: Tuple[bytes, ...]) -> List[Dict[str, Any]]:
+    """Analyze a set of uploaded images once per distinct upload"""
+    images = [Image.open(BytesIO(image_bytes)) for image_bytes in images_bytes]
+    return get_engine().batch_analyze(images)
+
 def display_image_analysis_results(analysis_result: Dict):
     """Display image analysis results in Streamlit"""
     st.subheader("📸 Image Analysis Results")
@@ -351,42 +628,54 @@ def display_image_analysis_results(analysis_result: Dict):
                 st.write(f"**Difficulty:** {suggestion['difficulty']}")
 
 def create_image_upload_interface():
-    """Create image upload interface with validation"""
+    """Create image upload interface with validation
+    
+    Returns the analyses of the uploaded food images once the user asks for
+    them, otherwise None.
+    """
     st.subheader("📸 Upload Ingredient Image")
     
-    uploaded_file = st.file_uploader(
-        "Choose an image...", 
+    uploaded_files = st.file_uploader(
+        "Choose images...", 
         type=['jpg', 'jpeg', 'png'],
-        help="Upload a clear image of ingredients you want to cook with"
+        accept_multiple_files=True,
+        help="Upload clear images of ingredients you want to cook with"
     )
     
-    if uploaded_file is not None:
-        image = Image.open(uploaded_file)
-        
-        # Display uploaded image
-        col1, col2 = st.columns([1, 2])
-        
-        with col1:
-            st.image(image, caption="Uploaded Image", use_column_width=True)
-        
-        with col2:
-            # Image validation
-            engine = ImageRecognitionEngine()
-            validation = engine.validate_ingredient_image(image)
+    if uploaded_files:
+        # Validation uses a short caption; the full analysis only runs once the
+        # user asks for it. Both are cached on the upload bytes across reruns
+        images_bytes = tuple(uploaded_file.getvalue() for uploaded_file in uploaded_files)
+        with st.spinner("Checking images..."):
+            validations = _validate_images_bytes(images_bytes)
+        
+        food_images = []
+        for uploaded_file, image_bytes, validation in zip(uploaded_files, images_bytes, validations):
+            image = Image.open(BytesIO(image_bytes))
             
-            if validation['is_food_image']:
-                st.success(f"✅ Food image detected (Confidence: {validation['confidence']:.1%})")
-                
-                if st.button("🔍 Analyze Image"):
-                    with st.spinner("Analyzing image..."):
-                        analysis_result = engine.analyze_image(image)
-                        display_image_analysis_results(analysis_result)
-                        return analysis_result
-            else:
-                st.warning("⚠️ This doesn't appear to be a food/ingredient image")
-                st.write("**Suggestions:**")
-                for suggestion in validation['suggestions']:
-                    st.write(f"• {suggestion}")
+            # Display uploaded image
+            col1, col2 = st.columns([1, 2])
+            
+            with col1:
+                st.image(image, caption=uploaded_file.name, use_column_width=True)
+            
+            with col2:
+                # Image validation
+                if validation['is_food_image']:
+                    st.success(f"✅ Food image detected (Confidence: {validation['confidence']:.1%})")
+                    food_images.append(image_bytes)
+                else:
+                    st.warning("⚠️ This doesn't appear to be a food/ingredient image")
+                    st.write("**Suggestions:**")
+                    for suggestion in validation['suggestions']:
+                        st.write(f"• {suggestion}")
+        
+        if food_images and st.button("🔍 Analyze Images"):
+            with st.spinner("Analyzing images..."):
+                analysis_results = _analyze_images_bytes(tuple(food_images))
+            for analysis_result in analysis_results:
+                display_image_analysis_results(analysis_result)
+            return analysis_results
     
     return None
 
@@ -1,9 +1,243 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Callable
+from collections.abc import Mapping
+import functools
+import operator
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from types import MappingProxyType
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+def _freeze(value):
+    """Read-only view of nested dicts and lists, shared by every analyzer"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+# Column order of the nutrient table fed to the health-score kernels
+HEALTH_NUTRIENTS = ('calories', 'protein', 'fiber', 'sodium', 'saturated_fat', 'fat', 'carbs', 'sugar')
+HEALTH_SCORE_NAMES = ('nutrient_density', 'heart_health', 'weight_management', 'diabetes_friendly')
+ANALYSIS_CACHE_SIZE = 1024
+COMPARISON_CACHE_SIZE = 128
+_MACRO_PERCENT_KEYS = ('protein_percent', 'carbs_percent', 'fat_percent')
+
+# Recommended daily values per nutrient and user category
+_DAILY_VALUES = _freeze({
+    'calories': {'adult_male': 2500, 'adult_female': 2000, 'child': 1800},
+    'protein': {'adult_male': 56, 'adult_female': 46, 'child': 34},  # grams
+    'carbs': {'adult_male': 325, 'adult_female': 325, 'child': 260},  # grams
+    'fat': {'adult_male': 78, 'adult_female': 65, 'child': 62},  # grams
+    'fiber': {'adult_male': 38, 'adult_female': 25, 'child': 25},  # grams
+    'sodium': {'adult_male': 2300, 'adult_female': 2300, 'child': 1900},  # mg
+    'sugar': {'adult_male': 36, 'adult_female': 25, 'child': 25},  # grams
+    'saturated_fat': {'adult_male': 20, 'adult_female': 20, 'child': 18},  # grams
+})
+
+_NUTRIENT_CATEGORIES = _freeze({
+    'macronutrients': ['calories', 'protein', 'carbs', 'fat'],
+    'micronutrients': ['vitamin_c', 'vitamin_d', 'iron', 'calcium'],
+    'limiting_nutrients': ['sodium', 'sugar', 'saturated_fat'],
+    'beneficial_nutrients': ['fiber', 'protein', 'omega3']
+})
+
+_HEALTH_TARGETS = _freeze({
+    'diabetes': {
+        'carbs': {'max_percent': 45, 'focus': 'complex_carbs'},
+        'fiber': {'min': 30},
+        'sugar': {'max': 25},
+        'glycemic_index': {'preference': 'low'}
+    },
+    'heart_health': {
+        'saturated_fat': {'max_percent': 7},
+        'sodium': {'max': 1500},
+        'omega3': {'min': 1.1},
+        'fiber': {'min': 25}
+    },
+    'weight_loss': {
+        'calories': {'deficit': 500},  # 500 cal below maintenance
+        'protein': {'min_percent': 25},
+        'fiber': {'min': 30},
+        'water_content': {'preference': 'high'}
+    },
+    'muscle_gain': {
+        'protein': {'min': 1.6, 'unit': 'g_per_kg_bodyweight'},
+        'calories': {'surplus': 300},
+        'carbs': {'timing': 'post_workout'}
+    }
+})
+
+# (health goal or None for everyone, value source, nutrient, comparison, limit, kind, message),
+# checked in order; the daily_value source reads percentages of the daily value
+_RECOMMENDATION_RULES = (
+    (None, 'nutrition', 'calories', '<', 200, 'recommendation',
+     "Consider adding healthy fats or complex carbs to increase calorie content"),
+    (None, 'nutrition', 'calories', '>', 600, 'recommendation',
+     "This is a high-calorie recipe - consider reducing portion size or balancing with lighter meals"),
+    (None, 'daily_value', 'protein', '>', 30, 'recommendation',
+     "Excellent protein source! Great for muscle maintenance and satiety"),
+    (None, 'daily_value', 'protein', '<', 10, 'recommendation',
+     "Consider adding protein sources like beans, nuts, or lean meat"),
+    (None, 'nutrition', 'fiber', '>', 10, 'recommendation',
+     "High fiber content promotes digestive health and satiety"),
+    (None, 'nutrition', 'fiber', '<', 3, 'recommendation',
+     "Consider adding vegetables, fruits, or whole grains for more fiber"),
+    (None, 'daily_value', 'sodium', '>', 25, 'warning',
+     "High sodium content - consider reducing salt or using herbs and spices"),
+    (None, 'nutrition', 'fat', '>', 25, 'warning',
+     "High fat content - ensure they're healthy fats from sources like olive oil, nuts, or avocado"),
+    ('weight_loss', 'nutrition', 'calories', '>', 400, 'recommendation',
+     "For weight loss, consider reducing portion size or adding more vegetables"),
+    ('diabetes', 'nutrition', 'carbs', '>', 45, 'warning',
+     "High carbohydrate content - monitor blood sugar if diabetic"),
+    ('heart_health', 'nutrition', 'sodium', '>', 400, 'warning',
+     "Consider reducing sodium for better heart health"),
+)
+
+_COMPARISONS = MappingProxyType({'<': operator.lt, '>': operator.gt})
+
+# Recipe modification goal -> (nutrient, comparison, limit, current-value format, title, suggestion, impact)
+_MODIFICATION_RULES = MappingProxyType({
+    'reduce_sodium': ('sodium', '>', 400, "{}mg", 'Reduce Sodium',
+                      'Use herbs and spices instead of salt, rinse canned ingredients', 'Reduces sodium by 30-50%'),
+    'increase_protein': ('protein', '<', 15, "{}g", 'Increase Protein',
+                         'Add beans, nuts, Greek yogurt, or lean meat', 'Can add 10-20g protein'),
+    'reduce_calories': ('calories', '>', 400, "{} cal", 'Reduce Calories',
+                        'Reduce oil, use cooking spray, increase vegetables', 'Can reduce by 100-200 calories'),
+    'increase_fiber': ('fiber', '<', 5, "{}g", 'Increase Fiber',
+                       'Add vegetables, switch to whole grains, include beans', 'Can add 5-10g fiber'),
+})
+
+# Rules resolved for _generate_recommendations: raw nutrients become positions in
+# the HEALTH_NUTRIENTS tuple. Missing calories read as 1 there rather than 0,
+# which no calorie threshold can tell apart.
+_RECOMMENDATION_CHECKS = tuple(
+    (goal, source == 'daily_value',
+     nutrient if source == 'daily_value' else HEALTH_NUTRIENTS.index(nutrient),
+     _COMPARISONS[op], limit, kind, message)
+    for goal, source, nutrient, op, limit, kind, message in _RECOMMENDATION_RULES
+)
+
+def _health_scores_python(calories, protein, fiber, sodium, saturated_fat, fat, carbs, sugar):
+    """Nutrient density, heart health, weight management and diabetes scores (unrounded)"""
+    # Nutrient density score (nutrients per calorie)
+    nutrient_density = min(100.0, ((protein + fiber * 2) / calories) * 100)
+    
+    # Heart health score
+    heart_score = 100.0
+    if sodium > 600:
+        heart_score -= (sodium - 600) / 20
+    if saturated_fat > 10:
+        heart_score -= (saturated_fat - 10) * 5
+    heart_health = max(0.0, min(100.0, heart_score))
+    
+    # Weight management score
+    calorie_density = calories / 100  # calories per 100g (estimated)
+    fiber_bonus = min(20.0, fiber * 2)
+    protein_bonus = min(30.0, protein)
+    weight_management = max(0.0, min(100.0, 100 - calorie_density + fiber_bonus + protein_bonus - 50))
+    
+    # Diabetes-friendly score
+    diabetes_score = 100.0
+    if carbs > 30:
+        diabetes_score -= (carbs - 30) * 2
+    if sugar > 10:
+        diabetes_score -= (sugar - 10) * 5
+    diabetes_score += fiber * 3  # fiber bonus
+    diabetes_friendly = max(0.0, min(100.0, diabetes_score))
+    
+    return nutrient_density, heart_health, weight_management, diabetes_friendly
+
+def _round_scores(scores) -> List[float]:
+    """Scores rounded to one decimal with built-in round, as every public score is reported"""
+    return [round(float(score), 1) for score in scores]
+
+def _health_scores_numpy(table: np.ndarray) -> np.ndarray:
+    """Health scores for every row of an (n, 8) HEALTH_NUTRIENTS table (numpy fallback)"""
+    calories, protein, fiber, sodium, saturated_fat, _, carbs, sugar = table.T
+    scores = np.empty((len(table), len(HEALTH_SCORE_NAMES)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores[:, 0] = np.minimum(100, (protein + fiber * 2) / calories * 100)
+    heart_score = (100 - np.where(sodium > 600, (sodium - 600) / 20, 0)
+                   - np.where(saturated_fat > 10, (saturated_fat - 10) * 5, 0))
+    scores[:, 1] = np.clip(heart_score, 0, 100)
+    scores[:, 2] = np.clip(100 - calories / 100 + np.minimum(20, fiber * 2) + np.minimum(30, protein) - 50, 0, 100)
+    diabetes_score = (100 - np.where(carbs > 30, (carbs - 30) * 2, 0)
+                      - np.where(sugar > 10, (sugar - 10) * 5, 0) + fiber * 3)
+    scores[:, 3] = np.clip(diabetes_score, 0, 100)
+    return scores
+
+if NUMBA_AVAILABLE:
+    # Straight-line scalar code, compiled once per process; no on-disk cache, since
+    # cache=True fails at import when no writable cache directory exists
+    health_scores = njit(_health_scores_python)
+    
+    @njit(parallel=True)
+    def _health_scores_kernel(table):
+        n = table.shape[0]
+        scores = np.empty((n, 4))
+        # Each iteration writes only its own row, so recipes are scored in parallel
+        for i in prange(n):
+            row = table[i]
+            nutrient_density, heart_health, weight_management, diabetes_friendly = health_scores(
+                row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7])
+            scores[i, 0] = nutrient_density
+            scores[i, 1] = heart_health
+            scores[i, 2] = weight_management
+            scores[i, 3] = diabetes_friendly
+        return scores
+    
+    health_scores_batch = _health_scores_kernel
+else:
+    health_scores = _health_scores_python
+    health_scores_batch = _health_scores_numpy
+
+def _daily_value_calculator(daily_values: np.ndarray, index: Dict[str, int]) -> Callable[[Dict], Dict[str, float]]:
+    """Daily-value percentage function specialized to one user category's daily values"""
+    def percentages(nutrition_data: Dict) -> Dict[str, float]:
+        # Only nutrients present in the recipe are reported, in the recipe's order
+        tracked = [nutrient for nutrient in nutrition_data if nutrient in index]
+        if not tracked:
+            return {}
+        values = np.array([nutrition_data[n] for n in tracked], dtype=np.float64)
+        percent = values / daily_values[[index[n] for n in tracked]] * 100
+        # Built-in round on the floats: np.round scales by 10 first and can land on the other side of .x5
+        return dict(zip(tracked, [round(p, 1) for p in percent.tolist()]))
+    
+    return percentages
+
+class LazyFigures(Mapping):
+    """Read-only mapping of chart name to figure; each figure is built on first access"""
+    
+    def __init__(self, builders: Dict[str, Callable[[], go.Figure]]):
+        self._builders = builders
+        self._figures = {}
+        self._json = {}
+    
+    def __getitem__(self, name: str) -> go.Figure:
+        if name not in self._figures:
+            self._figures[name] = self._builders[name]()
+        return self._figures[name]
+    
+    def to_json(self, name: str) -> str:
+        """Serialized figure, computed once per chart; rebuild with plotly.io.from_json"""
+        if name not in self._json:
+            self._json[name] = self[name].to_json()
+        return self._json[name]
+    
+    def __iter__(self):
+        return iter(self._builders)
+    
+    def __len__(self) -> int:
+        return len(self._builders)
 
 class NutritionAnalyzer:
     """Comprehensive nutrition analysis and visualization"""
@@ -12,242 +246,185 @@ class NutritionAnalyzer:
         self.daily_values = self.load_daily_values()
         self.nutrient_categories = self.load_nutrient_categories()
         self.health_targets = self.load_health_targets()
+        # One daily-value percentage function per user category, with that
+        # category's daily values baked in as a vector in self._dv_nutrients order
+        self._dv_nutrients = tuple(self.daily_values)
+        self._dv_index = {nutrient: i for i, nutrient in enumerate(self._dv_nutrients)}
+        self._dv_percentages = {
+            category: _daily_value_calculator(
+                np.array([self.daily_values[n][category] for n in self._dv_nutrients], dtype=np.float64),
+                self._dv_index
+            )
+            for category in ('adult_male', 'adult_female', 'child')
+        }
+        # Keyed on the recipe's nutrient items, user category and health goals
+        self._analyze_cached = functools.lru_cache(maxsize=ANALYSIS_CACHE_SIZE)(self._analyze_uncached)
+        # Keyed on each recipe's nutrient items; names are not needed to compare
+        self._compare_cached = functools.lru_cache(maxsize=COMPARISON_CACHE_SIZE)(self._compare_uncached)
     
     def load_daily_values(self):
         """Load recommended daily values for nutrients"""
-        return {
-            'calories': {'adult_male': 2500, 'adult_female': 2000, 'child': 1800},
-            'protein': {'adult_male': 56, 'adult_female': 46, 'child': 34},  # grams
-            'carbs': {'adult_male': 325, 'adult_female': 325, 'child': 260},  # grams
-            'fat': {'adult_male': 78, 'adult_female': 65, 'child': 62},  # grams
-            'fiber': {'adult_male': 38, 'adult_female': 25, 'child': 25},  # grams
-            'sodium': {'adult_male': 2300, 'adult_female': 2300, 'child': 1900},  # mg
-            'sugar': {'adult_male': 36, 'adult_female': 25, 'child': 25},  # grams
-            'saturated_fat': {'adult_male': 20, 'adult_female': 20, 'child': 18},  # grams
-        }
+        return _DAILY_VALUES
     
     def load_nutrient_categories(self):
         """Load nutrient categories for analysis"""
-        return {
-            'macronutrients': ['calories', 'protein', 'carbs', 'fat'],
-            'micronutrients': ['vitamin_c', 'vitamin_d', 'iron', 'calcium'],
-            'limiting_nutrients': ['sodium', 'sugar', 'saturated_fat'],
-            'beneficial_nutrients': ['fiber', 'protein', 'omega3']
-        }
+        return _NUTRIENT_CATEGORIES
     
     def load_health_targets(self):
         """Load health-specific nutrition targets"""
-        return {
-            'diabetes': {
-                'carbs': {'max_percent': 45, 'focus': 'complex_carbs'},
-                'fiber': {'min': 30},
-                'sugar': {'max': 25},
-                'glycemic_index': {'preference': 'low'}
-            },
-            'heart_health': {
-                'saturated_fat': {'max_percent': 7},
-                'sodium': {'max': 1500},
-                'omega3': {'min': 1.1},
-                'fiber': {'min': 25}
-            },
-            'weight_loss': {
-                'calories': {'deficit': 500},  # 500 cal below maintenance
-                'protein': {'min_percent': 25},
-                'fiber': {'min': 30},
-                'water_content': {'preference': 'high'}
-            },
-            'muscle_gain': {
-                'protein': {'min': 1.6, 'unit': 'g_per_kg_bodyweight'},
-                'calories': {'surplus': 300},
-                'carbs': {'timing': 'post_workout'}
-            }
-        }
+        return _HEALTH_TARGETS
     
     def analyze_recipe_nutrition(self, nutrition_data: Dict, user_profile: Dict = None) -> Dict[str, Any]:
         """Comprehensive analysis of recipe nutrition"""
+        user_category = user_profile.get('category', 'adult_male') if user_profile else 'adult_male'
+        health_goals = tuple(user_profile.get('health_goals', ())) if user_profile else ()
+        
+        # The same recipe is analyzed repeatedly (standalone, in meal plans and comparisons)
+        nutrition_items = tuple(nutrition_data.items())
+        try:
+            parts = self._analyze_cached(nutrition_items, user_category, health_goals)
+        except TypeError:  # unhashable nutrient values
+            parts = self._analyze_uncached(nutrition_items, user_category, health_goals)
+        dv_percentages, macro_distribution, scores, recommendations, warnings = parts
         
-        analysis = {
+        # Fresh containers per call, since callers extend the analysis they get back
+        return {
             'nutrition_data': nutrition_data,
-            'daily_value_percentages': {},
-            'macronutrient_distribution': {},
-            'health_scores': {},
-            'recommendations': [],
-            'warnings': []
+            'daily_value_percentages': dict(dv_percentages),
+            'macronutrient_distribution': dict(macro_distribution),
+            'health_scores': dict(scores),
+            'recommendations': list(recommendations),
+            'warnings': list(warnings)
         }
+    
+    def _analyze_uncached(self, nutrition_items: Tuple, user_category: str, health_goals: Tuple[str, ...]) -> Tuple:
+        """Analysis parts of one recipe as immutable tuples, for _analyze_cached"""
+        nutrition_data = dict(nutrition_items)
+        
+        # Read the nutrients used by the scores and rules once, estimating
+        # saturated fat and sugar when they are not provided
+        calories = float(nutrition_data.get('calories', 1))
+        protein = float(nutrition_data.get('protein', 0))
+        fiber = float(nutrition_data.get('fiber', 0))
+        sodium = float(nutrition_data.get('sodium', 0))
+        fat = float(nutrition_data.get('fat', 0))
+        carbs = float(nutrition_data.get('carbs', 0))
+        # The estimates are only computed when the value is missing
+        saturated_fat = nutrition_data.get('saturated_fat')
+        saturated_fat = float(saturated_fat) if saturated_fat is not None else fat * 0.3
+        sugar = nutrition_data.get('sugar')
+        sugar = float(sugar) if sugar is not None else carbs * 0.2
+        nutrients = (calories, protein, fiber, sodium, saturated_fat, fat, carbs, sugar)
         
         # Calculate daily value percentages
-        user_category = user_profile.get('category', 'adult_male') if user_profile else 'adult_male'
-        
-        for nutrient, value in nutrition_data.items():
-            if nutrient in self.daily_values:
-                daily_value = self.daily_values[nutrient][user_category]
-                percentage = (value / daily_value) * 100
-                analysis['daily_value_percentages'][nutrient] = round(percentage, 1)
+        dv_percentages = self._dv_percentages[user_category](nutrition_data)
         
         # Calculate macronutrient distribution
-        total_calories = nutrition_data.get('calories', 1)
-        analysis['macronutrient_distribution'] = {
-            'protein_percent': round((nutrition_data.get('protein', 0) * 4 / total_calories) * 100, 1),
-            'carbs_percent': round((nutrition_data.get('carbs', 0) * 4 / total_calories) * 100, 1),
-            'fat_percent': round((nutrition_data.get('fat', 0) * 9 / total_calories) * 100, 1)
-        }
+        macro_calories = np.array([protein * 4, carbs * 4, fat * 9])
+        macro_percent = (macro_calories / calories * 100).tolist()
+        macro_distribution = dict(zip(_MACRO_PERCENT_KEYS, [round(p, 1) for p in macro_percent]))
         
         # Calculate health scores
-        analysis['health_scores'] = self._calculate_health_scores(nutrition_data)
+        scores = self._calculate_health_scores(*nutrients)
         
         # Generate recommendations and warnings
-        analysis['recommendations'], analysis['warnings'] = self._generate_recommendations(
-            nutrition_data, analysis['daily_value_percentages'], user_profile
-        )
+        recommendations, warnings = self._generate_recommendations(nutrients, dv_percentages, health_goals)
         
-        return analysis
+        return (tuple(dv_percentages.items()), tuple(macro_distribution.items()), tuple(scores.items()),
+                tuple(recommendations), tuple(warnings))
     
-    def _calculate_health_scores(self, nutrition_data: Dict) -> Dict[str, float]:
+    def _calculate_health_scores(self, calories: float, protein: float, fiber: float, sodium: float,
+                                 saturated_fat: float, fat: float, carbs: float, sugar: float) -> Dict[str, float]:
         """Calculate various health scores for the recipe"""
-        scores = {}
-        
-        # Nutrient density score (nutrients per calorie)
-        calories = nutrition_data.get('calories', 1)
-        protein = nutrition_data.get('protein', 0)
-        fiber = nutrition_data.get('fiber', 0)
-        
-        scores['nutrient_density'] = min(100, ((protein + fiber * 2) / calories) * 100)
-        
-        # Heart health score
-        sodium = nutrition_data.get('sodium', 0)
-        saturated_fat = nutrition_data.get('saturated_fat', nutrition_data.get('fat', 0) * 0.3)
-        
-        heart_score = 100
-        if sodium > 600:
-            heart_score -= (sodium - 600) / 20
-        if saturated_fat > 10:
-            heart_score -= (saturated_fat - 10) * 5
-        
-        scores['heart_health'] = max(0, min(100, heart_score))
-        
-        # Weight management score
-        calorie_density = calories / 100  # calories per 100g (estimated)
-        fiber_bonus = min(20, fiber * 2)
-        protein_bonus = min(30, protein)
+        scores = health_scores(calories, protein, fiber, sodium, saturated_fat, fat, carbs, sugar)
         
-        scores['weight_management'] = max(0, min(100, 100 - calorie_density + fiber_bonus + protein_bonus - 50))
-        
-        # Diabetes-friendly score
-        carbs = nutrition_data.get('carbs', 0)
-        sugar = nutrition_data.get('sugar', carbs * 0.2)  # estimate if not provided
-        
-        diabetes_score = 100
-        if carbs > 30:
-            diabetes_score -= (carbs - 30) * 2
-        if sugar > 10:
-            diabetes_score -= (sugar - 10) * 5
-        diabetes_score += fiber * 3  # fiber bonus
-        
-        scores['diabetes_friendly'] = max(0, min(100, diabetes_score))
-        
-        return {k: round(v, 1) for k, v in scores.items()}
+        return dict(zip(HEALTH_SCORE_NAMES, _round_scores(scores)))
+    
+    def score_recipes_batch(self, recipes_nutrition: List[Dict]) -> np.ndarray:
+        """Health scores for many recipes at once, as an (n, 4) array in HEALTH_SCORE_NAMES order
+        
+        Row i equals analyze_recipe_nutrition(recipes_nutrition[i])['health_scores'].
+        """
+        table = pd.DataFrame.from_records(recipes_nutrition).reindex(columns=HEALTH_NUTRIENTS)
+        # Same defaults as analyze_recipe_nutrition for nutrients a recipe does not report
+        table['calories'] = table['calories'].fillna(1)
+        zero_default = ['protein', 'fiber', 'sodium', 'fat', 'carbs']
+        table[zero_default] = table[zero_default].fillna(0)
+        table['saturated_fat'] = table['saturated_fat'].fillna(table['fat'] * 0.3)
+        table['sugar'] = table['sugar'].fillna(table['carbs'] * 0.2)
+        scores = health_scores_batch(np.ascontiguousarray(table.to_numpy(dtype=np.float64)))
+        # Round like the single-recipe path; np.round can flip values near .x5
+        rounded = [_round_scores(row) for row in scores.tolist()]
+        return np.array(rounded, dtype=np.float64).reshape(-1, len(HEALTH_SCORE_NAMES))
     
-    def _generate_recommendations(self, nutrition_data: Dict, dv_percentages: Dict, 
-                                 user_profile: Dict = None) -> Tuple[List[str], List[str]]:
+    def _generate_recommendations(self, nutrients: Tuple[float, ...], dv_percentages: Dict, 
+                                 health_goals: Tuple[str, ...] = ()) -> Tuple[List[str], List[str]]:
         """Generate personalized recommendations and warnings"""
-        recommendations = []
-        warnings = []
-        
-        # Calorie recommendations
-        calories = nutrition_data.get('calories', 0)
-        if calories < 200:
-            recommendations.append("Consider adding healthy fats or complex carbs to increase calorie content")
-        elif calories > 600:
-            recommendations.append("This is a high-calorie recipe - consider reducing portion size or balancing with lighter meals")
-        
-        # Protein recommendations
-        protein_percent = dv_percentages.get('protein', 0)
-        if protein_percent > 30:
-            recommendations.append("Excellent protein source! Great for muscle maintenance and satiety")
-        elif protein_percent < 10:
-            recommendations.append("Consider adding protein sources like beans, nuts, or lean meat")
-        
-        # Fiber recommendations
-        fiber = nutrition_data.get('fiber', 0)
-        if fiber > 10:
-            recommendations.append("High fiber content promotes digestive health and satiety")
-        elif fiber < 3:
-            recommendations.append("Consider adding vegetables, fruits, or whole grains for more fiber")
-        
-        # Sodium warnings
-        sodium_percent = dv_percentages.get('sodium', 0)
-        if sodium_percent > 25:
-            warnings.append("High sodium content - consider reducing salt or using herbs and spices")
-        
-        # Fat analysis
-        fat = nutrition_data.get('fat', 0)
-        if fat > 25:
-            warnings.append("High fat content - ensure they're healthy fats from sources like olive oil, nuts, or avocado")
+        results = {'recommendation': [], 'warning': []}
         
-        # User-specific recommendations
-        if user_profile:
-            health_goals = user_profile.get('health_goals', [])
-            
-            if 'weight_loss' in health_goals:
-                if calories > 400:
-                    recommendations.append("For weight loss, consider reducing portion size or adding more vegetables")
-            
-            if 'diabetes' in health_goals:
-                carbs = nutrition_data.get('carbs', 0)
-                if carbs > 45:
-                    warnings.append("High carbohydrate content - monitor blood sugar if diabetic")
-            
-            if 'heart_health' in health_goals:
-                sodium = nutrition_data.get('sodium', 0)
-                if sodium > 400:
-                    warnings.append("Consider reducing sodium for better heart health")
+        for goal, from_daily_value, key, compare, limit, kind, message in _RECOMMENDATION_CHECKS:
+            if goal is not None and goal not in health_goals:
+                continue
+            value = dv_percentages.get(key, 0) if from_daily_value else nutrients[key]
+            if compare(value, limit):
+                results[kind].append(message)
         
-        return recommendations, warnings
+        return results['recommendation'], results['warning']
     
-    def create_nutrition_visualizations(self, nutrition_data: Dict, analysis: Dict) -> Dict[str, go.Figure]:
-        """Create comprehensive nutrition visualizations"""
-        figures = {}
-        
-        # 1. Macronutrient pie chart
+    def create_nutrition_visualizations(self, nutrition_data: Dict, analysis: Dict) -> Mapping[str, go.Figure]:
+        """Create comprehensive nutrition visualizations, each built when first accessed"""
+        return LazyFigures({
+            'macronutrients': functools.partial(self._fig_macronutrients, analysis),
+            'daily_values': functools.partial(self._fig_daily_values, analysis),
+            'health_scores': functools.partial(self._fig_health_scores, analysis),
+            'nutrients': functools.partial(self._fig_nutrients, nutrition_data),
+        })
+    
+    def _fig_macronutrients(self, analysis: Dict) -> go.Figure:
+        """Macronutrient pie chart"""
         macro_dist = analysis['macronutrient_distribution']
-        figures['macronutrients'] = px.pie(
+        return px.pie(
             values=[macro_dist['protein_percent'], macro_dist['carbs_percent'], macro_dist['fat_percent']],
             names=['Protein', 'Carbohydrates', 'Fat'],
             title="Macronutrient Distribution",
             color_discrete_sequence=['#FF6B6B', '#4ECDC4', '#45B7D1']
         )
-        
-        # 2. Daily value percentages bar chart
+    
+    def _fig_daily_values(self, analysis: Dict) -> go.Figure:
+        """Daily value percentages bar chart"""
         dv_data = analysis['daily_value_percentages']
         nutrients = list(dv_data.keys())
         percentages = list(dv_data.values())
         
-        colors = ['green' if p <= 100 else 'orange' if p <= 150 else 'red' for p in percentages]
+        levels = np.asarray(percentages, dtype=np.float64)
+        colors = np.select([levels <= 100, levels <= 150], ['green', 'orange'], default='red').tolist()
         
-        figures['daily_values'] = go.Figure(data=[
+        fig = go.Figure(data=[
             go.Bar(x=nutrients, y=percentages, marker_color=colors)
         ])
-        figures['daily_values'].update_layout(
+        fig.update_layout(
             title="Percentage of Daily Values",
             xaxis_title="Nutrients",
             yaxis_title="% Daily Value",
             showlegend=False
         )
-        figures['daily_values'].add_hline(y=100, line_dash="dash", line_color="red")
-        
-        # 3. Health scores radar chart
+        fig.add_hline(y=100, line_dash="dash", line_color="red")
+        return fig
+    
+    def _fig_health_scores(self, analysis: Dict) -> go.Figure:
+        """Health scores radar chart"""
         health_scores = analysis['health_scores']
         categories = list(health_scores.keys())
         scores = list(health_scores.values())
         
-        figures['health_scores'] = go.Figure()
-        figures['health_scores'].add_trace(go.Scatterpolar(
+        fig = go.Figure()
+        fig.add_trace(go.Scatterpolar(
             r=scores,
             theta=categories,
             fill='toself',
             name='Health Scores'
         ))
-        figures['health_scores'].update_layout(
+        fig.update_layout(
             polar=dict(
                 radialaxis=dict(
                     visible=True,
@@ -256,69 +433,78 @@ class NutritionAnalyzer:
             showlegend=False,
             title="Health Score Analysis"
         )
-        
-        # 4. Nutrient comparison chart
+        return fig
+    
+    def _fig_nutrients(self, nutrition_data: Dict) -> go.Figure:
+        """Key nutrient comparison chart"""
         key_nutrients = ['protein', 'fiber', 'sodium', 'fat']
         nutrient_values = [nutrition_data.get(n, 0) for n in key_nutrients]
         
-        figures['nutrients'] = go.Figure(data=[
+        fig = go.Figure(data=[
             go.Bar(x=key_nutrients, y=nutrient_values, marker_color='#66D9EF')
         ])
-        figures['nutrients'].update_layout(
+        fig.update_layout(
             title="Key Nutrient Content",
             xaxis_title="Nutrients",
             yaxis_title="Amount (g or mg)"
         )
-        
-        return figures
+        return fig
     
     def compare_recipes(self, recipes_nutrition: List[Dict], recipe_names: List[str]) -> Dict[str, Any]:
         """Compare nutrition across multiple recipes"""
-        comparison = {
+        # UI filter changes re-run the comparison on the same recipes
+        recipes_items = tuple(tuple(nutrition.items()) for nutrition in recipes_nutrition)
+        try:
+            nutrition_comparison, rankings = self._compare_cached(recipes_items)
+        except TypeError:  # unhashable nutrient values
+            nutrition_comparison, rankings = self._compare_uncached(recipes_items)
+        
+        return {
             'recipes': recipe_names,
-            'nutrition_comparison': {},
-            'rankings': {},
+            'nutrition_comparison': {nutrient: list(values) for nutrient, values in nutrition_comparison},
+            'rankings': {criteria: list(order) for criteria, order in rankings},
             'recommendations': []
         }
-        
-        # Compare each nutrient across recipes
-        all_nutrients = set()
-        for nutrition in recipes_nutrition:
-            all_nutrients.update(nutrition.keys())
-        
-        for nutrient in all_nutrients:
-            values = [nutrition.get(nutrient, 0) for nutrition in recipes_nutrition]
-            comparison['nutrition_comparison'][nutrient] = values
+    
+    def _compare_uncached(self, recipes_items: Tuple) -> Tuple:
+        """Per-nutrient values and rankings as immutable tuples, for _compare_cached"""
+        # Compare each nutrient across recipes; recipes missing a nutrient count as 0
+        nutrition_table = pd.DataFrame.from_records([dict(items) for items in recipes_items]).fillna(0)
+        nutrition_comparison = tuple(
+            (nutrient, tuple(nutrition_table[nutrient].tolist())) for nutrient in nutrition_table.columns
+        )
         
         # Rank recipes by different criteria
-        comparison['rankings'] = {
-            'lowest_calorie': self._rank_recipes(recipes_nutrition, 'calories', ascending=True),
-            'highest_protein': self._rank_recipes(recipes_nutrition, 'protein', ascending=False),
-            'highest_fiber': self._rank_recipes(recipes_nutrition, 'fiber', ascending=False),
-            'lowest_sodium': self._rank_recipes(recipes_nutrition, 'sodium', ascending=True)
-        }
+        rankings = (
+            ('lowest_calorie', tuple(self._rank_recipes(nutrition_table, 'calories', ascending=True))),
+            ('highest_protein', tuple(self._rank_recipes(nutrition_table, 'protein', ascending=False))),
+            ('highest_fiber', tuple(self._rank_recipes(nutrition_table, 'fiber', ascending=False))),
+            ('lowest_sodium', tuple(self._rank_recipes(nutrition_table, 'sodium', ascending=True)))
+        )
         
-        return comparison
+        return nutrition_comparison, rankings
     
-    def _rank_recipes(self, recipes_nutrition: List[Dict], criteria: str, ascending: bool = True) -> List[int]:
+    def _rank_recipes(self, nutrition_table: pd.DataFrame, criteria: str, ascending: bool = True) -> List[int]:
         """Rank recipes based on a specific nutritional criteria"""
-        values = [(i, nutrition.get(criteria, 0)) for i, nutrition in enumerate(recipes_nutrition)]
-        sorted_values = sorted(values, key=lambda x: x[1], reverse=not ascending)
-        return [i for i, _ in sorted_values]
+        if criteria not in nutrition_table:
+            return list(range(len(nutrition_table)))
+        values = nutrition_table[criteria].to_numpy(dtype=np.float64)
+        # Stable sort keeps tied recipes in their original order in both directions
+        order = np.argsort(values if ascending else -values, kind='stable')
+        return order.tolist()
     
     def get_meal_plan_nutrition(self, daily_recipes: List[Dict]) -> Dict[str, Any]:
         """Calculate cumulative nutrition for a day's meal plan"""
-        total_nutrition = {}
-        
-        # Sum up all nutrients
-        for recipe_nutrition in daily_recipes:
-            for nutrient, value in recipe_nutrition.items():
-                total_nutrition[nutrient] = total_nutrition.get(nutrient, 0) + value
+        # Sum up all nutrients column-wise; recipes missing a nutrient contribute 0
+        meals = pd.DataFrame.from_records(daily_recipes).fillna(0)
+        total_nutrition = meals.sum(axis=0).to_dict()
         
         # Analyze daily totals
         daily_analysis = self.analyze_recipe_nutrition(total_nutrition)
         daily_analysis['meal_count'] = len(daily_recipes)
-        daily_analysis['average_calories_per_meal'] = total_nutrition.get('calories', 0) / len(daily_recipes)
+        daily_analysis['average_calories_per_meal'] = (
+            float(meals['calories'].mean()) if 'calories' in meals and len(meals) else 0
+        )
         
         return daily_analysis
     
@@ -327,41 +513,18 @@ class NutritionAnalyzer:
         modifications = []
         
         for goal in target_goals:
-            if goal == 'reduce_sodium':
-                if nutrition_data.get('sodium', 0) > 400:
-                    modifications.append({
-                        'goal': 'Reduce Sodium',
-                        'current': f"{nutrition_data.get('sodium', 0)}mg",
-                        'suggestion': 'Use herbs and spices instead of salt, rinse canned ingredients',
-                        'impact': 'Reduces sodium by 30-50%'
-                    })
-            
-            elif goal == 'increase_protein':
-                if nutrition_data.get('protein', 0) < 15:
-                    modifications.append({
-                        'goal': 'Increase Protein',
-                        'current': f"{nutrition_data.get('protein', 0)}g",
-                        'suggestion': 'Add beans, nuts, Greek yogurt, or lean meat',
-                        'impact': 'Can add 10-20g protein'
-                    })
-            
-            elif goal == 'reduce_calories':
-                if nutrition_data.get('calories', 0) > 400:
-                    modifications.append({
-                        'goal': 'Reduce Calories',
-                        'current': f"{nutrition_data.get('calories', 0)} cal",
-                        'suggestion': 'Reduce oil, use cooking spray, increase vegetables',
-                        'impact': 'Can reduce by 100-200 calories'
-                    })
-            
-            elif goal == 'increase_fiber':
-                if nutrition_data.get('fiber', 0) < 5:
-                    modifications.append({
-                        'goal': 'Increase Fiber',
-                        'current': f"{nutrition_data.get('fiber', 0)}g",
-                        'suggestion': 'Add vegetables, switch to whole grains, include beans',
-                        'impact': 'Can add 5-10g fiber'
-                    })
+            rule = _MODIFICATION_RULES.get(goal)
+            if rule is None:
+                continue
+            nutrient, op, limit, current_format, title, suggestion, impact = rule
+            value = nutrition_data.get(nutrient, 0)
+            if _COMPARISONS[op](value, limit):
+                modifications.append({
+                    'goal': title,
+                    'current': current_format.format(value),
+                    'suggestion': suggestion,
+                    'impact': impact
+                })
         
         return modifications
 
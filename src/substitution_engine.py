@@ -1,7 +1,267 @@
 import numpy as np
-import pandas as pd
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import re
+import sys
+import streamlit as st
+import functools
+from itertools import chain, islice
+from types import MappingProxyType
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+def _freeze(value):
+    """Recursively convert dicts to read-only mappings with interned keys and lists to tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({sys.intern(key): _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+# Static lookup tables, built once at import and shared by every engine
+_SUBSTITUTION_RULES = _freeze({
+    # Proteins
+    'chicken breast': {
+        'alternatives': ['turkey breast', 'lean pork', 'firm tofu', 'tempeh'],
+        'vegan': ['firm tofu', 'tempeh', 'seitan', 'jackfruit'],
+        'low_fat': ['turkey breast', 'white fish', 'egg whites'],
+        'ratio': 1.0
+    },
+    'ground beef': {
+        'alternatives': ['ground turkey', 'ground chicken', 'lentils', 'mushrooms'],
+        'vegan': ['lentils', 'black beans', 'mushrooms', 'walnuts'],
+        'low_fat': ['ground turkey (93/7)', 'ground chicken breast'],
+        'ratio': 1.0
+    },
+    'salmon': {
+        'alternatives': ['tuna', 'mackerel', 'trout', 'chicken breast'],
+        'vegan': ['firm tofu', 'tempeh', 'chickpeas'],
+        'budget': ['canned tuna', 'chicken breast', 'eggs'],
+        'ratio': 1.0
+    },
+    
+    # Dairy
+    'milk': {
+        'alternatives': ['almond milk', 'oat milk', 'soy milk', 'coconut milk'],
+        'lactose_free': ['lactose-free milk', 'almond milk', 'oat milk'],
+        'low_fat': ['skim milk', 'almond milk (unsweetened)'],
+        'ratio': 1.0
+    },
+    'butter': {
+        'alternatives': ['olive oil', 'coconut oil', 'avocado oil', 'applesauce'],
+        'vegan': ['coconut oil', 'olive oil', 'vegan butter'],
+        'low_fat': ['applesauce', 'mashed banana', 'greek yogurt'],
+        'ratio': 0.75  # Use 3/4 amount when substituting with oil
+    },
+    'heavy cream': {
+        'alternatives': ['coconut cream', 'cashew cream', 'evaporated milk'],
+        'vegan': ['coconut cream', 'cashew cream', 'silken tofu'],
+        'low_fat': ['evaporated skim milk', 'greek yogurt'],
+        'ratio': 1.0
+    },
+    
+    # Grains and Starches
+    'white rice': {
+        'alternatives': ['brown rice', 'quinoa', 'cauliflower rice', 'wild rice'],
+        'low_carb': ['cauliflower rice', 'shirataki rice', 'broccoli rice'],
+        'high_fiber': ['brown rice', 'quinoa', 'wild rice'],
+        'ratio': 1.0
+    },
+    'pasta': {
+        'alternatives': ['whole wheat pasta', 'zucchini noodles', 'shirataki noodles'],
+        'gluten_free': ['rice pasta', 'corn pasta', 'quinoa pasta'],
+        'low_carb': ['zucchini noodles', 'spaghetti squash', 'shirataki noodles'],
+        'ratio': 1.0
+    },
+    'bread': {
+        'alternatives': ['whole grain bread', 'sourdough', 'lettuce wraps'],
+        'gluten_free': ['rice bread', 'almond flour bread', 'corn tortillas'],
+        'low_carb': ['lettuce wraps', 'portobello mushroom caps', 'cauliflower bread'],
+        'ratio': 1.0
+    },
+    
+    # Sweeteners
+    'sugar': {
+        'alternatives': ['honey', 'maple syrup', 'coconut sugar', 'stevia'],
+        'diabetic': ['stevia', 'monk fruit', 'erythritol'],
+        'natural': ['honey', 'maple syrup', 'dates', 'applesauce'],
+        'ratio': 0.75  # Generally use less when substituting liquid sweeteners
+    },
+    
+    # Fats and Oils
+    'olive oil': {
+        'alternatives': ['avocado oil', 'coconut oil', 'canola oil'],
+        'high_heat': ['avocado oil', 'canola oil', 'grapeseed oil'],
+        'neutral_flavor': ['canola oil', 'vegetable oil', 'grapeseed oil'],
+        'ratio': 1.0
+    },
+    
+    # Vegetables
+    'onion': {
+        'alternatives': ['shallots', 'green onions', 'leeks', 'fennel'],
+        'low_fodmap': ['green onion tops', 'chives', 'fennel'],
+        'mild_flavor': ['shallots', 'sweet onion', 'leeks'],
+        'ratio': 1.0
+    },
+    'garlic': {
+        'alternatives': ['garlic powder', 'shallots', 'ginger', 'asafoetida'],
+        'low_fodmap': ['asafoetida', 'garlic oil', 'ginger'],
+        'powder_ratio': 0.125  # 1 clove = 1/8 tsp powder
+    }
+})
+
+# Column view of the rules for filtering all of them at once: one bit per substitution
+# label (vegan, low_fat, budget, ...) a rule has alternatives for
+_RULE_LABELS = tuple(dict.fromkeys(
+    label for rule in _SUBSTITUTION_RULES.values() for label, value in rule.items()
+    if isinstance(value, tuple) and label != 'alternatives'
+))
+if len(_RULE_LABELS) > 32:
+    raise ValueError("Substitution rule label bitmask supports at most 32 distinct labels")
+_RULE_LABEL_BITS = MappingProxyType({label: 1 << bit for bit, label in enumerate(_RULE_LABELS)})
+_RULE_KEYS = np.array(tuple(_SUBSTITUTION_RULES), dtype=object)
+_RULE_LABEL_MASKS = np.array(
+    [sum(_RULE_LABEL_BITS[label] for label in rule if label in _RULE_LABEL_BITS)
+     for rule in _SUBSTITUTION_RULES.values()],
+    dtype=np.uint32
+)
+
+_DIETARY_MAPPINGS = _freeze({
+    'vegan': {
+        'avoid': ['meat', 'dairy', 'eggs', 'honey', 'gelatin'],
+        'keywords': ['chicken', 'beef', 'pork', 'fish', 'milk', 'cheese', 'butter', 'egg']
+    },
+    'vegetarian': {
+        'avoid': ['meat', 'fish'],
+        'keywords': ['chicken', 'beef', 'pork', 'fish', 'bacon', 'ham']
+    },
+    'gluten_free': {
+        'avoid': ['wheat', 'barley', 'rye', 'oats'],
+        'keywords': ['flour', 'bread', 'pasta', 'soy sauce', 'beer']
+    },
+    'dairy_free': {
+        'avoid': ['milk', 'cheese', 'butter', 'cream'],
+        'keywords': ['milk', 'cheese', 'butter', 'cream', 'yogurt']
+    },
+    'low_carb': {
+        'avoid': ['high_carb_foods'],
+        'keywords': ['rice', 'pasta', 'bread', 'potato', 'sugar']
+    },
+    'keto': {
+        'avoid': ['high_carb_foods', 'sugar'],
+        'keywords': ['rice', 'pasta', 'bread', 'fruit', 'sugar', 'honey']
+    }
+})
+
+_HEALTH_ALTERNATIVES = _freeze({
+    'diabetes': {
+        'focus': ['low_glycemic', 'high_fiber', 'protein'],
+        'substitutions': {
+            'white rice': 'cauliflower rice',
+            'sugar': 'stevia',
+            'white bread': 'whole grain bread'
+        }
+    },
+    'heart_health': {
+        'focus': ['omega3', 'low_sodium', 'antioxidants'],
+        'substitutions': {
+            'butter': 'olive oil',
+            'red meat': 'salmon',
+            'salt': 'herbs and spices'
+        }
+    },
+    'weight_loss': {
+        'focus': ['low_calorie', 'high_protein', 'high_fiber'],
+        'substitutions': {
+            'pasta': 'zucchini noodles',
+            'rice': 'cauliflower rice',
+            'oil': 'cooking spray'
+        }
+    }
+})
+
+_GENERIC_SUBSTITUTES = _freeze({
+    'protein': ['tofu', 'tempeh', 'legumes'],
+    'vegetable': ['similar seasonal vegetables', 'frozen alternative'],
+    'herb': ['dried version', 'similar herbs'],
+    'spice': ['similar spices', 'spice blends'],
+    'grain': ['similar grains', 'cauliflower rice'],
+    'fruit': ['similar seasonal fruits', 'frozen alternative']
+})
+
+# Broad ingredient groups used for generic substitutes; the first matching group wins
+_CATEGORY_KEYWORDS = MappingProxyType({
+    'protein': ('chicken', 'beef', 'pork', 'fish', 'tofu', 'beans', 'lentils'),
+    'vegetable': ('broccoli', 'carrot', 'onion', 'pepper', 'tomato', 'spinach'),
+    'herb': ('basil', 'oregano', 'thyme', 'parsley', 'cilantro', 'mint'),
+    'spice': ('cumin', 'paprika', 'turmeric', 'cinnamon', 'ginger'),
+    'grain': ('rice', 'quinoa', 'pasta', 'bread', 'oats'),
+    'fruit': ('apple', 'banana', 'berries', 'citrus', 'mango'),
+})
+
+def _encode_strings(strings: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatenated UTF-8 bytes of strings plus start offsets (length n + 1)"""
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+# Category keywords flattened in table order, so the first keyword hit is the winning category
+_CATEGORY_NAMES = tuple(_CATEGORY_KEYWORDS) + ('other',)
+_KEYWORD_BUFFER, _KEYWORD_OFFSETS = _encode_strings(
+    [keyword for keywords in _CATEGORY_KEYWORDS.values() for keyword in keywords]
+)
+_KEYWORD_CATEGORIES = np.array(
+    [rank for rank, keywords in enumerate(_CATEGORY_KEYWORDS.values()) for _ in keywords], dtype=np.int64
+)
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True)
+    def _categorize_kernel(ingredient_buffer, ingredient_offsets, keyword_buffer, keyword_offsets,
+                           keyword_categories, other):
+        n = len(ingredient_offsets) - 1
+        categories = np.full(n, other, dtype=np.int64)
+        # Each iteration writes only its own slot, so ingredients are categorized in parallel
+        for i in prange(n):
+            start, end = ingredient_offsets[i], ingredient_offsets[i + 1]
+            for k in range(len(keyword_offsets) - 1):
+                keyword_start = keyword_offsets[k]
+                keyword_length = keyword_offsets[k + 1] - keyword_start
+                found = False
+                for position in range(start, end - keyword_length + 1):
+                    j = 0
+                    while j < keyword_length and ingredient_buffer[position + j] == keyword_buffer[keyword_start + j]:
+                        j += 1
+                    if j == keyword_length:
+                        found = True
+                        break
+                if found:
+                    categories[i] = keyword_categories[k]
+                    break
+        return categories
+
+# General nutrition guidance per alternative; this would ideally connect to a nutrition database
+_NUTRITION_NOTES = MappingProxyType({
+    'tofu': "Lower in calories, good protein source",
+    'cauliflower rice': "Much lower in carbs and calories",
+    'quinoa': "Higher in protein and fiber than rice",
+    'olive oil': "Rich in healthy monounsaturated fats",
+    'stevia': "Zero calories, suitable for diabetics",
+    'almond milk': "Lower in calories and carbs than dairy milk"
+})
+
+def _normalize_ingredient(ingredient: str) -> str:
+    """Lowercased, stripped and interned form used for every rule and cache lookup"""
+    return sys.intern(ingredient.lower().strip())
 
 class IngredientSubstitutionEngine:
     """Advanced ingredient substitution engine with health and dietary considerations"""
@@ -10,210 +270,128 @@ class IngredientSubstitutionEngine:
         self.substitution_rules = self.load_substitution_rules()
         self.dietary_mappings = self.load_dietary_mappings()
         self.health_alternatives = self.load_health_alternatives()
+        self._build_rule_matcher()
+        # The same ingredients recur across recipes and batch calls
+        self._find_substitutes_cached = functools.lru_cache(maxsize=4096)(self._find_substitutes_uncached)
+        self._categorize_ingredient = functools.lru_cache(maxsize=2048)(self._categorize_ingredient_uncached)
     
     def load_substitution_rules(self):
         """Load comprehensive substitution rules"""
-        return {
-            # Proteins
-            'chicken breast': {
-                'alternatives': ['turkey breast', 'lean pork', 'firm tofu', 'tempeh'],
-                'vegan': ['firm tofu', 'tempeh', 'seitan', 'jackfruit'],
-                'low_fat': ['turkey breast', 'white fish', 'egg whites'],
-                'ratio': 1.0
-            },
-            'ground beef': {
-                'alternatives': ['ground turkey', 'ground chicken', 'lentils', 'mushrooms'],
-                'vegan': ['lentils', 'black beans', 'mushrooms', 'walnuts'],
-                'low_fat': ['ground turkey (93/7)', 'ground chicken breast'],
-                'ratio': 1.0
-            },
-            'salmon': {
-                'alternatives': ['tuna', 'mackerel', 'trout', 'chicken breast'],
-                'vegan': ['firm tofu', 'tempeh', 'chickpeas'],
-                'budget': ['canned tuna', 'chicken breast', 'eggs'],
-                'ratio': 1.0
-            },
-            
-            # Dairy
-            'milk': {
-                'alternatives': ['almond milk', 'oat milk', 'soy milk', 'coconut milk'],
-                'lactose_free': ['lactose-free milk', 'almond milk', 'oat milk'],
-                'low_fat': ['skim milk', 'almond milk (unsweetened)'],
-                'ratio': 1.0
-            },
-            'butter': {
-                'alternatives': ['olive oil', 'coconut oil', 'avocado oil', 'applesauce'],
-                'vegan': ['coconut oil', 'olive oil', 'vegan butter'],
-                'low_fat': ['applesauce', 'mashed banana', 'greek yogurt'],
-                'ratio': 0.75  # Use 3/4 amount when substituting with oil
-            },
-            'heavy cream': {
-                'alternatives': ['coconut cream', 'cashew cream', 'evaporated milk'],
-                'vegan': ['coconut cream', 'cashew cream', 'silken tofu'],
-                'low_fat': ['evaporated skim milk', 'greek yogurt'],
-                'ratio': 1.0
-            },
-            
-            # Grains and Starches
-            'white rice': {
-                'alternatives': ['brown rice', 'quinoa', 'cauliflower rice', 'wild rice'],
-                'low_carb': ['cauliflower rice', 'shirataki rice', 'broccoli rice'],
-                'high_fiber': ['brown rice', 'quinoa', 'wild rice'],
-                'ratio': 1.0
-            },
-            'pasta': {
-                'alternatives': ['whole wheat pasta', 'zucchini noodles', 'shirataki noodles'],
-                'gluten_free': ['rice pasta', 'corn pasta', 'quinoa pasta'],
-                'low_carb': ['zucchini noodles', 'spaghetti squash', 'shirataki noodles'],
-                'ratio': 1.0
-            },
-            'bread': {
-                'alternatives': ['whole grain bread', 'sourdough', 'lettuce wraps'],
-                'gluten_free': ['rice bread', 'almond flour bread', 'corn tortillas'],
-                'low_carb': ['lettuce wraps', 'portobello mushroom caps', 'cauliflower bread'],
-                'ratio': 1.0
-            },
-            
-            # Sweeteners
-            'sugar': {
-                'alternatives': ['honey', 'maple syrup', 'coconut sugar', 'stevia'],
-                'diabetic': ['stevia', 'monk fruit', 'erythritol'],
-                'natural': ['honey', 'maple syrup', 'dates', 'applesauce'],
-                'ratio': 0.75  # Generally use less when substituting liquid sweeteners
-            },
-            
-            # Fats and Oils
-            'olive oil': {
-                'alternatives': ['avocado oil', 'coconut oil', 'canola oil'],
-                'high_heat': ['avocado oil', 'canola oil', 'grapeseed oil'],
-                'neutral_flavor': ['canola oil', 'vegetable oil', 'grapeseed oil'],
-                'ratio': 1.0
-            },
-            
-            # Vegetables
-            'onion': {
-                'alternatives': ['shallots', 'green onions', 'leeks', 'fennel'],
-                'low_fodmap': ['green onion tops', 'chives', 'fennel'],
-                'mild_flavor': ['shallots', 'sweet onion', 'leeks'],
-                'ratio': 1.0
-            },
-            'garlic': {
-                'alternatives': ['garlic powder', 'shallots', 'ginger', 'asafoetida'],
-                'low_fodmap': ['asafoetida', 'garlic oil', 'ginger'],
-                'powder_ratio': 0.125  # 1 clove = 1/8 tsp powder
-            }
-        }
+        return _SUBSTITUTION_RULES
+    
+    def _build_rule_matcher(self):
+        """Precompute the keyword matchers used by _match_rule_key and _categorize_ingredient"""
+        self._rule_keys = tuple(self.substitution_rules)
+        # Every substring of every key, mapped to the first key containing it,
+        # answers "ingredient in key" with one dict lookup
+        self._key_substrings = {}
+        for rank, key in enumerate(self._rule_keys):
+            for start in range(len(key) + 1):
+                for end in range(start, len(key) + 1):
+                    self._key_substrings.setdefault(key[start:end], rank)
+        
+        # "key in ingredient" for all keys in a single scan of the ingredient
+        if AHOCORASICK_AVAILABLE:
+            self._rule_automaton = ahocorasick.Automaton()
+            for rank, key in enumerate(self._rule_keys):
+                self._rule_automaton.add_word(key, rank)
+            self._rule_automaton.make_automaton()
+        else:
+            self._rule_automaton = None
+        
+        # One automaton labels every category keyword in the ingredient at once
+        self._categories = tuple(_CATEGORY_KEYWORDS)
+        if AHOCORASICK_AVAILABLE:
+            self._category_automaton = ahocorasick.Automaton()
+            for rank, keywords in enumerate(_CATEGORY_KEYWORDS.values()):
+                for keyword in keywords:
+                    if keyword not in self._category_automaton:
+                        self._category_automaton.add_word(keyword, rank)
+            self._category_automaton.make_automaton()
+        else:
+            self._category_automaton = None
+    
+    def _match_rule_key(self, ingredient_lower: str) -> Optional[str]:
+        """First rule key, in rule order, that contains or is contained in the ingredient"""
+        if self._rule_automaton is not None:
+            ranks = [rank for _, rank in self._rule_automaton.iter(ingredient_lower)]
+        else:
+            ranks = [rank for rank, key in enumerate(self._rule_keys) if key in ingredient_lower]
+        if ingredient_lower in self._key_substrings:
+            ranks.append(self._key_substrings[ingredient_lower])
+        return self._rule_keys[min(ranks)] if ranks else None
     
     def load_dietary_mappings(self):
         """Load dietary restriction mappings"""
-        return {
-            'vegan': {
-                'avoid': ['meat', 'dairy', 'eggs', 'honey', 'gelatin'],
-                'keywords': ['chicken', 'beef', 'pork', 'fish', 'milk', 'cheese', 'butter', 'egg']
-            },
-            'vegetarian': {
-                'avoid': ['meat', 'fish'],
-                'keywords': ['chicken', 'beef', 'pork', 'fish', 'bacon', 'ham']
-            },
-            'gluten_free': {
-                'avoid': ['wheat', 'barley', 'rye', 'oats'],
-                'keywords': ['flour', 'bread', 'pasta', 'soy sauce', 'beer']
-            },
-            'dairy_free': {
-                'avoid': ['milk', 'cheese', 'butter', 'cream'],
-                'keywords': ['milk', 'cheese', 'butter', 'cream', 'yogurt']
-            },
-            'low_carb': {
-                'avoid': ['high_carb_foods'],
-                'keywords': ['rice', 'pasta', 'bread', 'potato', 'sugar']
-            },
-            'keto': {
-                'avoid': ['high_carb_foods', 'sugar'],
-                'keywords': ['rice', 'pasta', 'bread', 'fruit', 'sugar', 'honey']
-            }
-        }
+        return _DIETARY_MAPPINGS
     
     def load_health_alternatives(self):
         """Load health-focused alternatives"""
-        return {
-            'diabetes': {
-                'focus': ['low_glycemic', 'high_fiber', 'protein'],
-                'substitutions': {
-                    'white rice': 'cauliflower rice',
-                    'sugar': 'stevia',
-                    'white bread': 'whole grain bread'
-                }
-            },
-            'heart_health': {
-                'focus': ['omega3', 'low_sodium', 'antioxidants'],
-                'substitutions': {
-                    'butter': 'olive oil',
-                    'red meat': 'salmon',
-                    'salt': 'herbs and spices'
-                }
-            },
-            'weight_loss': {
-                'focus': ['low_calorie', 'high_protein', 'high_fiber'],
-                'substitutions': {
-                    'pasta': 'zucchini noodles',
-                    'rice': 'cauliflower rice',
-                    'oil': 'cooking spray'
-                }
-            }
-        }
+        return _HEALTH_ALTERNATIVES
     
     def find_substitutes(self, ingredient: str, dietary_restrictions: List[str] = None, 
                         health_goals: List[str] = None, budget_conscious: bool = False) -> Dict[str, Any]:
         """Find appropriate substitutes based on dietary and health requirements"""
-        
-        ingredient_lower = ingredient.lower().strip()
-        
+        ingredient_lower = _normalize_ingredient(ingredient)
+        substitutes = self._find_substitutes_cached(
+            ingredient_lower, tuple(dietary_restrictions or ()), tuple(health_goals or ()), bool(budget_conscious)
+        )
+        # Fresh lists per call so callers can edit the result without touching the cache
+        return {
+            **substitutes,
+            'original': ingredient,
+            'alternatives': list(substitutes['alternatives']),
+            'notes': list(substitutes['notes'])
+        }
+    
+    def _find_substitutes_uncached(self, ingredient_lower: str, dietary_restrictions: tuple,
+                                   health_goals: tuple, budget_conscious: bool) -> Dict[str, Any]:
+        """Substitutes for a normalized ingredient, for _find_substitutes_cached"""
         # Find matching substitution rule
-        substitution_rule = None
-        for key in self.substitution_rules:
-            if key in ingredient_lower or ingredient_lower in key:
-                substitution_rule = self.substitution_rules[key]
-                break
+        rule_key = self._match_rule_key(ingredient_lower)
         
-        if not substitution_rule:
-            return self._generate_generic_substitutes(ingredient)
+        if rule_key is None:
+            return self._generate_generic_substitutes(ingredient_lower)
         
-        substitutes = {
-            'original': ingredient,
-            'alternatives': [],
-            'ratio': substitution_rule.get('ratio', 1.0),
-            'notes': []
-        }
+        substitution_rule = self.substitution_rules[rule_key]
+        sources = []
+        notes = []
         
         # Apply dietary restrictions
         if dietary_restrictions:
             for restriction in dietary_restrictions:
                 if restriction in substitution_rule:
-                    substitutes['alternatives'].extend(substitution_rule[restriction])
-                    substitutes['notes'].append(f"Suitable for {restriction.replace('_', ' ')} diet")
+                    sources.append(substitution_rule[restriction])
+                    notes.append(f"Suitable for {restriction.replace('_', ' ')} diet")
         
         # Apply health goals
         if health_goals:
             for goal in health_goals:
                 health_key = goal.replace('-', '_').replace(' ', '_')
                 if health_key in substitution_rule:
-                    substitutes['alternatives'].extend(substitution_rule[health_key])
-                    substitutes['notes'].append(f"Optimized for {goal}")
+                    sources.append(substitution_rule[health_key])
+                    notes.append(f"Optimized for {goal}")
         
         # Budget considerations
         if budget_conscious and 'budget' in substitution_rule:
-            substitutes['alternatives'].extend(substitution_rule['budget'])
-            substitutes['notes'].append("Budget-friendly options included")
+            sources.append(substitution_rule['budget'])
+            notes.append("Budget-friendly options included")
         
-        # Default alternatives if no specific requirements
-        if not substitutes['alternatives']:
-            substitutes['alternatives'] = substitution_rule['alternatives']
+        # Remove duplicates and limit to top options, falling back to the
+        # default alternatives if no specific requirements matched
+        alternatives = list(islice(dict.fromkeys(chain.from_iterable(sources)), 5))
+        if not alternatives:
+            alternatives = list(islice(dict.fromkeys(substitution_rule['alternatives']), 5))
         
-        # Remove duplicates and limit to top options
-        substitutes['alternatives'] = list(dict.fromkeys(substitutes['alternatives']))[:5]
+        substitutes = {
+            'original': ingredient_lower,
+            'alternatives': alternatives,
+            'ratio': substitution_rule.get('ratio', 1.0),
+            'notes': notes
+        }
         
         # Add nutritional comparison
-        substitutes['nutritional_notes'] = self._get_nutritional_comparison(ingredient, substitutes['alternatives'])
+        substitutes['nutritional_notes'] = self._get_nutritional_comparison(ingredient_lower, substitutes['alternatives'])
         
         return substitutes
     
@@ -221,75 +399,70 @@ class IngredientSubstitutionEngine:
         """Generate generic substitutes for unknown ingredients"""
         category = self._categorize_ingredient(ingredient)
         
-        generic_subs = {
-            'protein': ['tofu', 'tempeh', 'legumes'],
-            'vegetable': ['similar seasonal vegetables', 'frozen alternative'],
-            'herb': ['dried version', 'similar herbs'],
-            'spice': ['similar spices', 'spice blends'],
-            'grain': ['similar grains', 'cauliflower rice'],
-            'fruit': ['similar seasonal fruits', 'frozen alternative']
-        }
-        
         return {
             'original': ingredient,
-            'alternatives': generic_subs.get(category, ['consult recipe notes']),
+            'alternatives': list(_GENERIC_SUBSTITUTES.get(category, ('consult recipe notes',))),
             'ratio': 1.0,
             'notes': [f"Generic {category} substitutions suggested"],
             'nutritional_notes': "Nutritional values may vary significantly"
         }
     
-    def _categorize_ingredient(self, ingredient: str) -> str:
-        """Categorize ingredient into broad groups"""
-        ingredient_lower = ingredient.lower()
+    def _categorize_ingredient_uncached(self, ingredient_lower: str) -> str:
+        """Categorize a normalized ingredient into broad groups"""
+        if self._category_automaton is not None:
+            ranks = [rank for _, rank in self._category_automaton.iter(ingredient_lower)]
+            return self._categories[min(ranks)] if ranks else 'other'
         
-        proteins = ['chicken', 'beef', 'pork', 'fish', 'tofu', 'beans', 'lentils']
-        vegetables = ['broccoli', 'carrot', 'onion', 'pepper', 'tomato', 'spinach']
-        herbs = ['basil', 'oregano', 'thyme', 'parsley', 'cilantro', 'mint']
-        spices = ['cumin', 'paprika', 'turmeric', 'cinnamon', 'ginger']
-        grains = ['rice', 'quinoa', 'pasta', 'bread', 'oats']
-        fruits = ['apple', 'banana', 'berries', 'citrus', 'mango']
+        for category, keywords in _CATEGORY_KEYWORDS.items():
+            if any(keyword in ingredient_lower for keyword in keywords):
+                return category
+        return 'other'
+    
+    def rules_with_labels(self, labels: List[str]) -> List[str]:
+        """Rule keys, in rule order, with alternatives for any of the given labels"""
+        mask = 0
+        for label in labels:
+            mask |= _RULE_LABEL_BITS.get(label, 0)
+        return _RULE_KEYS[(_RULE_LABEL_MASKS & np.uint32(mask)) != 0].tolist()
+    
+    def batch_categorize(self, ingredients: List[str]) -> List[str]:
+        """Categorize many ingredients at once, e.g. for bulk recipe imports"""
+        normalized = [_normalize_ingredient(ingredient) for ingredient in ingredients]
+        if not NUMBA_AVAILABLE:
+            return [self._categorize_ingredient(ingredient) for ingredient in normalized]
         
-        if any(p in ingredient_lower for p in proteins):
-            return 'protein'
-        elif any(v in ingredient_lower for v in vegetables):
-            return 'vegetable'
-        elif any(h in ingredient_lower for h in herbs):
-            return 'herb'
-        elif any(s in ingredient_lower for s in spices):
-            return 'spice'
-        elif any(g in ingredient_lower for g in grains):
-            return 'grain'
-        elif any(f in ingredient_lower for f in fruits):
-            return 'fruit'
-        else:
-            return 'other'
+        buffer, offsets = _encode_strings(normalized)
+        ranks = _categorize_kernel(buffer, offsets, _KEYWORD_BUFFER, _KEYWORD_OFFSETS,
+                                   _KEYWORD_CATEGORIES, len(_CATEGORY_NAMES) - 1)
+        return [_CATEGORY_NAMES[rank] for rank in ranks]
     
     def _get_nutritional_comparison(self, original: str, alternatives: List[str]) -> str:
         """Provide nutritional comparison notes"""
-        # This would ideally connect to a nutrition database
-        # For now, provide general guidance
-        
-        nutrition_notes = {
-            'tofu': "Lower in calories, good protein source",
-            'cauliflower rice': "Much lower in carbs and calories",
-            'quinoa': "Higher in protein and fiber than rice",
-            'olive oil': "Rich in healthy monounsaturated fats",
-            'stevia': "Zero calories, suitable for diabetics",
-            'almond milk': "Lower in calories and carbs than dairy milk"
-        }
-        
-        notes = []
-        for alt in alternatives[:3]:  # Limit to first 3 alternatives
-            if alt.lower() in nutrition_notes:
-                notes.append(f"{alt}: {nutrition_notes[alt.lower()]}")
+        # Alternatives come from the lowercase rule tables, so they index the notes directly
+        notes = [
+            f"{alt}: {_NUTRITION_NOTES[alt]}"
+            for alt in alternatives[:3]  # Limit to first 3 alternatives
+            if alt in _NUTRITION_NOTES
+        ]
         
         return "; ".join(notes) if notes else "Nutritional values may vary"
     
-    def batch_substitute(self, ingredients: List[str], **kwargs) -> Dict[str, Dict]:
+    def batch_substitute(self, ingredients: List[str], *, dietary_restrictions: List[str] = None,
+                         health_goals: List[str] = None, budget_conscious: bool = False) -> Dict[str, Dict]:
         """Process multiple ingredient substitutions"""
+        dietary = tuple(dietary_restrictions or ())
+        goals = tuple(health_goals or ())
+        budget = bool(budget_conscious)
+        # One cached lookup per distinct ingredient, however often it repeats in the batch
         results = {}
-        for ingredient in ingredients:
-            results[ingredient] = self.find_substitutes(ingredient, **kwargs)
+        for ingredient in dict.fromkeys(ingredients):
+            substitutes = self._find_substitutes_cached(_normalize_ingredient(ingredient), dietary, goals, budget)
+            results[ingredient] = {
+                **substitutes,
+                'original': ingredient,
+                'alternatives': list(substitutes['alternatives']),
+                'notes': list(substitutes['notes'])
+            }
         return results
     
     def validate_substitution(self, original: str, substitute: str, recipe_type: str = None) -> Dict[str, Any]:
@@ -302,6 +475,12 @@ class IngredientSubstitutionEngine:
             'adjustments_needed': []
         }
 
+# Streamlit integration functions
+@st.cache_resource
+def get_substitution_engine() -> IngredientSubstitutionEngine:
+    """Shared IngredientSubstitutionEngine, so its matchers and caches survive reruns"""
+    return IngredientSubstitutionEngine()
+
 # Example usage
 if __name__ == "__main__":
     engine = IngredientSubstitutionEngine()
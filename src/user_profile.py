@@ -1,42 +1,113 @@
 import json
+import re
 import streamlit as st
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
+from types import MappingProxyType
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Template for new profiles; read-only and shared, copied by create_user_profile
+_DEFAULT_PROFILE = MappingProxyType({
+    'user_id': '',
+    'name': '',
+    'age_group': 'adult',
+    'dietary_restrictions': (),
+    'health_conditions': (),
+    'cooking_skill': 'beginner',
+    'preferred_cuisines': (),
+    'spice_tolerance': 'medium',
+    'cooking_time_preference': 'medium',
+    'budget_preference': 'medium',
+    'kitchen_equipment': (),
+    'allergens': (),
+    'nutrition_goals': MappingProxyType({
+        'calories': 2000,
+        'protein': 50,
+        'carbs': 250,
+        'fat': 65
+    }),
+    'preferences_learned': MappingProxyType({
+        'favorite_recipes': (),
+        'disliked_ingredients': (),
+        'cooking_patterns': MappingProxyType({})
+    }),
+    'created_at': '',
+    'last_active': ''
+})
+
+# Nutrition targets: baseline, then age-group and health-condition overrides
+_BASE_TARGETS = MappingProxyType({
+    'calories': 2000,
+    'protein': 50,
+    'carbs': 250,
+    'fat': 65,
+    'fiber': 25,
+    'sodium': 2300
+})
+
+_AGE_ADJUSTMENTS = MappingProxyType({
+    'child': MappingProxyType({'calories': 1800, 'protein': 34, 'carbs': 225}),
+    'elderly': MappingProxyType({'protein': 60})  # Higher protein for elderly
+})
+
+_CONDITION_ADJUSTMENTS = MappingProxyType({
+    'diabetes': MappingProxyType({'carbs': 180, 'fiber': 35}),  # Lower carbs, higher fiber
+    'heart_disease': MappingProxyType({'sodium': 1500}),  # Lower sodium
+    'weight_loss': MappingProxyType({'calories': 1500, 'protein': 75})  # Caloric deficit, higher protein
+})
+
+def _mutable_copy(value):
+    """Plain dict/list copy of a read-only template, so each profile owns its containers"""
+    if isinstance(value, MappingProxyType):
+        return {key: _mutable_copy(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_mutable_copy(item) for item in value]
+    return value
+
+# Ingredient substitutions applied for dietary restrictions, matched anywhere in
+# an ingredient regardless of case
+_MEAT_SUBSTITUTIONS = {
+    'chicken': 'tofu or tempeh',
+    'beef': 'mushrooms or lentils',
+    'pork': 'jackfruit or tempeh'
+}
+_VEGAN_SUBSTITUTIONS = {
+    'milk': 'plant-based milk',
+    'cheese': 'nutritional yeast or vegan cheese',
+    'butter': 'olive oil or vegan butter',
+    'egg': 'flax egg or applesauce'
+}
+_MEAT_RE = re.compile('|'.join(map(re.escape, _MEAT_SUBSTITUTIONS)), re.IGNORECASE)
+_VEGAN_RE = re.compile('|'.join(map(re.escape, _VEGAN_SUBSTITUTIONS)), re.IGNORECASE)
+_SPICY_RE = re.compile('chili|pepper|hot sauce|cayenne|paprika', re.IGNORECASE)
+
+def _substitute_ingredients(ingredients: List[str], pattern: re.Pattern,
+                            substitutions: Dict[str, str]) -> Tuple[List[str], List[str]]:
+    """Replace every match of pattern in one pass; returns the ingredients and the change notes"""
+    replaced = set()
+    
+    def replace(match):
+        key = match.group(0).lower()
+        replaced.add(key)
+        return substitutions[key]
+    
+    ingredients = [pattern.sub(replace, ing) for ing in ingredients]
+    notes = [f"Replaced {key} with {substitute}" for key, substitute in substitutions.items() if key in replaced]
+    return ingredients, notes
 
 class UserProfileManager:
     """Manage user profiles and preferences"""
     
     def __init__(self):
-        self.default_profile = {
-            'user_id': '',
-            'name': '',
-            'age_group': 'adult',
-            'dietary_restrictions': [],
-            'health_conditions': [],
-            'cooking_skill': 'beginner',
-            'preferred_cuisines': [],
-            'spice_tolerance': 'medium',
-            'cooking_time_preference': 'medium',
-            'budget_preference': 'medium',
-            'kitchen_equipment': [],
-            'allergens': [],
-            'nutrition_goals': {
-                'calories': 2000,
-                'protein': 50,
-                'carbs': 250,
-                'fat': 65
-            },
-            'preferences_learned': {
-                'favorite_recipes': [],
-                'disliked_ingredients': [],
-                'cooking_patterns': {}
-            },
-            'created_at': '',
-            'last_active': ''
-        }
+        self.default_profile = _DEFAULT_PROFILE
     
     def create_user_profile(self, user_data: Dict) -> Dict:
         """Create a new user profile"""
-        profile = self.default_profile.copy()
+        profile = _mutable_copy(self.default_profile)
         profile.update(user_data)
         return profile
     
@@ -92,41 +163,41 @@ class UserProfileManager:
         health_conditions = profile.get('health_conditions', [])
         goals = profile.get('nutrition_goals', {})
         
-        # Base targets
-        targets = {
-            'calories': 2000,
-            'protein': 50,
-            'carbs': 250,
-            'fat': 65,
-            'fiber': 25,
-            'sodium': 2300
-        }
-        
-        # Adjust for age group
-        if age_group == 'child':
-            targets['calories'] = 1800
-            targets['protein'] = 34
-            targets['carbs'] = 225
-        elif age_group == 'elderly':
-            targets['protein'] = 60  # Higher protein for elderly
-        
-        # Adjust for health conditions
-        if 'diabetes' in health_conditions:
-            targets['carbs'] = 180  # Lower carbs
-            targets['fiber'] = 35   # Higher fiber
-        
-        if 'heart_disease' in health_conditions:
-            targets['sodium'] = 1500  # Lower sodium
-        
-        if 'weight_loss' in health_conditions:
-            targets['calories'] = 1500  # Caloric deficit
-            targets['protein'] = 75     # Higher protein
+        targets = dict(_BASE_TARGETS)
+        targets.update(_AGE_ADJUSTMENTS.get(age_group, {}))
+        # Table order, not the profile's order, decides which condition wins a shared nutrient
+        for condition, adjustments in _CONDITION_ADJUSTMENTS.items():
+            if condition in health_conditions:
+                targets.update(adjustments)
         
         # Override with user-specified goals
         targets.update(goals)
         
         return targets
 
+_ALLERGEN_SUBSTITUTIONS = MappingProxyType({
+    'nuts': 'seeds or avoid',
+    'dairy': 'dairy-free alternatives',
+    'gluten': 'gluten-free alternatives',
+    'soy': 'soy-free alternatives',
+    'eggs': 'egg replacer'
+})
+
+def _build_allergen_automaton():
+    """Aho-Corasick automaton over the known allergens, or None without pyahocorasick"""
+    if not AHOCORASICK_AVAILABLE:
+        return None
+    automaton = ahocorasick.Automaton()
+    for allergen in _ALLERGEN_SUBSTITUTIONS:
+        automaton.add_word(allergen, allergen)
+    automaton.make_automaton()
+    return automaton
+
+_ALLERGEN_AUTOMATON = _build_allergen_automaton()
+
+# Recipe fields that personalize_recipe's adjusters append to or rebuild
+_PERSONALIZED_LIST_FIELDS = ('ingredients', 'notes', 'cooking_tips', 'advanced_tips')
+
 class RecipePersonalizer:
     """Personalize recipes based on user preferences"""
     
@@ -135,14 +206,16 @@ class RecipePersonalizer:
     
     def personalize_recipe(self, recipe: Dict, user_profile: Dict) -> Dict:
         """Personalize a recipe for a specific user"""
-        personalized = recipe.copy()
+        # Own copies of the lists the adjusters edit in place; the caller's recipe stays untouched
+        personalized = dict(recipe)
+        for key in _PERSONALIZED_LIST_FIELDS:
+            if key in personalized:
+                personalized[key] = list(personalized[key])
         
         # Adjust spice level
-        spice_tolerance = user_profile.get('spice_tolerance', 'medium')
-        if spice_tolerance == 'mild':
-            personalized = self._reduce_spice(personalized)
-        elif spice_tolerance == 'hot':
-            personalized = self._increase_spice(personalized)
+        spice_adjuster = self._SPICE_DISPATCH.get(user_profile.get('spice_tolerance', 'medium'))
+        if spice_adjuster:
+            personalized = spice_adjuster(self, personalized)
         
         # Adjust for dietary restrictions
         restrictions = user_profile.get('dietary_restrictions', [])
@@ -155,37 +228,28 @@ class RecipePersonalizer:
             personalized = self._remove_allergens(personalized, allergens)
         
         # Scale for cooking skill
-        skill = user_profile.get('cooking_skill', 'beginner')
-        if skill == 'beginner':
-            personalized = self._simplify_recipe(personalized)
-        elif skill == 'advanced':
-            personalized = self._enhance_recipe(personalized)
+        skill_adjuster = self._SKILL_DISPATCH.get(user_profile.get('cooking_skill', 'beginner'))
+        if skill_adjuster:
+            personalized = skill_adjuster(self, personalized)
         
         return personalized
     
     def _reduce_spice(self, recipe: Dict) -> Dict:
         """Reduce spice level in recipe"""
         # Identify and reduce spicy ingredients
-        spicy_ingredients = ['chili', 'pepper', 'hot sauce', 'cayenne', 'paprika']
-        
-        modified_ingredients = []
-        for ingredient in recipe.get('ingredients', []):
-            ingredient_lower = ingredient.lower()
-            if any(spice in ingredient_lower for spice in spicy_ingredients):
-                modified_ingredients.append(f"Reduced {ingredient}")
-            else:
-                modified_ingredients.append(ingredient)
-        
-        recipe['ingredients'] = modified_ingredients
-        recipe['notes'] = recipe.get('notes', []) + ["Spice level reduced for mild preference"]
+        recipe['ingredients'] = [
+            f"Reduced {ingredient}" if _SPICY_RE.search(ingredient) else ingredient
+            for ingredient in recipe.get('ingredients', [])
+        ]
+        recipe.setdefault('notes', []).append("Spice level reduced for mild preference")
         
         return recipe
     
     def _increase_spice(self, recipe: Dict) -> Dict:
         """Increase spice level in recipe"""
         # Add spicy ingredients or increase quantities
-        recipe['ingredients'].append("Extra chili flakes (to taste)")
-        recipe['notes'] = recipe.get('notes', []) + ["Spice level increased for hot preference"]
+        recipe.setdefault('ingredients', []).append("Extra chili flakes (to taste)")
+        recipe.setdefault('notes', []).append("Spice level increased for hot preference")
         
         return recipe
     
@@ -195,36 +259,17 @@ class RecipePersonalizer:
         
         if 'vegetarian' in restrictions:
             # Replace meat with vegetarian alternatives
-            meat_substitutions = {
-                'chicken': 'tofu or tempeh',
-                'beef': 'mushrooms or lentils',
-                'pork': 'jackfruit or tempeh'
-            }
-            
-            for meat, substitute in meat_substitutions.items():
-                recipe['ingredients'] = [
-                    ing.replace(meat, substitute) if meat in ing.lower() else ing
-                    for ing in recipe['ingredients']
-                ]
-                if meat in str(recipe['ingredients']).lower():
-                    substitutions.append(f"Replaced {meat} with {substitute}")
+            recipe['ingredients'], notes = _substitute_ingredients(
+                recipe['ingredients'], _MEAT_RE, _MEAT_SUBSTITUTIONS
+            )
+            substitutions.extend(notes)
         
         if 'vegan' in restrictions:
             # Replace dairy and eggs
-            vegan_substitutions = {
-                'milk': 'plant-based milk',
-                'cheese': 'nutritional yeast or vegan cheese',
-                'butter': 'olive oil or vegan butter',
-                'egg': 'flax egg or applesauce'
-            }
-            
-            for dairy, substitute in vegan_substitutions.items():
-                recipe['ingredients'] = [
-                    ing.replace(dairy, substitute) if dairy in ing.lower() else ing
-                    for ing in recipe['ingredients']
-                ]
-                if dairy in str(recipe['ingredients']).lower():
-                    substitutions.append(f"Replaced {dairy} with {substitute}")
+            recipe['ingredients'], notes = _substitute_ingredients(
+                recipe['ingredients'], _VEGAN_RE, _VEGAN_SUBSTITUTIONS
+            )
+            substitutions.extend(notes)
         
         if substitutions:
             recipe['dietary_modifications'] = substitutions
@@ -233,22 +278,17 @@ class RecipePersonalizer:
     
     def _remove_allergens(self, recipe: Dict, allergens: List[str]) -> Dict:
         """Remove or substitute allergenic ingredients"""
-        allergen_substitutions = {
-            'nuts': 'seeds or avoid',
-            'dairy': 'dairy-free alternatives',
-            'gluten': 'gluten-free alternatives',
-            'soy': 'soy-free alternatives',
-            'eggs': 'egg replacer'
-        }
-        
-        modifications = []
-        for allergen in allergens:
-            if allergen in allergen_substitutions:
-                substitute = allergen_substitutions[allergen]
-                # Check if allergen present in ingredients
-                allergen_present = any(allergen in ing.lower() for ing in recipe['ingredients'])
-                if allergen_present:
-                    modifications.append(f"⚠️ Contains {allergen} - use {substitute}")
+        # One lowercase pass over the ingredients, then find every known allergen in a single scan
+        joined = '\n'.join(ing.lower() for ing in recipe['ingredients'])
+        if _ALLERGEN_AUTOMATON is not None:
+            present = {allergen for _, allergen in _ALLERGEN_AUTOMATON.iter(joined)}
+        else:
+            present = {allergen for allergen in _ALLERGEN_SUBSTITUTIONS if allergen in joined}
+        
+        modifications = [
+            f"⚠️ Contains {allergen} - use {_ALLERGEN_SUBSTITUTIONS[allergen]}"
+            for allergen in allergens if allergen in present
+        ]
         
         if modifications:
             recipe['allergen_warnings'] = modifications
@@ -282,8 +322,22 @@ class RecipePersonalizer:
         ])
         
         return recipe
+    
+    # Adjuster per spice tolerance and cooking skill; levels not listed leave the recipe as is
+    _SPICE_DISPATCH = {'mild': _reduce_spice, 'hot': _increase_spice}
+    _SKILL_DISPATCH = {'beginner': _simplify_recipe, 'advanced': _enhance_recipe}
 
 # Streamlit integration functions
+@st.cache_resource
+def get_profile_manager() -> UserProfileManager:
+    """Shared UserProfileManager, built once per process instead of per rerun"""
+    return UserProfileManager()
+
+@st.cache_resource
+def get_recipe_personalizer() -> RecipePersonalizer:
+    """Shared RecipePersonalizer, built once per process instead of per rerun"""
+    return RecipePersonalizer()
+
 def display_user_profile_setup():
     """Display user profile setup interface"""
     st.subheader("🔧 Set Up Your Cooking Profile")
@@ -353,6 +407,25 @@ def display_user_profile_setup():
     
     return None
 
+@st.cache_data(show_spinner=False)
+def _dietary_recommendations(health_conditions: Tuple[str, ...],
+                             dietary_restrictions: Tuple[str, ...]) -> List[str]:
+    """Dietary recommendations for the profile fields they depend on, cached across reruns"""
+    return get_profile_manager().get_dietary_recommendations({
+        'health_conditions': health_conditions,
+        'dietary_restrictions': dietary_restrictions
+    })
+
+@st.cache_data(show_spinner=False)
+def _nutrition_targets(age_group: str, health_conditions: Tuple[str, ...],
+                       nutrition_goals: Tuple[Tuple[str, Any], ...]) -> Dict:
+    """Nutrition targets for the profile fields they depend on, cached across reruns"""
+    return get_profile_manager().calculate_nutrition_targets({
+        'age_group': age_group,
+        'health_conditions': health_conditions,
+        'nutrition_goals': dict(nutrition_goals)
+    })
+
 def display_personalized_recommendations(user_profile: Dict):
     """Display personalized recommendations based on user profile"""
     if not user_profile:
@@ -360,9 +433,14 @@ def display_personalized_recommendations(user_profile: Dict):
     
     st.subheader("🎯 Your Personalized Recommendations")
     
-    profile_manager = UserProfileManager()
-    recommendations = profile_manager.get_dietary_recommendations(user_profile)
-    nutrition_targets = profile_manager.calculate_nutrition_targets(user_profile)
+    health_conditions = tuple(user_profile.get('health_conditions', []))
+    recommendations = _dietary_recommendations(
+        health_conditions, tuple(user_profile.get('dietary_restrictions', []))
+    )
+    nutrition_targets = _nutrition_targets(
+        user_profile.get('age_group', 'adult'), health_conditions,
+        tuple(user_profile.get('nutrition_goals', {}).items())
+    )
     
     col1, col2 = st.columns(2)
     